@@ -0,0 +1,151 @@
+import json  # Corps de la réponse 503
+import threading  # Les requêtes arrivent sur plusieurs threads du worker
+
+from app.config import (  # Réglages du contrôle d'admission et échéance des requêtes
+    ADMISSION_ACTIVE,
+    ADMISSION_MAX_EN_COURS,
+    ADMISSION_MAX_FILE,
+    ADMISSION_ATTENTE_MAX,
+    ADMISSION_RETRY_AFTER,
+    REQUETE_DELAI,
+)
+from utils.delais import definir_echeance, retablir_echeance  # Échéance transmise aux appels externes
+from utils.metriques import Compteur  # Admissions et refus exposés sur /metrics
+
+# Contrôle d'admission (middleware WSGI) : un pic de trafic ne s'empile pas sans limite dans le worker.
+# Au plus `max_en_cours` requêtes /ask* sont traitées en même temps ; les suivantes attendent dans une file
+# bornée (`max_file` places, `attente_max` secondes au plus). File pleine ou attente trop longue : réponse 503
+# immédiate avec Retry-After, pour que le client (ou le répartiteur de charge) réessaie ailleurs ou plus tard.
+# Chaque requête admise reçoit une échéance (REQUETE_DELAI), respectée par les appels à Mistral, Wikipédia et Google.
+
+MESSAGE_SURCHARGE = "Le serveur est très sollicité, réessaie dans quelques secondes."
+SANS_ECHEANCE = ("/ask/batch",)  # Un lot peut durer bien plus longtemps qu'une question : échéance par message
+
+admissions = Compteur("chatbot_admission_total", "Requêtes admises ou refusées par le contrôle d'admission", ("resultat",))
+
+
+class _ReponseAdmise:
+    # Enveloppe la réponse WSGI : la place est rendue quand le serveur a fini d'envoyer la réponse (flux compris)
+    def __init__(self, iterable, liberer):
+        self._iterable = iterable
+        self._liberer = liberer
+
+    def __iter__(self):
+        yield from self._iterable
+        self._liberer()  # Réponse entièrement produite (close(), appelé ensuite, n'aura plus rien à rendre)
+
+    def close(self):
+        try:
+            if hasattr(self._iterable, "close"):
+                self._iterable.close()
+        finally:
+            self._liberer()
+
+
+class ControleAdmission:
+    def __init__(
+        self,
+        application,
+        prefixes: tuple = ("/ask",),
+        actif: bool = ADMISSION_ACTIVE,
+        max_en_cours: int = ADMISSION_MAX_EN_COURS,
+        max_file: int = ADMISSION_MAX_FILE,
+        attente_max: float = ADMISSION_ATTENTE_MAX,
+        retry_after: int = ADMISSION_RETRY_AFTER,
+        delai_requete: float = REQUETE_DELAI,
+    ):
+        self.application = application
+        self.prefixes = prefixes
+        self.actif = actif
+        self.max_file = max_file
+        self.attente_max = attente_max
+        self.retry_after = retry_after
+        self.delai_requete = delai_requete
+        self._places = threading.BoundedSemaphore(max_en_cours)
+        self._verrou = threading.Lock()
+        self.en_cours = 0
+        self.en_attente = 0
+
+    def __call__(self, environ, start_response):
+        chemin = environ.get("PATH_INFO", "")
+        if not chemin.startswith(self.prefixes):
+            return self.application(environ, start_response)  # /health, /metrics, pages : jamais refusés
+        if self.actif and not self._entrer():
+            return self._refuser(start_response)
+
+        # L'échéance reste en place jusqu'à la fin de l'envoi (réponses en flux comprises)
+        jeton = definir_echeance(None if chemin.startswith(SANS_ECHEANCE) else self.delai_requete)
+        liberer = self._liberateur(jeton)
+        try:
+            iterable = self.application(environ, start_response)
+        except BaseException:
+            liberer()
+            raise
+        return _ReponseAdmise(iterable, liberer)
+
+    def _entrer(self) -> bool:
+        # Prend une place de traitement, en attendant dans la file si besoin ; False si la requête est refusée
+        if self._places.acquire(blocking=False):
+            return self._admettre("immediate")
+        with self._verrou:
+            if self.en_attente >= self.max_file:
+                admissions.inc("refusee_file_pleine")
+                return False
+            self.en_attente += 1
+        try:
+            obtenue = self._places.acquire(timeout=self.attente_max)
+        finally:
+            with self._verrou:
+                self.en_attente -= 1
+        if not obtenue:
+            admissions.inc("refusee_attente")
+            return False
+        return self._admettre("apres_attente")
+
+    def _admettre(self, resultat: str) -> bool:
+        with self._verrou:
+            self.en_cours += 1
+        admissions.inc(resultat)
+        return True
+
+    def _liberateur(self, jeton):
+        fait = []
+
+        def liberer():
+            if fait:
+                return  # close() peut être appelé plusieurs fois
+            fait.append(True)
+            try:
+                retablir_echeance(jeton)
+            except ValueError:  # Réponse terminée dans un autre contexte : on efface simplement l'échéance
+                definir_echeance(None)
+            if self.actif:
+                with self._verrou:
+                    self.en_cours -= 1
+                self._places.release()
+        return liberer
+
+    def _refuser(self, start_response):
+        corps = json.dumps({"response": MESSAGE_SURCHARGE}, ensure_ascii=False).encode("utf-8")
+        start_response("503 Service Unavailable", [
+            ("Content-Type", "application/json"),
+            ("Content-Length", str(len(corps))),
+            ("Retry-After", str(self.retry_after)),
+        ])
+        return [corps]
+
+    def statistiques(self) -> dict:
+        with self._verrou:
+            return {"en_cours": self.en_cours, "en_attente": self.en_attente}
+
+
+def exposer_admission(controle: ControleAdmission):
+    # Collecteur /metrics : compteurs d'admission et occupation actuelle
+    def collecteur():
+        yield from admissions.exposer()
+        stats = controle.statistiques()
+        yield "# TYPE chatbot_admission_en_cours gauge"
+        yield f"chatbot_admission_en_cours {stats['en_cours']}"
+        yield "# TYPE chatbot_admission_en_attente gauge"
+        yield f"chatbot_admission_en_attente {stats['en_attente']}"
+    return collecteur
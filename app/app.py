@@ -1,7 +1,14 @@
 import os
 import sys
+import json
 import logging
-from flask import Flask, request, jsonify, render_template
+import re
+import secrets
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 
 # Définir le dossier racine
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -17,6 +24,21 @@ app = Flask(
     static_folder=os.path.join(ROOT_DIR, 'static')
 )
 
+from app.config import BATCH_WORKERS, BATCH_MAX_MESSAGES, REQUETE_DELAI  # Réglages de /ask/batch, échéance par message
+from app.config import MEMOIRE_ACTIVE, MEMOIRE_COOKIE, MEMOIRE_BUDGET_TOKENS, MEMOIRE_DUREE_SESSION  # Mémoire des conversations
+from app.memory import memoire_sessions
+from app.prechauffage import prechauffage  # Préchauffage du worker et état de préparation (/health/ready)
+from app.admission import ControleAdmission, exposer_admission  # File d'attente bornée et refus 503 en surcharge
+from utils.metriques import tracer_requete, marquer_route, exposer, enregistrer_collecteur  # Mesures /metrics
+from utils.delais import echeance  # Échéance de chaque message d'un lot
+
+# Contrôle d'admission devant /ask, /ask/stream et /ask/batch (échéance transmise aux appels externes)
+app.wsgi_app = ControleAdmission(app.wsgi_app)
+enregistrer_collecteur(exposer_admission(app.wsgi_app))
+
+# Pool partagé par tous les appels à /ask/batch : borne le nombre de messages traités en même temps
+_pool_batch = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="ask-batch")
+
 # Configuration du logging
 logging.basicConfig(
     level=logging.INFO,
@@ -28,6 +50,34 @@ logging.basicConfig(
 def index():
     return render_template("index.html")
 
+# Permet de contourner le cache des réponses Mistral pour une requête ({"cache": false} ou Cache-Control: no-cache)
+def contexte_cache(data: dict):
+    from utils.Mistral_API import sans_cache  # Import différé
+
+    if data.get("cache") is False or "no-cache" in request.headers.get("Cache-Control", ""):
+        return sans_cache()
+    return nullcontext()
+
+# Identifiant de la conversation : cookie, ou champ "session_id" du JSON (clients sans cookies) ;
+# retourne (identifiant, à_envoyer_en_cookie), un nouvel identifiant étant créé au premier message
+def session_courante(data: dict) -> tuple[str, bool]:
+    for candidat in (data.get("session_id"), request.cookies.get(MEMOIRE_COOKIE)):
+        if isinstance(candidat, str) and re.fullmatch(r"[A-Za-z0-9_-]{8,64}", candidat):
+            return candidat, candidat != request.cookies.get(MEMOIRE_COOKIE)
+    return secrets.token_urlsafe(16), True
+
+# Les derniers échanges de la session accompagnent les questions envoyées à Mistral
+def contexte_conversation(session_id: str):
+    from utils.Mistral_API import avec_historique  # Import différé
+
+    if not MEMOIRE_ACTIVE:
+        return nullcontext()
+    return avec_historique(memoire_sessions.historique(session_id, MEMOIRE_BUDGET_TOKENS))
+
+def envoyer_cookie_session(response: Response, session_id: str) -> Response:
+    response.set_cookie(MEMOIRE_COOKIE, session_id, max_age=int(MEMOIRE_DUREE_SESSION), httponly=True, samesite="Lax")
+    return response
+
 # Endpoint pour envoyer une requête
 @app.route("/ask", methods=["POST"])
 def ask():
@@ -43,20 +93,212 @@ def ask():
     if not message:
         return jsonify(response="Veuillez écrire quelque chose."), 400
 
+    session_id, nouveau_cookie = session_courante(data)
     try:
-        response_text = obtenir_la_response(message)
+        with tracer_requete("/ask"), contexte_cache(data), contexte_conversation(session_id):
+            response_text = obtenir_la_response(message)
     except Exception as e:
         app.logger.error(f"Erreur lors du traitement de la requête: {e}", exc_info=True)
         return jsonify(response="Erreur interne lors du traitement."), 500
 
+    if MEMOIRE_ACTIVE:
+        memoire_sessions.ajouter(session_id, message, response_text)
     app.logger.info(f"Question reçue: {message[:50]}... Réponse fournie.")
-    return jsonify(response=response_text)
+    response = jsonify(response=response_text)
+    return envoyer_cookie_session(response, session_id) if nouveau_cookie else response
+
+# Formate un événement Server-Sent Events
+def evenement_sse(donnees: dict, evenement: str | None = None) -> str:
+    entete = f"event: {evenement}\n" if evenement else ""
+    return f"{entete}data: {json.dumps(donnees, ensure_ascii=False)}\n\n"
+
+# Endpoint en streaming : la réponse est envoyée morceau par morceau (SSE) dès qu'elle est produite
+@app.route("/ask/stream", methods=["POST"])
+def ask_stream():
+    from utils.monchatbot import obtenir_la_response_flux  # Import différé
+
+    try:
+        data = request.get_json(force=True, silent=False)
+    except Exception as e:
+        app.logger.warning(f"Requête JSON invalide : {e}")
+        return jsonify(response="Format JSON invalide."), 400
+
+    message = (data.get("message") or "").strip()
+    if not message:
+        return jsonify(response="Veuillez écrire quelque chose."), 400
+
+    session_id, nouveau_cookie = session_courante(data)
+
+    def generer():
+        morceaux = []  # Réponse complète, gardée dans la mémoire de la session à la fin du flux
+        try:
+            with tracer_requete("/ask/stream"), contexte_cache(data), contexte_conversation(session_id):
+                for morceau in obtenir_la_response_flux(message):
+                    if morceau:
+                        morceaux.append(morceau)
+                        yield evenement_sse({"delta": morceau})
+        except Exception as e:
+            app.logger.error(f"Erreur lors du traitement de la requête: {e}", exc_info=True)
+            yield evenement_sse({"response": "Erreur interne lors du traitement."}, "erreur")
+            return
+        if MEMOIRE_ACTIVE:
+            memoire_sessions.ajouter(session_id, message, "".join(morceaux))
+        app.logger.info(f"Question reçue (stream): {message[:50]}... Réponse fournie.")
+        yield evenement_sse({}, "fin")
+
+    response = Response(
+        stream_with_context(generer()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}  # Pas de mise en tampon par un proxy (nginx)
+    )
+    return envoyer_cookie_session(response, session_id) if nouveau_cookie else response
 
-# Vérification de l'état de santé du serveur
+# Lit les messages d'un lot : tableau JSON (de textes ou de {"message": ...}), {"messages": [...]}, ou NDJSON
+def lire_lot() -> tuple[list[str], dict]:
+    corps = request.get_data(as_text=True)
+    if "ndjson" in (request.content_type or "") or not corps.lstrip().startswith(("[", "{")):
+        elements = [json.loads(ligne) for ligne in corps.splitlines() if ligne.strip()]
+        options = {}
+    else:
+        donnees = json.loads(corps)
+        options = donnees if isinstance(donnees, dict) else {}
+        elements = donnees.get("messages", []) if isinstance(donnees, dict) else donnees
+    if not isinstance(elements, list):
+        raise ValueError("liste de messages attendue")
+    messages = [(e.get("message") if isinstance(e, dict) else e) for e in elements]
+    return [m.strip() if isinstance(m, str) else "" for m in messages], options
+
+# Un message d'un lot, traité par un thread du pool avec sa propre échéance (REQUETE_DELAI) à partir de son début ;
+# `debut` reçoit l'instant où le traitement commence (le message a pu attendre une place dans le pool)
+def traiter_message_du_lot(obtenir_la_response, message: str, debut: list):
+    debut.append(time.monotonic())
+    with echeance(REQUETE_DELAI):
+        return obtenir_la_response(message)
+
+MARGE_ECHEANCE_LOT = 1.0  # Secondes laissées à un message après son échéance pour renvoyer sa propre erreur
+
+# Endpoint par lots : les messages sont traités en parallèle (pool borné), les doublons une seule fois,
+# et chaque résultat est renvoyé en NDJSON dès qu'il est prêt, avec l'indice du message dans le lot.
+# Un message encore en cours après son échéance est abandonné : une ligne d'erreur, et le flux continue
+@app.route("/ask/batch", methods=["POST"])
+def ask_batch():
+    from utils.monchatbot import obtenir_la_response  # Import différé
+    from utils.cache_sqlite import normaliser_texte
+
+    try:
+        messages, options = lire_lot()
+    except Exception as e:
+        app.logger.warning(f"Lot invalide : {e}")
+        return jsonify(response="Format JSON ou NDJSON invalide."), 400
+    if len(messages) > BATCH_MAX_MESSAGES:
+        return jsonify(response=f"Trop de messages (maximum {BATCH_MAX_MESSAGES})."), 413
+
+    # Messages identiques (à la casse et aux espaces près) : un seul traitement, une ligne par indice
+    indices_par_message: dict[str, list[int]] = {}
+    vides = []
+    for i, message in enumerate(messages):
+        if message:
+            indices_par_message.setdefault(normaliser_texte(message), []).append(i)
+        else:
+            vides.append(i)
+
+    futures = {}
+    debuts = {}  # Future -> [instant du début du traitement], vide tant que le message attend une place
+
+    def generer():
+        try:
+            with tracer_requete("/ask/batch"):
+                marquer_route("lot")
+                for i in vides:
+                    yield json.dumps({"index": i, "error": "Veuillez écrire quelque chose."}, ensure_ascii=False) + "\n"
+
+                # Le contexte (contournement du cache...) est copié pour chaque tâche : les threads du pool en héritent
+                with contexte_cache(options):
+                    for indices in indices_par_message.values():
+                        debut = []
+                        future = _pool_batch.submit(
+                            contextvars.copy_context().run, traiter_message_du_lot, obtenir_la_response, messages[indices[0]], debut
+                        )
+                        futures[future], debuts[future] = indices, debut
+
+                restants = set(futures)
+                while restants:
+                    finis, _ = wait(restants, timeout=_attente_lot(restants, debuts), return_when=FIRST_COMPLETED)
+                    lignes = [(future, _resultat_lot(future)) for future in finis]
+                    lignes += [(future, {"error": "Délai dépassé pour ce message."}) for future in _echus(restants - finis, debuts)]
+                    for future, resultat in lignes:
+                        restants.discard(future)
+                        for i in futures[future]:
+                            yield json.dumps({"index": i, **resultat}, ensure_ascii=False) + "\n"
+            app.logger.info(f"Lot traité : {len(messages)} messages, {len(futures)} distincts.")
+        finally:
+            for future in futures:
+                future.cancel()  # Client parti : les messages pas encore commencés ne sont pas traités
+
+    return Response(stream_with_context(generer()), mimetype="application/x-ndjson")
+
+def _resultat_lot(future) -> dict:
+    try:
+        return {"response": future.result()}
+    except Exception as e:  # L'erreur d'un message n'interrompt pas le lot
+        app.logger.error(f"Erreur lors du traitement d'un message du lot: {e}", exc_info=True)
+        return {"error": "Erreur interne lors du traitement."}
+
+# Attente avant la prochaine échéance d'un message en cours (None : pas d'échéance, ou aucun message commencé)
+def _attente_lot(restants: set, debuts: dict):
+    if not REQUETE_DELAI:
+        return None
+    limites = [debuts[future][0] + REQUETE_DELAI + MARGE_ECHEANCE_LOT for future in restants if debuts[future]]
+    return max(0.0, min(limites) - time.monotonic()) if limites else REQUETE_DELAI
+
+# Messages commencés dont l'échéance (plus la marge) est passée sans résultat : abandonnés
+def _echus(restants: set, debuts: dict) -> list:
+    if not REQUETE_DELAI:
+        return []
+    maintenant = time.monotonic()
+    echus = [future for future in restants if debuts[future] and maintenant >= debuts[future][0] + REQUETE_DELAI + MARGE_ECHEANCE_LOT]
+    for future in echus:
+        app.logger.warning("Message du lot abandonné : échéance dépassée")
+    return echus
+
+# Nombre de conversations gardées en mémoire, exporté avec les autres mesures
+def _metriques_memoire():
+    stats = memoire_sessions.statistiques()
+    yield "# TYPE chatbot_sessions gauge"
+    yield f"chatbot_sessions {stats['sessions']}"
+    if "octets_estimes" in stats:  # Mémoire propre au processus (MEMOIRE_PARTAGEE=0)
+        yield "# TYPE chatbot_sessions_octets_estimes gauge"
+        yield f"chatbot_sessions_octets_estimes {stats['octets_estimes']}"
+        yield "# TYPE chatbot_sessions_evictions_total counter"
+        yield f"chatbot_sessions_evictions_total {stats['evictions']}"
+
+enregistrer_collecteur(_metriques_memoire)
+
+# Mesures au format texte de Prometheus (durées par étape et par service externe, erreurs, caches)
+@app.route("/metrics")
+def metrics():
+    import utils.monchatbot  # noqa: F401  Charge les modules mesurés (et leurs collecteurs de cache)
+
+    return Response(exposer(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Vérification de l'état de santé du serveur : le processus répond (liveness)
 @app.route("/health")
+@app.route("/health/live")
 def health():
     return jsonify(status="ok")
 
+# Le worker est prêt à recevoir du trafic (readiness) : 503 tant que le préchauffage n'est pas terminé
+@app.route("/health/ready")
+def health_ready():
+    stats = prechauffage.statistiques()
+    if not stats["pret"]:
+        return jsonify(status="prechauffage", **stats), 503
+    return jsonify(status="ok", **stats)
+
+# Préchauffage en arrière-plan dès le chargement de l'application (serveur de développement, un seul
+# processus) ; sous gunicorn, seulement dans les workers, après le fork (voir gunicorn.conf.py)
+prechauffage.lancer()
+
 # Lancer le serveur
 if __name__ == "__main__":
     debug_mode = os.getenv("FLASK_DEBUG", "0") == "1"
@@ -3,10 +3,157 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Dossier racine du projet (pour placer les fichiers de données à un endroit stable)
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 GOOGLE_CX = os.getenv("GOOGLE_CX")
 MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
 
+# Point d'accès de l'API Mistral (remplaçable par un faux serveur local pour les tests/benchmarks)
+MISTRAL_API_URL = os.getenv("MISTRAL_API_URL", "https://api.mistral.ai/v1/chat/completions")
+
+# Délais (en secondes) pour établir la connexion puis pour lire la réponse de Mistral
+MISTRAL_CONNECT_TIMEOUT = float(os.getenv("MISTRAL_CONNECT_TIMEOUT", "3.05"))
+MISTRAL_READ_TIMEOUT = float(os.getenv("MISTRAL_READ_TIMEOUT", "30"))
+
+# Nombre de nouvelles tentatives sur 429/5xx et délai de base du backoff exponentiel
+MISTRAL_MAX_RETRIES = int(os.getenv("MISTRAL_MAX_RETRIES", "3"))
+MISTRAL_BACKOFF_BASE = float(os.getenv("MISTRAL_BACKOFF_BASE", "0.5"))
+
+# Nombre maximal de requêtes Mistral simultanées par processus (et taille du pool de connexions)
+MISTRAL_MAX_CONCURRENCE = int(os.getenv("MISTRAL_MAX_CONCURRENCE", "8"))
+
+# Cache des réponses Mistral, partagé entre les workers (SQLite en mode WAL) et conservé au redémarrage
+LLM_CACHE_ACTIF = os.getenv("LLM_CACHE_ACTIF", "1") == "1"
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", os.path.join(ROOT_DIR, "cache", "chatbot_cache.sqlite3"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))  # Prompts stables (maths, questions directes)
+LLM_CACHE_TTL_WEB = int(os.getenv("LLM_CACHE_TTL_WEB", str(6 * 3600)))  # Prompts construits à partir de pages web
+LLM_CACHE_MAX_ENTREES = int(os.getenv("LLM_CACHE_MAX_ENTREES", "20000"))
+
+# Cache des recherches Wikipédia (même fichier SQLite) : durée de vie des résumés/listes trouvés
+# et, plus courte, des recherches sans résultat (page introuvable, résumé vide)
+WIKI_CACHE_TTL = int(os.getenv("WIKI_CACHE_TTL", str(7 * 24 * 3600)))
+WIKI_CACHE_TTL_NEGATIF = int(os.getenv("WIKI_CACHE_TTL_NEGATIF", str(30 * 60)))
+WIKI_CACHE_MAX_ENTREES = int(os.getenv("WIKI_CACHE_MAX_ENTREES", "20000"))
+
+# Point d'accès de l'API MediaWiki ({lang} : langue de la recherche), remplaçable par un faux serveur local
+WIKIPEDIA_API_URL = os.getenv("WIKIPEDIA_API_URL", "https://{lang}.wikipedia.org/w/api.php")
+
+# Appels à l'API MediaWiki : délai par appel et nombre d'options d'une page d'homonymie accompagnées
+# d'un aperçu (résumés récupérés en un seul appel groupé, 20 titres au plus par appel)
+WIKIPEDIA_TIMEOUT = float(os.getenv("WIKIPEDIA_TIMEOUT", "5"))
+WIKIPEDIA_APERCUS_MAX = int(os.getenv("WIKIPEDIA_APERCUS_MAX", "20"))
+
+# Recherche Google par l'API Custom Search JSON quand GOOGLE_API_KEY et GOOGLE_CX sont définis
+# (sinon, recherche sur la page de résultats de Google) ; point d'accès remplaçable par un faux serveur local
+GOOGLE_SEARCH_API_URL = os.getenv("GOOGLE_SEARCH_API_URL", "https://www.googleapis.com/customsearch/v1")
+
+# Récupération des pages trouvées par Google : nombre de téléchargements en parallèle,
+# délai par page, délai global pour toute la recherche et fenêtre d'attente laissée aux
+# résultats mieux classés quand un résultat moins bien classé est déjà prêt
+GOOGLE_FETCH_WORKERS = int(os.getenv("GOOGLE_FETCH_WORKERS", "8"))
+GOOGLE_FETCH_TIMEOUT = float(os.getenv("GOOGLE_FETCH_TIMEOUT", "5"))
+GOOGLE_FETCH_DEADLINE = float(os.getenv("GOOGLE_FETCH_DEADLINE", "6"))
+GOOGLE_FETCH_GRACE = float(os.getenv("GOOGLE_FETCH_GRACE", "0.3"))
+
+# Nombre maximal d'octets lus par page (la lecture s'arrête de toute façon dès que les paragraphes sont trouvés)
+GOOGLE_FETCH_MAX_OCTETS = int(os.getenv("GOOGLE_FETCH_MAX_OCTETS", str(1024 * 1024)))
+
+# Résumé extractif local du texte des pages trouvées par Google, avant l'envoi à Mistral : budget (tokens
+# estimés) des phrases gardées, part des mots de la plus courte de deux phrases retrouvés dans l'autre au-delà
+# de laquelle elles sont des doublons, et longueur maximale (caractères) d'une définition en tête de page
+# donnée sans appeler Mistral (0 : jamais)
+RESUME_ACTIF = os.getenv("RESUME_ACTIF", "1") == "1"
+RESUME_BUDGET_TOKENS = int(os.getenv("RESUME_BUDGET_TOKENS", "150"))
+RESUME_SEUIL_DOUBLON = float(os.getenv("RESUME_SEUIL_DOUBLON", "0.6"))
+RESUME_DEFINITION_MAX = int(os.getenv("RESUME_DEFINITION_MAX", "300"))
+
+# Base de connaissances locale (dossier de fichiers JSON) consultée avant Wikipédia, Google et Mistral :
+# emplacement des documents et de leur index, délai entre deux vérifications des fichiers modifiés
+# (faites en arrière-plan ; 0 : aucune après la première),
+# et seuils pour répondre directement (score BM25 minimal, part des mots de la question retrouvés)
+KNOWLEDGE_ACTIF = os.getenv("KNOWLEDGE_ACTIF", "1") == "1"
+KNOWLEDGE_DIR = os.getenv("KNOWLEDGE_DIR", os.path.join(ROOT_DIR, "data", "connaissances"))
+KNOWLEDGE_INDEX_DIR = os.getenv("KNOWLEDGE_INDEX_DIR", os.path.join(ROOT_DIR, "cache", "index_connaissances"))
+KNOWLEDGE_SCAN_INTERVAL = float(os.getenv("KNOWLEDGE_SCAN_INTERVAL", "30"))
+KNOWLEDGE_SCORE_MIN = float(os.getenv("KNOWLEDGE_SCORE_MIN", "1.0"))
+KNOWLEDGE_COUVERTURE_MIN = float(os.getenv("KNOWLEDGE_COUVERTURE_MIN", "0.8"))
+
+# Calcul symbolique (SymPy) fait dans des processus à part : au plus MATHS_PROCESSUS calculs en même temps par
+# worker, chacun arrêté (processus tué) après MATHS_DELAI secondes, la question partant alors vers Mistral.
+# À 0, MATHS_ISOLATION fait les calculs dans le thread de la requête, sans délai maximal.
+MATHS_ISOLATION = os.getenv("MATHS_ISOLATION", "1") == "1"
+MATHS_DELAI = float(os.getenv("MATHS_DELAI", "3"))
+MATHS_PROCESSUS = int(os.getenv("MATHS_PROCESSUS", "2"))
+
+# Endpoint /ask/batch : nombre de messages traités en même temps (pool partagé) et taille maximale d'un lot
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "8"))
+BATCH_MAX_MESSAGES = int(os.getenv("BATCH_MAX_MESSAGES", "1000"))
+
+# Mémoire des conversations (par session, cookie MEMOIRE_COOKIE) : échanges gardés par session, plafonds
+# globaux (au-delà, les sessions les moins récemment utilisées sont oubliées), durée d'inactivité
+# avant oubli, longueur maximale d'un texte gardé et budget de tokens de l'historique envoyé à Mistral
+MEMOIRE_ACTIVE = os.getenv("MEMOIRE_ACTIVE", "1") == "1"
+MEMOIRE_COOKIE = os.getenv("MEMOIRE_COOKIE", "chatbot_session")
+MEMOIRE_MAX_TOURS = int(os.getenv("MEMOIRE_MAX_TOURS", "8"))
+MEMOIRE_MAX_SESSIONS = int(os.getenv("MEMOIRE_MAX_SESSIONS", "10000"))
+MEMOIRE_MAX_OCTETS = int(os.getenv("MEMOIRE_MAX_OCTETS", str(64 * 1024 * 1024)))
+MEMOIRE_DUREE_SESSION = float(os.getenv("MEMOIRE_DUREE_SESSION", "3600"))
+MEMOIRE_MAX_CARACTERES = int(os.getenv("MEMOIRE_MAX_CARACTERES", "2000"))
+MEMOIRE_BUDGET_TOKENS = int(os.getenv("MEMOIRE_BUDGET_TOKENS", "1000"))
+# Sessions gardées dans le cache SQLite (CACHE_DB_PATH), partagé par les workers d'une même machine : avec
+# plusieurs workers gunicorn, chaque question retrouve sa conversation quel que soit le worker qui la reçoit.
+# À 0, mémoire propre à chaque processus (plafond en octets MEMOIRE_MAX_OCTETS) : un seul worker
+# (GUNICORN_WORKERS=1) ou des sessions collantes au niveau du répartiteur de charge sont alors nécessaires.
+MEMOIRE_PARTAGEE = os.getenv("MEMOIRE_PARTAGEE", "1") == "1"
+
+# Regroupement des appels identiques en cours (Wikipédia, Google, Mistral) : un seul appel au service externe,
+# dont le résultat est partagé ; COALESCENCE_DELAI : attente maximale (s) du résultat d'un appel déjà en cours.
+# En mode inter-processus, les workers d'une même machine se coordonnent aussi (verrous fichiers + cache partagé).
+COALESCENCE_ACTIVE = os.getenv("COALESCENCE_ACTIVE", "1") == "1"
+COALESCENCE_DELAI = float(os.getenv("COALESCENCE_DELAI", "35"))
+COALESCENCE_INTER_PROCESSUS = os.getenv("COALESCENCE_INTER_PROCESSUS", "0") == "1"
+COALESCENCE_DOSSIER = os.getenv("COALESCENCE_DOSSIER", os.path.join(ROOT_DIR, "cache", "verrous"))
+
+# Contrôle d'admission des requêtes /ask* (par worker) : au plus ADMISSION_MAX_EN_COURS traitées en même temps,
+# ADMISSION_MAX_FILE en attente pendant au plus ADMISSION_ATTENTE_MAX secondes ; au-delà, réponse 503 immédiate
+# avec Retry-After. REQUETE_DELAI : échéance (s) de /ask et /ask/stream, transmise aux appels externes (0 : aucune).
+ADMISSION_ACTIVE = os.getenv("ADMISSION_ACTIVE", "1") == "1"
+ADMISSION_MAX_EN_COURS = int(os.getenv("ADMISSION_MAX_EN_COURS", "16"))
+ADMISSION_MAX_FILE = int(os.getenv("ADMISSION_MAX_FILE", "32"))
+ADMISSION_ATTENTE_MAX = float(os.getenv("ADMISSION_ATTENTE_MAX", "5"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "2"))
+REQUETE_DELAI = float(os.getenv("REQUETE_DELAI", "30"))
+
+# Nombre maximal d'appels simultanés par processus vers les services web (Wikipédia, recherche Google) ;
+# celui vers Mistral est MISTRAL_MAX_CONCURRENCE
+WEB_MAX_CONCURRENCE = int(os.getenv("WEB_MAX_CONCURRENCE", "16"))
+
+# Message sans mot-clé (ni Wikipédia, ni Google, ni calcul) : Wikipédia et Google sont interrogés en parallèle
+# (0 : l'ancien message proposant de chercher). DEFAUT_RECHERCHE_DELAI : délai (s) pour les deux recherches ;
+# DEFAUT_RECHERCHE_PREFEREE (vide : aucune) l'emporte si elle répond moins de DEFAUT_RECHERCHE_GRACE secondes
+# après l'autre ; DEFAUT_RECHERCHE_WORKERS : recherches simultanées par processus (pool partagé).
+DEFAUT_RECHERCHE_ACTIVE = os.getenv("DEFAUT_RECHERCHE_ACTIVE", "1") == "1"
+DEFAUT_RECHERCHE_DELAI = float(os.getenv("DEFAUT_RECHERCHE_DELAI", "8"))
+DEFAUT_RECHERCHE_PREFEREE = os.getenv("DEFAUT_RECHERCHE_PREFEREE", "wikipedia")
+DEFAUT_RECHERCHE_GRACE = float(os.getenv("DEFAUT_RECHERCHE_GRACE", "0.3"))
+DEFAUT_RECHERCHE_WORKERS = int(os.getenv("DEFAUT_RECHERCHE_WORKERS", "16"))
+
+# Préchauffage au démarrage de chaque worker (imports du pipeline, connexions aux services externes, cache) ;
+# /health/ready répond 503 tant qu'il n'est pas terminé, ou au plus tard après PRECHAUFFAGE_DELAI_MAX secondes.
+# PRECHAUFFAGE_REQUETES_FICHIER : questions fréquentes (une par ligne) posées au démarrage pour remplir les caches.
+PRECHAUFFAGE_ACTIF = os.getenv("PRECHAUFFAGE_ACTIF", "1") == "1"
+PRECHAUFFAGE_CONNEXIONS = os.getenv("PRECHAUFFAGE_CONNEXIONS", "1") == "1"
+PRECHAUFFAGE_REQUETES_FICHIER = os.getenv("PRECHAUFFAGE_REQUETES_FICHIER", "")
+PRECHAUFFAGE_MAX_REQUETES = int(os.getenv("PRECHAUFFAGE_MAX_REQUETES", "50"))
+PRECHAUFFAGE_DELAI_MAX = float(os.getenv("PRECHAUFFAGE_DELAI_MAX", "60"))
+
+# Mesures exposées sur /metrics (format Prometheus) ; au-delà de METRICS_SLOW_MS millisecondes,
+# le détail des étapes de la requête est écrit dans le journal (0 : désactivé)
+METRICS_ACTIF = os.getenv("METRICS_ACTIF", "1") == "1"
+METRICS_SLOW_MS = float(os.getenv("METRICS_SLOW_MS", "0"))
+
 # Mot-clé déclencheur pour lancer une recherche sur Wikipédia dans les requêtes utilisateur
 WIKI_TRIGGER = "wikipedia"
 
@@ -14,4 +161,4 @@ WIKI_TRIGGER = "wikipedia"
 GOOGLE_TRIGGER = "google"
 
 # Mot-clé déclencheur pour résoudre des expressions mathématiques dans les requêtes utilisateur
-MATH_TRIGGER = "calcule"
\ No newline at end of file
+MATH_TRIGGER = "calcule"
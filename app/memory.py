@@ -0,0 +1,172 @@
+import threading  # Les sessions sont lues et modifiées par plusieurs requêtes en même temps
+import time  # Pour repérer les sessions inactives
+from collections import OrderedDict, deque  # Sessions dans l'ordre d'utilisation, tours dans un tampon circulaire
+from dataclasses import dataclass, field  # Pour l'état compact d'une session
+from typing import Optional  # Pour les valeurs pouvant valoir None
+
+from app.config import (  # Bornes de la mémoire des conversations
+    MEMOIRE_MAX_TOURS,
+    MEMOIRE_MAX_SESSIONS,
+    MEMOIRE_MAX_OCTETS,
+    MEMOIRE_DUREE_SESSION,
+    MEMOIRE_MAX_CARACTERES,
+    MEMOIRE_PARTAGEE,
+    CACHE_DB_PATH,
+)
+from utils.cache_sqlite import CacheSQLite  # Sessions partagées entre les workers
+from utils.tokens import estimer_tokens  # Taille des échanges gardés dans le budget de l'historique
+
+# Mémoire des conversations, par session : les derniers échanges (question, réponse) de chaque session sont
+# gardés dans un tampon circulaire, et la mémoire totale est bornée (nombre de sessions et octets) en
+# oubliant les sessions les moins récemment utilisées. Les échanges récents sont ensuite ajoutés aux
+# messages envoyés à Mistral, dans la limite d'un budget de tokens. Avec plusieurs workers, les sessions sont
+# gardées dans le cache SQLite partagé (MemoireSessionsPartagee) plutôt que dans chaque processus.
+
+SURCOUT_SESSION = 600  # Octets estimés d'une session vide (objets Python, identifiant, tampon)
+SURCOUT_TOUR = 150  # Octets estimés d'un échange en plus de ses textes
+
+
+def _messages(tours: list, budget_tokens: int) -> list[dict]:
+    # Messages (rôles user/assistant) des échanges les plus récents qui tiennent dans le budget,
+    # dans l'ordre chronologique, prêts à être insérés avant la nouvelle question
+    messages: list[dict] = []
+    for question, reponse in reversed(tours):
+        cout = estimer_tokens(question) + estimer_tokens(reponse)
+        if cout > budget_tokens:
+            break  # Un échange plus ancien ne peut pas sauter celui-ci : la conversation resterait incohérente
+        budget_tokens -= cout
+        messages[:0] = [{"role": "user", "content": question}, {"role": "assistant", "content": reponse}]
+    return messages
+
+
+@dataclass(slots=True)
+class _Session:
+    tours: deque  # (question, réponse) les plus récents, au plus MEMOIRE_MAX_TOURS
+    octets: int = SURCOUT_SESSION  # Taille estimée de la session
+    dernier_acces: float = field(default_factory=time.monotonic)
+
+
+class MemoireSessions:
+    def __init__(
+        self,
+        max_tours: int = MEMOIRE_MAX_TOURS,
+        max_sessions: int = MEMOIRE_MAX_SESSIONS,
+        max_octets: int = MEMOIRE_MAX_OCTETS,
+        duree_session: float = MEMOIRE_DUREE_SESSION,
+        max_caracteres: int = MEMOIRE_MAX_CARACTERES,
+    ):
+        self.max_tours = max_tours
+        self.max_sessions = max_sessions
+        self.max_octets = max_octets
+        self.duree_session = duree_session  # Secondes d'inactivité après lesquelles une session est oubliée
+        self.max_caracteres = max_caracteres  # Longueur maximale d'un texte gardé (question ou réponse)
+        self._sessions: OrderedDict[str, _Session] = OrderedDict()  # Du moins au plus récemment utilisé
+        self._octets = 0
+        self._verrou = threading.Lock()
+        self.evictions = 0  # Sessions oubliées pour respecter les plafonds
+
+    @staticmethod
+    def _taille(question: str, reponse: str) -> int:
+        return SURCOUT_TOUR + len(question.encode("utf-8")) + len(reponse.encode("utf-8"))
+
+    def _session(self, session_id: str, creer: bool) -> Optional[_Session]:
+        # Session à jour (None si absente ou expirée), marquée comme la plus récemment utilisée
+        session = self._sessions.get(session_id)
+        maintenant = time.monotonic()
+        if session is not None and maintenant - session.dernier_acces > self.duree_session:
+            self._retirer(session_id)
+            session = None
+        if session is None:
+            if not creer:
+                return None
+            session = _Session(tours=deque(maxlen=self.max_tours))
+            self._sessions[session_id] = session
+            self._octets += session.octets
+        self._sessions.move_to_end(session_id)
+        session.dernier_acces = maintenant
+        return session
+
+    def _retirer(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id)
+        self._octets -= session.octets
+
+    def _evincer(self) -> None:
+        # Oublie les sessions les moins récemment utilisées tant qu'un plafond est dépassé
+        while self._sessions and (len(self._sessions) > self.max_sessions or self._octets > self.max_octets):
+            self._retirer(next(iter(self._sessions)))
+            self.evictions += 1
+
+    def ajouter(self, session_id: str, question: str, reponse: str) -> None:
+        # Enregistre un échange ; le plus ancien sort du tampon quand il est plein
+        question, reponse = question[:self.max_caracteres], reponse[:self.max_caracteres]
+        with self._verrou:
+            session = self._session(session_id, creer=True)
+            if len(session.tours) == session.tours.maxlen:
+                ancien = session.tours[0]
+                session.octets -= self._taille(*ancien)
+                self._octets -= self._taille(*ancien)
+            session.tours.append((question, reponse))
+            session.octets += self._taille(question, reponse)
+            self._octets += self._taille(question, reponse)
+            self._evincer()
+
+    def historique(self, session_id: Optional[str], budget_tokens: int) -> list[dict]:
+        if not session_id:
+            return []
+        with self._verrou:
+            session = self._session(session_id, creer=False)
+            tours = list(session.tours) if session else []
+        return _messages(tours, budget_tokens)
+
+    def oublier(self, session_id: str) -> None:
+        with self._verrou:
+            if session_id in self._sessions:
+                self._retirer(session_id)
+
+    def statistiques(self) -> dict:
+        with self._verrou:
+            return {"sessions": len(self._sessions), "octets_estimes": self._octets, "evictions": self.evictions}
+
+
+class MemoireSessionsPartagee:
+    # Même interface que MemoireSessions, dans le cache SQLite partagé par les workers : une session est une
+    # entrée (ses derniers échanges), oubliée après `duree_session` sans nouvel échange ; au-delà de
+    # `max_sessions`, les moins récemment utilisées sont supprimées par le nettoyage du cache.
+    # Deux questions d'une même session traitées en même temps par deux workers peuvent perdre un échange.
+    def __init__(
+        self,
+        chemin: str = CACHE_DB_PATH,
+        max_tours: int = MEMOIRE_MAX_TOURS,
+        max_sessions: int = MEMOIRE_MAX_SESSIONS,
+        duree_session: float = MEMOIRE_DUREE_SESSION,
+        max_caracteres: int = MEMOIRE_MAX_CARACTERES,
+    ):
+        self.max_tours = max_tours
+        self.duree_session = duree_session
+        self.max_caracteres = max_caracteres
+        self._cache = CacheSQLite(chemin, "sessions", max_entrees=max_sessions, ttl_defaut=int(duree_session))
+        self._verrou = threading.Lock()  # Lecture puis écriture d'une session sans mélange entre threads du processus
+
+    def ajouter(self, session_id: str, question: str, reponse: str) -> None:
+        question, reponse = question[:self.max_caracteres], reponse[:self.max_caracteres]
+        with self._verrou:
+            tours = self._cache.lire(session_id, espace="sessions", defaut=[])
+            tours = (tours + [[question, reponse]])[-self.max_tours:]
+            self._cache.ecrire(session_id, tours, espace="sessions")
+
+    def historique(self, session_id: Optional[str], budget_tokens: int) -> list[dict]:
+        if not session_id:
+            return []
+        return _messages(self._cache.lire(session_id, espace="sessions", defaut=[]), budget_tokens)
+
+    def oublier(self, session_id: str) -> None:
+        with self._verrou:
+            self._cache.ecrire(session_id, [], ttl=-1, espace="sessions")  # Expirée aussitôt
+
+    def statistiques(self) -> dict:
+        # Sessions stockées (tous workers) ; la taille et les évictions ne sont suivies que par MemoireSessions
+        return {"sessions": self._cache.statistiques()["entrees"] or 0}
+
+
+# Mémoire partagée par toutes les requêtes (de tous les workers si MEMOIRE_PARTAGEE)
+memoire_sessions = MemoireSessionsPartagee() if MEMOIRE_PARTAGEE else MemoireSessions()
@@ -0,0 +1,178 @@
+import logging  # Pour suivre l'avancement du préchauffage dans le journal
+import os  # Pour relancer le préchauffage dans chaque worker (processus) créé par fork
+import threading  # Le préchauffage tourne en arrière-plan : le serveur répond déjà à /health/live
+import time  # Pour mesurer chaque étape
+from concurrent.futures import ThreadPoolExecutor, wait  # Pour poser les questions fréquentes en parallèle
+
+from app.config import (  # Réglages du préchauffage
+    PRECHAUFFAGE_ACTIF,
+    PRECHAUFFAGE_CONNEXIONS,
+    PRECHAUFFAGE_REQUETES_FICHIER,
+    PRECHAUFFAGE_MAX_REQUETES,
+    PRECHAUFFAGE_DELAI_MAX,
+)
+from utils.metriques import enregistrer_collecteur  # État du préchauffage exposé sur /metrics
+
+logger = logging.getLogger(__name__)  # Logger du module
+
+# Préchauffage d'un worker : tout ce que la première requête paierait sinon (imports de googlesearch,
+# wikipedia, bs4, SymPy..., construction du routeur, ouverture de l'index de connaissances, premières
+# connexions TCP+TLS) est fait au démarrage, en arrière-plan. Le worker ne se déclare prêt (/health/ready)
+# qu'ensuite : le répartiteur de charge ne lui envoie du trafic qu'une fois chaud.
+
+MESSAGES_PIPELINE = ("bonjour", "calcule 2*3", "calcule la dérivée de x^2")  # Routes locales (SymPy compris)
+PARALLELISME_REQUETES = 4  # Questions fréquentes posées en même temps
+
+
+def _importer() -> None:
+    import utils.monchatbot  # noqa: F401  Tout le pipeline (et ses bibliothèques)
+
+
+def _pipeline() -> None:
+    # Premiers passages dans le routeur, le moteur de calcul (import de SymPy) et la base de connaissances
+    from utils.knowledge import base_connaissances
+    from utils.monchatbot import obtenir_la_response
+
+    base_connaissances.synchroniser()
+    base_connaissances.demarrer_surveillance()  # Nouveaux documents pris en compte sans attendre une requête
+    for message in MESSAGES_PIPELINE:
+        obtenir_la_response(message)
+
+
+def _connexions() -> None:
+    from utils.Mistral_API import client_mistral
+    from utils.google_search import ouvrir_connexions
+    from utils.wikipedia_search import ouvrir_connexions as ouvrir_wikipedia
+
+    for nom, ouvrir in (
+        ("mistral", client_mistral.ouvrir_connexion), ("google", ouvrir_connexions), ("wikipedia", ouvrir_wikipedia),
+    ):
+        try:
+            ouvrir()
+        except Exception as e:  # Service injoignable : le worker peut quand même répondre (sans lui)
+            logger.warning(f"Préchauffage : connexion à {nom} impossible ({e})")
+
+
+def fermer_connexions() -> None:
+    # Worker créé par fork après préchargement : les connexions ouvertes par le processus maître
+    # ne doivent pas être partagées entre workers, chacun ouvre les siennes
+    from utils.Mistral_API import client_mistral
+    from utils.google_search import fermer_connexions as fermer_google
+    from utils.wikipedia_search import fermer_connexions as fermer_wikipedia
+
+    client_mistral.close()
+    fermer_google()
+    fermer_wikipedia()
+
+
+def lire_requetes(chemin: str, maximum: int) -> list[str]:
+    # Questions fréquentes : une par ligne, lignes vides et commentaires (#) ignorés
+    with open(chemin, encoding="utf-8") as f:
+        lignes = [ligne.strip() for ligne in f]
+    return [ligne for ligne in lignes if ligne and not ligne.startswith("#")][:maximum]
+
+
+class Prechauffage:
+    def __init__(
+        self,
+        actif: bool = PRECHAUFFAGE_ACTIF,
+        connexions: bool = PRECHAUFFAGE_CONNEXIONS,
+        fichier_requetes: str = PRECHAUFFAGE_REQUETES_FICHIER,
+        max_requetes: int = PRECHAUFFAGE_MAX_REQUETES,
+        delai_max: float = PRECHAUFFAGE_DELAI_MAX,
+    ):
+        self.actif = actif
+        self.connexions = connexions
+        self.fichier_requetes = fichier_requetes
+        self.max_requetes = max_requetes
+        self.delai_max = delai_max
+        self._verrou = threading.Lock()
+        self._pid = None  # Processus où le préchauffage a été lancé
+        self.seulement_dans_les_workers = False  # Serveur à workers créés par fork : rien dans le processus maître
+        self._reinitialiser()
+
+    def _reinitialiser(self) -> None:
+        self.pret = threading.Event()
+        self.etapes: dict[str, dict] = {}  # Nom -> {"ms": durée} ou {"erreur": message}, dans l'ordre
+        self.debut = time.monotonic()
+        self.duree = None
+        if not self.actif:
+            self.pret.set()  # Sans préchauffage, le worker est prêt tout de suite (et chauffe à la première requête)
+
+    def lancer_dans_les_workers(self) -> None:
+        # Appelé par la configuration de gunicorn, dans le processus maître : le chargement de l'application
+        # (GUNICORN_PRELOAD=1) ne lance plus de threads qui pourraient tenir un verrou (import, base de
+        # connaissances, SQLite...) au moment du fork ; chaque worker lance le sien (post_fork)
+        self.seulement_dans_les_workers = True
+
+    def lancer(self, en_arriere_plan: bool = True, dans_un_worker: bool = False) -> None:
+        # Lance le préchauffage une fois par processus : un worker créé par fork le relance pour lui-même
+        if self.seulement_dans_les_workers and not dans_un_worker:
+            return
+        with self._verrou:
+            if not self.actif or self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._reinitialiser()
+        if en_arriere_plan:
+            threading.Thread(target=self._executer, name="prechauffage", daemon=True).start()
+        else:
+            self._executer()
+
+    def _executer(self) -> None:
+        limite = self.debut + self.delai_max
+        etapes = [("imports", _importer), ("pipeline", _pipeline)]
+        if self.connexions:
+            etapes.append(("connexions", _connexions))
+        if self.fichier_requetes:
+            etapes.append(("caches", lambda: self._amorcer_caches(limite)))
+        try:
+            for nom, fonction in etapes:
+                if time.monotonic() >= limite:
+                    logger.warning(f"Préchauffage : délai de {self.delai_max:g} s dépassé, étape « {nom} » et suivantes sautées")
+                    break
+                debut = time.monotonic()
+                try:
+                    fonction()
+                    self.etapes[nom] = {"ms": round((time.monotonic() - debut) * 1000, 1)}
+                    logger.info(f"Préchauffage : {nom} en {self.etapes[nom]['ms']:.0f} ms")
+                except Exception as e:  # Une étape en échec n'empêche pas le worker de servir
+                    self.etapes[nom] = {"erreur": str(e)}
+                    logger.warning(f"Préchauffage : étape « {nom} » en échec ({e})", exc_info=True)
+        finally:
+            self.duree = time.monotonic() - self.debut
+            self.pret.set()
+            logger.info(f"Préchauffage terminé en {self.duree * 1000:.0f} ms : worker prêt")
+
+    def _amorcer_caches(self, limite: float) -> None:
+        # Pose les questions fréquentes : leurs réponses (Wikipédia, Mistral...) arrivent dans le cache partagé
+        from utils.monchatbot import obtenir_la_response
+
+        requetes = lire_requetes(self.fichier_requetes, self.max_requetes)
+        with ThreadPoolExecutor(max_workers=PARALLELISME_REQUETES, thread_name_prefix="prechauffage") as pool:
+            futures = [pool.submit(obtenir_la_response, requete) for requete in requetes]
+            _, restants = wait(futures, timeout=max(0.0, limite - time.monotonic()))
+            for future in restants:
+                future.cancel()  # Délai dépassé : les questions pas encore posées sont abandonnées
+        logger.info(f"Préchauffage : {len(requetes) - len(restants)}/{len(requetes)} questions fréquentes posées")
+
+    def est_pret(self) -> bool:
+        return self.pret.is_set()
+
+    def statistiques(self) -> dict:
+        duree = self.duree if self.duree is not None else time.monotonic() - self.debut
+        return {"actif": self.actif, "pret": self.est_pret(), "duree_ms": round(duree * 1000, 1), "etapes": dict(self.etapes)}
+
+
+prechauffage = Prechauffage()
+
+
+def _metriques_prechauffage():
+    stats = prechauffage.statistiques()
+    yield "# TYPE chatbot_pret gauge"
+    yield f"chatbot_pret {int(stats['pret'])}"
+    yield "# TYPE chatbot_prechauffage_duree_secondes gauge"
+    yield f"chatbot_prechauffage_duree_secondes {stats['duree_ms'] / 1000:g}"
+
+
+enregistrer_collecteur(_metriques_prechauffage)
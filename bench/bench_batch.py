@@ -0,0 +1,55 @@
+# Débit de /ask/batch contre une boucle de /ask séquentiels, pour un jeu de questions qui passent par
+# Mistral (faux serveur local avec latence) et contiennent des doublons, comme une FAQ rejouée.
+# Utilisation : python -m bench.bench_batch [nombre_de_messages]
+import json
+import os
+import random
+import sys
+import time
+
+from bench.serveurs_factices import faux_mistral
+
+
+def main():
+    nombre = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    alea = random.Random(1)
+    distincts = [f"calcule explique {a}x^2 + {b}" for a, b in ((alea.randint(1, 99), alea.randint(1, 99)) for _ in range(nombre))]
+    messages = [alea.choice(distincts[: int(nombre * 0.8)]) for _ in range(nombre)]  # ~20 % de doublons au moins
+
+    with faux_mistral(latence=0.1, taille_reponse=300) as mistral:
+        # La configuration est lue à l'import : on la fixe avant de charger l'application
+        os.environ["MISTRAL_API_URL"] = mistral.url + "/v1/chat/completions"
+        os.environ.setdefault("MISTRAL_API_KEY", "bench")
+        os.environ["LLM_CACHE_ACTIF"] = "0"  # Mesure le traitement, pas le cache
+        from app.app import app
+        from app.config import BATCH_WORKERS
+
+        client = app.test_client()
+
+        debut = time.perf_counter()
+        for message in messages:
+            client.post("/ask", json={"message": message}).close()  # Rend la place d'admission
+        sequentiel = time.perf_counter() - debut
+        appels_sequentiel = mistral.compteur
+
+        debut = time.perf_counter()
+        lignes = [json.loads(l) for l in client.post("/ask/batch", json=messages).get_data(as_text=True).splitlines()]
+        lot = time.perf_counter() - debut
+        appels_lot = mistral.compteur - appels_sequentiel
+
+    print(json.dumps({
+        "messages": nombre,
+        "distincts": len(set(messages)),
+        "workers": BATCH_WORKERS,
+        "sequentiel_messages_par_s": round(nombre / sequentiel, 1),
+        "batch_messages_par_s": round(nombre / lot, 1),
+        "gain": round(sequentiel / lot, 1),
+        "appels_mistral_sequentiel": appels_sequentiel,
+        "appels_mistral_batch": appels_lot,
+        "lignes_batch": len(lignes),
+        "erreurs_batch": sum("error" in l for l in lignes),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# Banc de charge reproductible : l'application tourne dans un vrai serveur HTTP, Mistral, l'API MediaWiki
+# et la recherche Google (avec les pages trouvées) sont remplacés par des faux serveurs locaux à latence,
+# taux d'erreur et taille de réponse réglables, et /ask reçoit un mélange réaliste de messages
+# (bench/corpus_charge.txt) à plusieurs niveaux de concurrence fixes.
+# Le résultat (débit, latences p50/p95/p99, taux d'erreur, appels aux services externes) est un JSON
+# stable, à enregistrer avec --sortie pour comparer deux commits.
+# Utilisation : python -m bench.bench_charge [--concurrence 1,8,32] [--requetes 300] [--sortie resultat.json] ...
+import argparse
+import itertools
+import json
+import logging
+import os
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from werkzeug.serving import make_server
+
+from bench.serveurs_factices import faux_hebergeur_pages, faux_mediawiki, faux_mistral
+
+CORPUS = os.path.join(os.path.dirname(__file__), "corpus_charge.txt")
+
+# Texte d'une réponse qui signale l'échec d'un service externe (l'application répond quand même 200)
+MARQUES_ERREUR = ("Erreur de requête", "Réponse inattendue", "Erreur Wikipédia", "Erreur Google", "Erreur de recherche", "Erreur mathématique")
+MARQUE_SANS_RESULTAT = "rien trouvé de pertinent"
+
+
+def _lire_corpus(chemin: str) -> list[tuple[str, int, str]]:
+    entrees = []
+    with open(chemin, encoding="utf-8") as f:
+        for ligne in f:
+            if ligne.strip() and not ligne.startswith("#"):
+                categorie, poids, message = ligne.rstrip("\n").split("\t")
+                entrees.append((categorie, int(poids), message))
+    return entrees
+
+
+def _messages(corpus: list[tuple[str, int, str]], nombre: int, graine: int) -> list[tuple[str, str]]:
+    # Tirage pondéré et déterministe ; les numéros de sujet suivent une loi de Zipf sur 1..1000
+    alea = random.Random(graine)
+    poids = [p for _, p, _ in corpus]
+    rangs = range(1, 1001)
+    poids_sujets = [1 / r for r in rangs]
+    tirage = []
+    for categorie, _, modele in alea.choices(corpus, weights=poids, k=nombre):
+        tirage.append((categorie, modele.replace("{n}", str(alea.choices(rangs, weights=poids_sujets)[0]))))
+    return tirage
+
+
+def _centile(valeurs_triees: list[float], p: float) -> float:
+    if not valeurs_triees:
+        return 0.0
+    return valeurs_triees[min(len(valeurs_triees) - 1, int(p / 100 * len(valeurs_triees)))]
+
+
+def _latences(durees: list[float]) -> dict:
+    durees = sorted(durees)
+    return {
+        "p50_ms": round(_centile(durees, 50) * 1000, 1),
+        "p95_ms": round(_centile(durees, 95) * 1000, 1),
+        "p99_ms": round(_centile(durees, 99) * 1000, 1),
+        "max_ms": round((durees[-1] if durees else 0.0) * 1000, 1),
+    }
+
+
+def _executer_niveau(url: str, messages: list[tuple[str, str]], concurrence: int, timeout: float) -> list[dict]:
+    # Boucle fermée : chaque client envoie son message suivant dès qu'il a reçu la réponse au précédent
+    local = threading.local()
+    suivant = iter(messages)
+    verrou = threading.Lock()
+    resultats = []
+
+    def client():
+        # Une session par client : connexion keep-alive et cookie de conversation, comme un navigateur
+        local.session = requests.Session()
+        while True:
+            with verrou:
+                element = next(suivant, None)
+            if element is None:
+                return
+            categorie, message = element
+            debut = time.perf_counter()
+            try:
+                response = local.session.post(url, json={"message": message}, timeout=timeout)
+                statut, texte = response.status_code, response.json().get("response", "")
+            except (requests.exceptions.RequestException, ValueError) as e:
+                statut, texte = None, type(e).__name__
+            duree = time.perf_counter() - debut
+            with verrou:
+                resultats.append({"categorie": categorie, "duree": duree, "statut": statut, "texte": texte})
+
+    with ThreadPoolExecutor(max_workers=concurrence) as pool:
+        for future in [pool.submit(client) for _ in range(concurrence)]:
+            future.result()
+    return resultats
+
+
+def _resumer(resultats: list[dict], duree: float) -> dict:
+    total = len(resultats)
+    erreurs_http = sum(1 for r in resultats if r["statut"] != 200)
+    en_erreur = sum(1 for r in resultats if r["statut"] == 200 and any(m in r["texte"] for m in MARQUES_ERREUR))
+    sans_resultat = sum(1 for r in resultats if r["statut"] == 200 and MARQUE_SANS_RESULTAT in r["texte"])
+    par_categorie = {}
+    for categorie, groupe in itertools.groupby(sorted(resultats, key=lambda r: r["categorie"]), key=lambda r: r["categorie"]):
+        groupe = list(groupe)
+        par_categorie[categorie] = {"requetes": len(groupe), **_latences([r["duree"] for r in groupe])}
+    return {
+        "requetes": total,
+        "duree_s": round(duree, 2),
+        "debit_rps": round(total / duree, 1) if duree else 0.0,
+        "latence": _latences([r["duree"] for r in resultats]),
+        "taux_erreur_http": round(erreurs_http / total, 4) if total else 0.0,
+        "taux_reponses_en_erreur": round(en_erreur / total, 4) if total else 0.0,  # Service externe en échec
+        "taux_sans_resultat": round(sans_resultat / total, 4) if total else 0.0,
+        "par_categorie": par_categorie,
+    }
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _difference(apres: dict, avant: dict) -> dict:
+    return {genre: nombre - avant.get(genre, 0) for genre, nombre in sorted(apres.items()) if nombre != avant.get(genre, 0)}
+
+
+def _arguments():
+    parser = argparse.ArgumentParser(description="Banc de charge de /ask contre des faux services externes.")
+    parser.add_argument("--concurrence", default="1,8,32", help="niveaux de concurrence, séparés par des virgules")
+    parser.add_argument("--requetes", type=int, default=300, help="requêtes envoyées par niveau")
+    parser.add_argument("--echauffement", type=int, default=20, help="requêtes non mesurées avant le premier niveau")
+    parser.add_argument("--graine", type=int, default=14)
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--sans-cache", action="store_true", help="désactive les caches Mistral et Wikipédia")
+    parser.add_argument("--timeout", type=float, default=60.0, help="délai maximal d'une requête du client (s)")
+    parser.add_argument("--latence-mistral", type=float, default=0.3)
+    parser.add_argument("--delai-token", type=float, default=0.0, help="délai entre deux tokens de Mistral (s)")
+    parser.add_argument("--taille-reponse", type=int, default=400, help="caractères d'une réponse de Mistral")
+    parser.add_argument("--latence-wikipedia", type=float, default=0.08)
+    parser.add_argument("--latence-recherche", type=float, default=0.15, help="latence de la recherche Google (s)")
+    parser.add_argument("--latence-page", type=float, default=0.1, help="latence des pages trouvées par Google (s)")
+    parser.add_argument("--taille-page", type=int, default=60_000, help="octets d'une page trouvée par Google")
+    parser.add_argument("--taux-erreur", type=float, default=0.0, help="part des requêtes en échec sur chaque faux service")
+    parser.add_argument("--sortie", help="fichier où écrire le résultat JSON (en plus de la sortie standard)")
+    return parser.parse_args()
+
+
+def main():
+    args = _arguments()
+    niveaux = [int(c) for c in args.concurrence.split(",") if c.strip()]
+    corpus = _lire_corpus(args.corpus)
+
+    mistral = faux_mistral(
+        latence=args.latence_mistral, taux_erreur=args.taux_erreur,
+        taille_reponse=args.taille_reponse, delai_token=args.delai_token,
+    )
+    wikipedia = faux_mediawiki(latence=args.latence_wikipedia, taux_erreur=args.taux_erreur)
+    google = faux_hebergeur_pages(
+        latence=args.latence_recherche, taux_erreur=args.taux_erreur, latence_page=args.latence_page,
+        taille_page=args.taille_page, taux_erreur_page=args.taux_erreur,
+    )
+    with mistral, wikipedia, google, tempfile.TemporaryDirectory() as dossier:
+        # La configuration est lue à l'import : on la fixe avant de charger l'application.
+        # Cache neuf à chaque exécution, pour que deux exécutions (ou deux commits) partent du même état.
+        os.environ.update({
+            "MISTRAL_API_URL": mistral.url + "/v1/chat/completions",
+            "MISTRAL_API_KEY": "bench",
+            "WIKIPEDIA_API_URL": wikipedia.url + "/w/api.php",
+            "GOOGLE_SEARCH_API_URL": google.url + "/customsearch/v1",
+            "GOOGLE_API_KEY": "bench",
+            "GOOGLE_CX": "bench",
+            "CACHE_DB_PATH": os.path.join(dossier, "cache.sqlite3"),
+        })
+        if args.sans_cache:
+            os.environ.update({"LLM_CACHE_ACTIF": "0", "WIKI_CACHE_TTL": "0", "WIKI_CACHE_TTL_NEGATIF": "0"})
+        from app.app import app
+
+        logging.disable(logging.WARNING)  # Journaux de l'application et du serveur : seules les erreurs restent
+        serveur = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=serveur.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{serveur.server_port}/ask"
+        services = {"mistral": mistral, "wikipedia": wikipedia, "google": google}
+
+        if args.echauffement:
+            _executer_niveau(url, _messages(corpus, args.echauffement, args.graine - 1), 1, args.timeout)
+
+        resultats = []
+        for concurrence in niveaux:
+            avant = {nom: service.compteurs for nom, service in services.items()}
+            debut = time.perf_counter()
+            mesures = _executer_niveau(url, _messages(corpus, args.requetes, args.graine + concurrence), concurrence, args.timeout)
+            duree = time.perf_counter() - debut
+            resultats.append({
+                "concurrence": concurrence,
+                **_resumer(mesures, duree),
+                "appels_amont": {nom: _difference(service.compteurs, avant[nom]) for nom, service in services.items()},
+            })
+        serveur.shutdown()
+
+    rapport = {
+        "commit": _commit(),
+        "parametres": {cle: valeur for cle, valeur in vars(args).items() if cle not in ("sortie", "corpus")},
+        "niveaux": resultats,
+    }
+    texte = json.dumps(rapport, indent=2, ensure_ascii=False)
+    print(texte)
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as f:
+            f.write(texte + "\n")
+
+
+if __name__ == "__main__":
+    main()
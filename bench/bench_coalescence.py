@@ -0,0 +1,108 @@
+# Rafale de questions identiques (un sujet à la mode) : nombre d'appels reçus par les faux services
+# Wikipédia, Google et Mistral, avec et sans regroupement des appels en cours, dans un processus
+# (threads) puis entre plusieurs processus qui partagent le cache SQLite (mode inter-processus).
+# Utilisation : python -m bench.bench_coalescence [requetes_simultanees] [processus]
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from bench.serveurs_factices import faux_hebergeur_pages, faux_mediawiki, faux_mistral
+
+
+def _rafale(fonction, nombre: int) -> float:
+    # `nombre` threads lancent `fonction` au même instant ; retourne la durée de la rafale
+    depart = threading.Barrier(nombre)
+
+    def client():
+        depart.wait()
+        fonction()
+
+    threads = [threading.Thread(target=client) for _ in range(nombre)]
+    debut = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - debut
+
+
+def _configurer(mistral, wikipedia, google, dossier: str) -> None:
+    # La configuration est lue à l'import : on la fixe avant de charger les modules (processus enfants compris)
+    os.environ.update({
+        "MISTRAL_API_URL": mistral.url + "/v1/chat/completions",
+        "MISTRAL_API_KEY": "bench",
+        "WIKIPEDIA_API_URL": wikipedia.url + "/w/api.php",
+        "GOOGLE_SEARCH_API_URL": google.url + "/customsearch/v1",
+        "GOOGLE_API_KEY": "bench",
+        "GOOGLE_CX": "bench",
+        "CACHE_DB_PATH": os.path.join(dossier, "cache.sqlite3"),
+        "COALESCENCE_DOSSIER": os.path.join(dossier, "verrous"),
+    })
+
+
+def _comparer(service, coalesceur, appel, nombre: int, genre: str) -> dict:
+    # Deux sujets différents (cache froid dans les deux cas), sans puis avec regroupement
+    resultats = {}
+    for mode, actif in (("sans_regroupement", False), ("avec_regroupement", True)):
+        coalesceur.actif = actif
+        avant = service.compteurs.get(genre, 0)
+        duree = _rafale(lambda: appel(mode), nombre)
+        resultats[mode] = {"appels_amont": service.compteurs.get(genre, 0) - avant, "duree_ms": round(duree * 1000)}
+    return resultats
+
+
+def _processus_enfant(depart, nombre: int, inter_processus: bool) -> None:
+    os.environ["COALESCENCE_INTER_PROCESSUS"] = "1" if inter_processus else "0"
+    from utils.wikipedia_search import recherche_wikipedia
+
+    depart.wait()  # Tous les processus sont prêts : la rafale part en même temps partout
+    _rafale(lambda: recherche_wikipedia(f"sujet à la mode {inter_processus}"), nombre)
+
+
+def main():
+    nombre = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    nb_processus = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    with faux_mistral(latence=0.3) as mistral, faux_mediawiki(latence=0.1) as wikipedia, \
+            faux_hebergeur_pages(latence=0.1, latence_page=0.1) as google, tempfile.TemporaryDirectory() as dossier:
+        _configurer(mistral, wikipedia, google, dossier)
+        from utils.Mistral_API import client_mistral
+        from utils.google_search import coalescence_google, recherche_google
+        from utils.wikipedia_search import coalescence_wikipedia, recherche_wikipedia
+
+        # 1) Threads d'un même processus
+        resultats = {
+            "requetes_simultanees": nombre,
+            "wikipedia": _comparer(wikipedia, coalescence_wikipedia, lambda m: recherche_wikipedia(f"tour eiffel {m}"), nombre, "search"),
+            "mistral": _comparer(mistral, client_mistral.coalescence, lambda m: client_mistral.chat(f"explique la photosynthèse {m}"), nombre, "chat"),
+        }
+        # Google : le regroupement couvre la recherche et les pages, Mistral regroupe ensuite le résumé
+        resultats["google"] = _comparer(google, coalescence_google, lambda m: recherche_google(f"prix du pain {m}"), nombre, "recherche")
+        resultats["google"]["resume_mistral_appels"] = mistral.compteurs.get("chat", 0) - sum(
+            mode["appels_amont"] for mode in resultats["mistral"].values())
+
+        # 2) Plusieurs processus (comme des workers gunicorn) partageant le cache et les verrous fichiers
+        contexte = multiprocessing.get_context("spawn")
+        resultats["processus"] = {"processus": nb_processus, "requetes_par_processus": nombre // nb_processus}
+        for inter_processus in (False, True):
+            depart = contexte.Barrier(nb_processus + 1)
+            enfants = [
+                contexte.Process(target=_processus_enfant, args=(depart, nombre // nb_processus, inter_processus))
+                for _ in range(nb_processus)
+            ]
+            for enfant in enfants:
+                enfant.start()
+            avant = wikipedia.compteurs.get("search", 0)
+            depart.wait()
+            for enfant in enfants:
+                enfant.join()
+            mode = "inter_processus" if inter_processus else "par_processus"
+            resultats["processus"][f"wikipedia_appels_{mode}"] = wikipedia.compteurs.get("search", 0) - avant
+    print(json.dumps(resultats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
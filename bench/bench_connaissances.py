@@ -0,0 +1,120 @@
+# Base de connaissances à grande échelle : construction de l'index, réouverture (mmap, sans retokeniser),
+# latence des recherches, mémoire Python et réindexation incrémentale après modification d'un fichier.
+# Utilisation : python -m bench.bench_connaissances [nombre_de_documents]
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from utils.knowledge import BaseConnaissances
+
+DOCS_PAR_FICHIER = 500
+
+
+def _vocabulaire(taille: int, alea: random.Random) -> list[str]:
+    syllabes = ["ba", "ce", "di", "fo", "gu", "la", "me", "ni", "po", "ra", "si", "tu", "vo", "ze", "on", "ar"]
+    mots = set()
+    while len(mots) < taille:
+        mots.add("".join(alea.choice(syllabes) for _ in range(alea.randint(2, 4))))
+    return sorted(mots)
+
+
+def _generer(dossier: str, nombre: int, graine: int = 3) -> list[str]:
+    # Documents de ~60 mots tirés selon une loi de Zipf (quelques mots très fréquents, beaucoup de mots rares)
+    alea = random.Random(graine)
+    vocabulaire = _vocabulaire(30000, alea)
+    poids = [1 / (rang + 1) for rang in range(len(vocabulaire))]
+    titres = []
+    for debut in range(0, nombre, DOCS_PAR_FICHIER):
+        documents = []
+        for _ in range(min(DOCS_PAR_FICHIER, nombre - debut)):
+            titre = " ".join(alea.choices(vocabulaire[500:], k=3))
+            contenu = " ".join(alea.choices(vocabulaire, weights=poids, k=60))
+            documents.append({"titre": titre, "contenu": contenu})
+            titres.append(titre)
+        with open(os.path.join(dossier, f"docs-{debut // DOCS_PAR_FICHIER:05d}.json"), "w", encoding="utf-8") as f:
+            json.dump(documents, f)
+    return titres
+
+
+def _percentile(valeurs: list[float], p: float) -> float:
+    valeurs = sorted(valeurs)
+    return valeurs[min(len(valeurs) - 1, int(p / 100 * len(valeurs)))]
+
+
+def _rss_mo() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for ligne in f:
+                if ligne.startswith("VmRSS:"):
+                    return int(ligne.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def main():
+    nombre = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as racine:
+        documents, index = os.path.join(racine, "documents"), os.path.join(racine, "index")
+        os.makedirs(documents)
+        titres = _generer(documents, nombre)
+
+        debut = time.perf_counter()
+        BaseConnaissances(documents, index).synchroniser()
+        construction = time.perf_counter() - debut
+        taille_index = sum(os.path.getsize(os.path.join(index, nom)) for nom in os.listdir(index))
+
+        # Nouveau démarrage : l'index est seulement mappé
+        rss_avant = _rss_mo()
+        tracemalloc.start()
+        debut = time.perf_counter()
+        base = BaseConnaissances(documents, index, intervalle_scan=3600)
+        base.synchroniser()
+        ouverture = time.perf_counter() - debut
+        memoire_ouverture = tracemalloc.get_traced_memory()[0]
+
+        alea = random.Random(5)
+        questions = [alea.choice(titres) for _ in range(500)]
+        latences, trouves = [], 0
+        for question in questions:
+            debut = time.perf_counter()
+            meilleure = base.meilleure_reponse(question)
+            latences.append(time.perf_counter() - debut)
+            trouves += meilleure is not None and meilleure.titre == question
+        _, pic_requetes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rss_apres = _rss_mo()
+
+        # Réindexation incrémentale : un seul fichier modifié sur tout le dossier
+        premier = os.path.join(documents, "docs-00000.json")
+        with open(premier, encoding="utf-8") as f:
+            contenu = json.load(f)
+        contenu[0]["contenu"] += " mise à jour"
+        with open(premier, "w", encoding="utf-8") as f:
+            json.dump(contenu, f)
+        debut = time.perf_counter()
+        base.synchroniser()
+        incremental = time.perf_counter() - debut
+
+        print(json.dumps({
+            "documents": len(base),
+            "construction_s": round(construction, 2),
+            "taille_index_mo": round(taille_index / 1e6, 1),
+            "ouverture_ms": round(ouverture * 1e3, 1),
+            "memoire_python_ouverture_ko": round(memoire_ouverture / 1e3, 1),
+            "pic_memoire_python_requetes_mo": round(pic_requetes / 1e6, 2),
+            "rss_ouverture_et_requetes_mo": round(rss_apres - rss_avant, 1),
+            "recherche_p50_ms": round(_percentile(latences, 50) * 1e3, 2),
+            "recherche_p95_ms": round(_percentile(latences, 95) * 1e3, 2),
+            "recherche_p99_ms": round(_percentile(latences, 99) * 1e3, 2),
+            "bonnes_reponses": f"{trouves}/{len(questions)}",
+            "reindexation_un_fichier_ms": round(incremental * 1e3, 1),
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
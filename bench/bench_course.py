@@ -0,0 +1,81 @@
+# Message sans mot-clé : latence jusqu'à une vraie réponse, avant (suggestion, puis l'utilisateur redemande
+# sur Wikipédia et, faute de résultat, sur Google) et avec la recherche en parallèle (sans préférence, puis
+# en préférant Wikipédia pendant une fenêtre de grâce). Faux services : une part des sujets est absente de
+# Wikipédia, Google est plus lent (recherche + pages) et sa réponse passe ensuite par Mistral.
+# Mesures : latences p50/p95/p99, part des messages avec réponse, issues des courses, appels aux services.
+# Utilisation : python -m bench.bench_course [messages]
+import json
+import os
+import sys
+import tempfile
+import time
+
+from bench.serveurs_factices import faux_hebergeur_pages, faux_mediawiki, faux_mistral
+
+SUJETS = ("la photosynthèse", "le volcan etna", "les trous noirs", "la révolution française", "le jazz manouche")
+
+
+def _centiles(durees: list[float]) -> dict:
+    durees = sorted(durees)
+    rang = lambda p: durees[min(len(durees) - 1, int(p / 100 * len(durees)))]  # noqa: E731
+    return {"p50_ms": round(rang(50) * 1000), "p95_ms": round(rang(95) * 1000), "p99_ms": round(rang(99) * 1000)}
+
+
+def _mesurer(nombre: int, mode: str, repondre, services) -> dict:
+    avant = [service.compteurs for service in services]
+    durees, trouvees = [], 0
+    for i in range(nombre):
+        sujet = f"{SUJETS[i % len(SUJETS)]} {mode} {i}"  # Sujet neuf : aucun cache ne répond à la place du service
+        debut = time.perf_counter()
+        texte = repondre(sujet)
+        durees.append(time.perf_counter() - debut)
+        trouvees += "Voici ce que j'ai trouvé" in texte
+    appels = {}
+    for service, compteurs in zip(services, avant):
+        for genre, total in service.compteurs.items():
+            if total - compteurs.get(genre, 0):
+                appels[genre] = total - compteurs.get(genre, 0)
+    return {"messages": nombre, "avec_reponse": trouvees, **_centiles(durees), "appels_amont": appels}
+
+
+def main():
+    nombre = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    with faux_mistral(latence=0.3) as mistral, faux_mediawiki(latence=0.15, taux_absent=0.3) as wikipedia, \
+            faux_hebergeur_pages(latence=0.15, latence_page=0.2) as google, tempfile.TemporaryDirectory() as dossier:
+        # La configuration est lue à l'import : on la fixe avant de charger les modules
+        os.environ.update({
+            "MISTRAL_API_URL": mistral.url + "/v1/chat/completions",
+            "MISTRAL_API_KEY": "bench",
+            "WIKIPEDIA_API_URL": wikipedia.url + "/w/api.php",
+            "GOOGLE_SEARCH_API_URL": google.url + "/customsearch/v1",
+            "GOOGLE_API_KEY": "bench",
+            "GOOGLE_CX": "bench",
+            "CACHE_DB_PATH": os.path.join(dossier, "cache.sqlite3"),
+            "KNOWLEDGE_ACTIF": "0",
+        })
+        import logging
+        logging.disable(logging.WARNING)
+        from utils.monchatbot import course_defaut, obtenir_la_response
+
+        def deux_requetes(sujet: str) -> str:
+            # Comportement d'avant : l'utilisateur redemande sur Wikipédia, puis sur Google s'il n'y a rien
+            texte = obtenir_la_response(f"wikipedia {sujet}")
+            if "Voici ce que j'ai trouvé" not in texte:
+                texte = obtenir_la_response(f"google {sujet}")
+            return texte
+
+        services = (wikipedia, google, mistral)
+        resultats = {"avant_deux_requetes": _mesurer(nombre, "avant", deux_requetes, services)}
+        for mode, preferee, grace in (("parallele_sans_preference", None, 0.0), ("parallele_preference_wikipedia", "wikipedia", 0.3)):
+            course_defaut.preferee, course_defaut.grace = preferee, grace
+            issues_avant = course_defaut.statistiques()
+            resultats[mode] = _mesurer(nombre, mode, obtenir_la_response, services)
+            resultats[mode]["issues"] = {
+                issue: total - issues_avant.get(issue, 0)
+                for issue, total in course_defaut.statistiques().items() if total - issues_avant.get(issue, 0)
+            }
+    print(json.dumps(resultats, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# Extraction des paragraphes d'une page : ancienne méthode (page entière décodée puis analysée par
+# BeautifulSoup/html.parser) contre lecture en flux avec arrêt anticipé, sur un corpus de pages HTML locales.
+# Mesure le temps CPU et le pic de mémoire Python par page.
+# Utilisation : python -m bench.bench_extraction_html [dossier_de_pages.html]
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+from utils.extraction_html import etree, extraire_paragraphes
+
+TAILLE_MORCEAU = 16 * 1024  # Comme dans google_search
+
+
+def _page_synthetique(taille_ko: int) -> bytes:
+    # Page « lourde » typique : gros <head> (scripts, styles), menu, puis le contenu et beaucoup de bas de page
+    script = "<script>" + "var donnees = {cle: 'valeur', liste: [1, 2, 3]};" * 200 + "</script>"
+    style = "<style>" + ".bloc { margin: 0; padding: 4px; color: #333; }" * 200 + "</style>"
+    menu = "<nav><ul>" + "".join(f"<li><a href='/rubrique/{i}'>Rubrique {i}</a></li>" for i in range(150)) + "</ul></nav>"
+    texte = "Ce paragraphe décrit le sujet recherché avec assez de détails pour être retenu par l'extraction."
+    corps = "".join(f"<p>{texte} <b>Partie {i}</b>, suite du texte.</p>" for i in range(12))
+    remplissage = "<div class='commentaire'><p>Un commentaire de lecteur sur la page.</p></div>"
+    debut = f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>Page de {taille_ko} Ko</title>{script}{style}</head><body>{menu}{corps}"
+    page = debut.encode("utf-8")
+    bas = remplissage.encode("utf-8")
+    repetitions = max(0, (taille_ko * 1024 - len(page)) // len(bas))
+    return page + bas * repetitions + b"</body></html>"
+
+
+def _corpus(dossier) -> dict[str, bytes]:
+    if dossier:
+        pages = {}
+        for nom in sorted(os.listdir(dossier)):
+            if nom.endswith((".html", ".htm")):
+                with open(os.path.join(dossier, nom), "rb") as f:
+                    pages[nom] = f.read()
+        return pages
+    return {f"synthetique_{taille}ko": _page_synthetique(taille) for taille in (50, 300, 1000, 3000)}
+
+
+def _ancienne(page: bytes):
+    soup = BeautifulSoup(page.decode("utf-8", errors="replace"), "html.parser")
+    paragraphes = soup.find_all("p")
+    return [p.get_text(strip=True) for p in paragraphes[:4] if len(p.get_text(strip=True)) > 60]
+
+
+def _nouvelle(page: bytes):
+    morceaux = (page[i:i + TAILLE_MORCEAU] for i in range(0, len(page), TAILLE_MORCEAU))
+    return extraire_paragraphes(morceaux)[0]
+
+
+def _mesurer(fonction, page: bytes, repetitions: int = 5) -> tuple[float, int, int]:
+    # (temps CPU moyen en s, pic de mémoire Python en octets, nombre de paragraphes trouvés)
+    gc.collect()  # Les arbres BeautifulSoup précédents (cycles) ne doivent pas être libérés pendant la mesure
+    debut = time.process_time()
+    for _ in range(repetitions):
+        resultat = fonction(page)
+    cpu = (time.process_time() - debut) / repetitions
+    tracemalloc.start()
+    fonction(page)
+    pic = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return cpu, pic, len(resultat)
+
+
+def main():
+    dossier = sys.argv[1] if len(sys.argv) > 1 else None
+    resultats = {"analyseur": "lxml" if etree is not None else "html.parser", "pages": {}}
+    for nom, page in _corpus(dossier).items():
+        cpu_avant, pic_avant, n_avant = _mesurer(_ancienne, page)
+        cpu_apres, pic_apres, n_apres = _mesurer(_nouvelle, page)
+        resultats["pages"][nom] = {
+            "taille_ko": round(len(page) / 1024),
+            "avant_cpu_ms": round(cpu_avant * 1e3, 2),
+            "apres_cpu_ms": round(cpu_apres * 1e3, 2),
+            "avant_pic_memoire_ko": round(pic_avant / 1024),
+            "apres_pic_memoire_ko": round(pic_apres / 1024),
+            "paragraphes_avant_apres": [n_avant, n_apres],
+        }
+    print(json.dumps(resultats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# Compare le temps de récupération du contenu des résultats Google : ancienne boucle séquentielle
+# contre téléchargement parallèle avec délai global, sur des pages locales lentes/rapides.
+# Utilisation : python -m bench.bench_google_pages
+import json
+import threading
+import time
+
+from bench.serveurs_factices import faux_hebergeur_pages
+from utils.google_search import extraire_page, recuperer_contenu
+
+SCENARIOS = {
+    # Nom -> liste de (genre, délai en ms), dans l'ordre du classement Google
+    "deux_lents_puis_rapide": [("page", 6000), ("page", 6000), ("page", 50)],
+    "premier_vide_et_lent": [("vide", 2000), ("page", 100), ("page", 80)],
+    "premier_rapide": [("page", 50), ("page", 3000), ("page", 3000)],
+    "classement_serre": [("page", 120), ("page", 100), ("page", 2000)],
+}
+
+
+def _sequentiel(urls: list[str]):
+    # Ancien comportement : une page après l'autre, 5 s maximum chacune
+    for url in urls:
+        try:
+            trouve = extraire_page(url, threading.Event())
+            if trouve:
+                return url
+        except Exception:
+            pass
+    return None
+
+
+def main():
+    resultats = {}
+    with faux_hebergeur_pages() as hote:
+        for nom, pages in SCENARIOS.items():
+            urls = [f"{hote.url}/{genre}/{delai}/{i}" for i, (genre, delai) in enumerate(pages)]
+
+            debut = time.perf_counter()
+            gagnant_seq = _sequentiel(urls)
+            duree_seq = time.perf_counter() - debut
+
+            debut = time.perf_counter()
+            trouve = recuperer_contenu(urls)
+            duree_par = time.perf_counter() - debut
+
+            resultats[nom] = {
+                "sequentiel_ms": round(duree_seq * 1000),
+                "parallele_ms": round(duree_par * 1000),
+                "rang_sequentiel": urls.index(gagnant_seq) if gagnant_seq else None,
+                "rang_parallele": urls.index(trouve[0]) if trouve else None,
+            }
+    print(json.dumps(resultats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
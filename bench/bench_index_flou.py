@@ -0,0 +1,69 @@
+# Coût d'une recherche approximative selon la taille du vocabulaire : difflib.get_close_matches
+# (balayage de toutes les phrases) contre IndexFlou (suppressions symétriques).
+# Utilisation : python -m bench.bench_index_flou [tailles...]
+import json
+import random
+import string
+import sys
+import time
+from difflib import get_close_matches
+
+from utils.index_flou import IndexFlou
+
+
+def _vocabulaire(taille: int, graine: int = 7) -> list[str]:
+    # Phrases synthétiques de 4 à 14 caractères, comme les salutations et les mots-clés
+    alea = random.Random(graine)
+    lettres = string.ascii_lowercase + "éèàç "
+    phrases = set()
+    while len(phrases) < taille:
+        phrases.add("".join(alea.choice(lettres) for _ in range(alea.randint(4, 14))).strip() or "x")
+    return sorted(phrases)
+
+
+def _requetes(vocabulaire: list[str], nombre: int = 200, graine: int = 11) -> list[str]:
+    # Moitié de phrases avec une faute (lettre remplacée), moitié de textes absents du vocabulaire
+    alea = random.Random(graine)
+    requetes = []
+    for i in range(nombre):
+        if i % 2 == 0:
+            phrase = alea.choice(vocabulaire)
+            position = alea.randrange(len(phrase))
+            requetes.append(phrase[:position] + "q" + phrase[position + 1:])
+        else:
+            requetes.append("".join(alea.choice(string.ascii_lowercase) for _ in range(alea.randint(4, 14))))
+    return requetes
+
+
+def _mesurer(fonction, requetes: list[str]) -> float:
+    debut = time.perf_counter()
+    for requete in requetes:
+        fonction(requete)
+    return (time.perf_counter() - debut) / len(requetes)
+
+
+def main():
+    tailles = [int(t) for t in sys.argv[1:]] or [30, 300, 3000, 10000]
+    resultats = []
+    for taille in tailles:
+        vocabulaire = _vocabulaire(taille)
+        requetes = _requetes(vocabulaire)
+
+        debut = time.perf_counter()
+        index = IndexFlou(seuil=0.8)
+        index.ajouter_tout(vocabulaire)
+        construction = time.perf_counter() - debut
+
+        difflib_s = _mesurer(lambda r: get_close_matches(r, vocabulaire, n=1, cutoff=0.8), requetes)
+        index_s = _mesurer(index.chercher, requetes)
+        resultats.append({
+            "phrases": taille,
+            "difflib_us_par_recherche": round(difflib_s * 1e6, 1),
+            "index_us_par_recherche": round(index_s * 1e6, 1),
+            "construction_index_ms": round(construction * 1e3, 1),
+        })
+    print(json.dumps(resultats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
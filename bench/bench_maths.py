@@ -0,0 +1,52 @@
+# Part des questions de maths traitées localement (sans Mistral) et leur latence, sur bench/corpus_maths.txt.
+# Utilisation : python -m bench.bench_maths [corpus]
+import json
+import os
+import statistics
+import sys
+import time
+
+from utils.moteur_maths import resoudre_localement
+
+CORPUS = os.path.join(os.path.dirname(__file__), "corpus_maths.txt")
+
+
+def _ms(valeurs: list[float], centile: int) -> float:
+    if len(valeurs) < 2:
+        return round(valeurs[0] * 1000, 3) if valeurs else 0.0
+    return round(statistics.quantiles(valeurs, n=100)[centile - 1] * 1000, 3)
+
+
+def main():
+    chemin = sys.argv[1] if len(sys.argv) > 1 else CORPUS
+    with open(chemin, encoding="utf-8") as f:
+        questions = [l.strip() for l in f if l.strip() and not l.startswith("#")]
+
+    debut = time.perf_counter()
+    resoudre_localement("dérivée de x^2")  # Premier appel : import de SymPy, mesuré à part
+    premier_appel = time.perf_counter() - debut
+
+    locales, mistral, non_traitees = [], [], []
+    for question in questions:
+        debut = time.perf_counter()
+        reponse = resoudre_localement(question) if "explique" not in question else None
+        duree = time.perf_counter() - debut
+        if reponse is None:
+            mistral.append(duree)
+            non_traitees.append(question)
+        else:
+            locales.append(duree)
+
+    print(json.dumps({
+        "questions": len(questions),
+        "part_locale": round(len(locales) / len(questions), 3),
+        "local_p50_ms": _ms(locales, 50),
+        "local_p99_ms": _ms(locales, 99),
+        "echec_local_p50_ms": _ms(mistral, 50),  # Coût ajouté avant l'appel à Mistral
+        "import_sympy_ms": round(premier_appel * 1000, 1),
+        "envoyees_a_mistral": non_traitees,
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Mémoire des conversations sous charge : mémoire Python réelle pour 10 000 sessions pleines,
+# mémoire stable quand bien plus de sessions arrivent que le plafond n'en autorise (éviction LRU),
+# et coût de construction de l'historique envoyé à Mistral.
+# Utilisation : python -m bench.bench_memoire [sessions]
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from app.memory import MemoireSessions
+
+QUESTION = "Et peux-tu m'expliquer la suite de ce calcul avec un exemple ?"  # ~60 caractères
+REPONSE = "La dérivée de x^2 est 2x : on applique la règle de puissance. " * 6  # ~400 caractères
+
+
+def _remplir(memoire: MemoireSessions, debut: int, nombre: int, tours: int) -> None:
+    for s in range(debut, debut + nombre):
+        for t in range(tours):
+            memoire.ajouter(f"session-{s:08d}", f"{QUESTION} {t}", f"{REPONSE} {t}")
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    resultats = {}
+
+    # 1) Sessions pleines (8 échanges), aucune éviction
+    tracemalloc.start()
+    avant = tracemalloc.get_traced_memory()[0]
+    memoire = MemoireSessions(max_tours=8, max_sessions=sessions, max_octets=1 << 40)
+    _remplir(memoire, 0, sessions, tours=12)  # 12 échanges : le tampon circulaire n'en garde que 8
+    reel = tracemalloc.get_traced_memory()[0] - avant
+    resultats["sessions_pleines"] = {
+        "sessions": sessions,
+        "memoire_reelle_mo": round(reel / 1e6, 1),
+        "memoire_estimee_mo": round(memoire.statistiques()["octets_estimes"] / 1e6, 1),
+        "par_session_ko": round(reel / sessions / 1024, 2),
+    }
+
+    # Construction de l'historique (budget de 1000 tokens) pour des sessions prises au hasard
+    alea = random.Random(2)
+    debut = time.perf_counter()
+    for _ in range(20000):
+        memoire.historique(f"session-{alea.randrange(sessions):08d}", 1000)
+    resultats["historique_us"] = round((time.perf_counter() - debut) / 20000 * 1e6, 1)
+    resultats["messages_dans_le_budget"] = len(memoire.historique("session-00000000", 1000))
+    del memoire
+
+    # 2) Dix fois plus de sessions que le plafond : la mémoire reste bornée
+    base = tracemalloc.get_traced_memory()[0]
+    memoire = MemoireSessions(max_tours=8, max_sessions=sessions)
+    paliers = []
+    for palier in range(10):
+        _remplir(memoire, palier * sessions, sessions, tours=3)
+        paliers.append(round((tracemalloc.get_traced_memory()[0] - base) / 1e6, 1))
+    tracemalloc.stop()
+    resultats["flux_continu"] = {
+        "sessions_creees": 10 * sessions,
+        "plafond_sessions": sessions,
+        "memoire_mo_par_palier": paliers,
+        **memoire.statistiques(),
+    }
+    print(json.dumps(resultats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# Surcoût des mesures sur le chemin critique : coût d'une étape chronométrée et d'une requête tracée,
+# comparé au traitement d'un message rapide (salutation, calcul local), seul et à travers /ask.
+# Utilisation : python -m bench.bench_metriques [répétitions]
+import json
+import sys
+import time
+
+from app.app import app
+from utils.metriques import etape, marquer_route, tracer_requete
+from utils.monchatbot import obtenir_la_response
+
+
+def _par_appel(fonction, repetitions: int) -> float:
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        fonction()
+    return (time.perf_counter() - debut) / repetitions
+
+
+def _etape():
+    with etape("bench"):
+        pass
+
+
+def _requete_tracee():
+    # Ce que /ask ajoute à un message : une trace, la route et trois étapes
+    with tracer_requete("/bench"):
+        marquer_route("bench")
+        for _ in range(3):
+            with etape("bench"):
+                pass
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    etape_s = _par_appel(_etape, repetitions)
+    trace_s = _par_appel(_requete_tracee, repetitions)
+    messages = {
+        "salutation": _par_appel(lambda: obtenir_la_response("bonjour"), repetitions // 10),
+        "calcul_local": _par_appel(lambda: obtenir_la_response("calcule 12*7"), repetitions // 10),
+    }
+    app.logger.disabled = True
+    client = app.test_client()
+    ask_s = _par_appel(lambda: client.post("/ask", json={"message": "bonjour"}).close(), repetitions // 100)
+    print(json.dumps({
+        "etape_us": round(etape_s * 1e6, 2),
+        "requete_tracee_us": round(trace_s * 1e6, 2),
+        "messages_us": {nom: round(s * 1e6, 1) for nom, s in messages.items()},
+        "ask_salutation_us": round(ask_s * 1e6, 1),
+        "part_des_mesures_dans_ask": f"{100 * trace_s / ask_s:.1f} %",
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
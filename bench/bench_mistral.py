@@ -0,0 +1,54 @@
+# Compare la latence p50/p99 des appels Mistral avant (requests.post nu, nouvelle connexion à chaque appel)
+# et après (MistralClient avec pool de connexions), contre un faux serveur local.
+# Utilisation : python -m bench.bench_mistral [nombre_appels] [concurrence]
+import json
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bench.serveurs_factices import faux_mistral
+from utils.Mistral_API import MistralClient, SYSTEM_PROMPT
+
+
+def _percentiles(durees: list[float]) -> dict:
+    durees = sorted(durees)
+    q = statistics.quantiles(durees, n=100)
+    return {"p50_ms": round(q[49] * 1000, 2), "p99_ms": round(q[98] * 1000, 2), "n": len(durees)}
+
+
+def _appel_nu(url: str, prompt: str) -> str:
+    # Reproduit l'ancienne implémentation : ni session, ni timeout, ni nouvelle tentative
+    data = {"model": "mistral-small", "messages": [
+        {"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}]}
+    response = requests.post(url, headers={"Authorization": "Bearer test"}, json=data)
+    response.raise_for_status()
+    return response.json()["choices"][0]["message"]["content"]
+
+
+def _mesurer(fonction, nombre: int, concurrence: int) -> list[float]:
+    def une_mesure(i):
+        debut = time.perf_counter()
+        fonction(f"question {i}")
+        return time.perf_counter() - debut
+
+    with ThreadPoolExecutor(max_workers=concurrence) as pool:
+        return list(pool.map(une_mesure, range(nombre)))
+
+
+def main():
+    nombre = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    concurrence = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    with faux_mistral(latence=0.0) as serveur:
+        url = serveur.url + "/v1/chat/completions"
+        avant = _mesurer(lambda p: _appel_nu(url, p), nombre, concurrence)
+        client = MistralClient(api_key="test", url=url, max_concurrence=concurrence)
+        apres = _mesurer(client.chat, nombre, concurrence)
+        client.close()
+    print(json.dumps({"avant": _percentiles(avant), "apres": _percentiles(apres)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# Démarrage d'un worker et latence de la première requête, sans puis avec préchauffage (et avec amorçage
+# du cache par les questions fréquentes) : chaque worker est un nouveau processus, contre des faux services.
+# Mesures : temps jusqu'à /health/live (démarrage), jusqu'à /health/ready (prêt), puis première et
+# deuxième requête de chaque route (la deuxième montre la latence « chaude »).
+# Utilisation : python -m bench.bench_prechauffage
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from bench.serveurs_factices import faux_mediawiki, faux_mistral
+
+# Par route : (première question, deuxième question) ; la deuxième est différente pour ne pas toucher le cache
+QUESTIONS = {
+    "maths_sympy": ("calcule la dérivée de x^3 + 2x", "calcule la dérivée de x^4 + 5x"),
+    "wikipedia": ("wikipedia tour eiffel", "wikipedia arc de triomphe"),
+    "mistral": ("calcule explique l'intégrale de x^2", "calcule explique l'intégrale de x^3"),
+}
+
+
+def _port_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _attendre(url: str, debut: float, limite: float = 60.0) -> float:
+    # Secondes écoulées depuis `debut` jusqu'à la première réponse 200 de `url`
+    while time.perf_counter() - debut < limite:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return time.perf_counter() - debut
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(url)
+
+
+def _demander(base: str, message: str) -> float:
+    debut = time.perf_counter()
+    requests.post(base + "/ask", json={"message": message}, timeout=60).raise_for_status()
+    return round((time.perf_counter() - debut) * 1000, 1)
+
+
+def _mesurer_worker(env: dict) -> dict:
+    port = _port_libre()
+    base = f"http://127.0.0.1:{port}"
+    debut = time.perf_counter()
+    worker = subprocess.Popen([sys.executable, "-m", "bench.bench_prechauffage", "--serveur", str(port)], env=env)
+    try:
+        resultat = {
+            "demarrage_ms": round(_attendre(base + "/health/live", debut) * 1000, 1),
+            "pret_ms": round(_attendre(base + "/health/ready", debut) * 1000, 1),
+        }
+        for route, (premiere, deuxieme) in QUESTIONS.items():
+            resultat[route] = {"premiere_ms": _demander(base, premiere), "deuxieme_ms": _demander(base, deuxieme)}
+        return resultat
+    finally:
+        worker.terminate()
+        worker.wait()
+
+
+def _servir(port: int) -> None:
+    import logging
+    from werkzeug.serving import make_server
+
+    from app.app import app
+
+    logging.disable(logging.INFO)
+    make_server("127.0.0.1", port, app, threaded=True).serve_forever()
+
+
+def main():
+    with faux_mistral(latence=0.2) as mistral, faux_mediawiki(latence=0.05) as wikipedia, tempfile.TemporaryDirectory() as dossier:
+        fichier_requetes = os.path.join(dossier, "requetes_frequentes.txt")
+        with open(fichier_requetes, "w", encoding="utf-8") as f:
+            f.write("\n".join(premiere for premiere, _ in QUESTIONS.values()) + "\n")
+        commun = {
+            **os.environ,
+            "MISTRAL_API_URL": mistral.url + "/v1/chat/completions",
+            "MISTRAL_API_KEY": "bench",
+            "WIKIPEDIA_API_URL": wikipedia.url + "/w/api.php",
+        }
+        modes = {
+            "sans_prechauffage": {"PRECHAUFFAGE_ACTIF": "0"},
+            "prechauffage": {"PRECHAUFFAGE_ACTIF": "1"},
+            "prechauffage_et_caches": {"PRECHAUFFAGE_ACTIF": "1", "PRECHAUFFAGE_REQUETES_FICHIER": fichier_requetes},
+        }
+        resultats = {}
+        for nom, reglages in modes.items():
+            # Cache neuf pour chaque worker : seule la configuration change d'un mode à l'autre
+            env = {**commun, **reglages, "CACHE_DB_PATH": os.path.join(dossier, f"{nom}.sqlite3")}
+            resultats[nom] = _mesurer_worker(env)
+    print(json.dumps(resultats, indent=2))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--serveur":
+        _servir(int(sys.argv[2]))
+    else:
+        main()
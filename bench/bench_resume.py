@@ -0,0 +1,88 @@
+# Résumé extractif local avant Mistral, sur un corpus de pages enregistrées (bench/corpus_pages, ou un dossier
+# donné avec son fichier requetes.txt) : les paragraphes sont extraits comme dans la recherche Google, puis le
+# prompt est construit avec le texte brut (avant) ou avec les phrases gardées par le résumé (après).
+# Mesures : tokens estimés du prompt, coût du résumé, définitions données sans Mistral, et latence de la
+# réponse avec un faux Mistral dont la lecture du prompt coûte un temps fixe par token (modèle linéaire).
+# Utilisation : python -m bench.bench_resume [dossier_de_pages] [latence_par_token_s]
+import json
+import os
+import statistics
+import sys
+import time
+
+from bench.serveurs_factices import faux_mistral
+
+DOSSIER = os.path.join(os.path.dirname(__file__), "corpus_pages")
+REPETITIONS = 200  # Passages du résumé par page, pour un temps stable
+
+
+def _corpus(dossier: str) -> list[tuple[str, str, bytes]]:
+    # (fichier, requête, contenu de la page) d'après requetes.txt : fichier<TAB>requête
+    pages = []
+    with open(os.path.join(dossier, "requetes.txt"), encoding="utf-8") as f:
+        for ligne in f:
+            if ligne.strip() and not ligne.startswith("#"):
+                fichier, requete = ligne.rstrip("\n").split("\t")
+                with open(os.path.join(dossier, fichier), "rb") as page:
+                    pages.append((fichier, requete, page.read()))
+    return pages
+
+
+def _chronometrer(fonction) -> float:
+    debut = time.perf_counter()
+    fonction()
+    return time.perf_counter() - debut
+
+
+def main():
+    dossier = sys.argv[1] if len(sys.argv) > 1 else DOSSIER
+    latence_par_token = float(sys.argv[2]) if len(sys.argv) > 2 else 0.002
+    with faux_mistral(latence=0.3, latence_par_token=latence_par_token) as mistral:
+        os.environ.update({"MISTRAL_API_URL": mistral.url + "/v1/chat/completions", "MISTRAL_API_KEY": "bench"})
+        from utils.tokens import estimer_tokens
+        from utils.Mistral_API import client_mistral, sans_cache
+        from utils.extraction_html import extraire_paragraphes
+        from utils.google_search import construire_prompt
+        from utils.resume_extractif import np, resumer
+
+        lignes, avant_ms, apres_ms = [], [], []
+        for fichier, requete, page in _corpus(dossier):
+            paragraphes, _, _ = extraire_paragraphes([page])  # Mêmes réglages que la recherche Google
+            contenu = "\n".join(paragraphes)
+            resume = resumer(contenu, requete)
+            prompt_avant, prompt_apres = construire_prompt(requete, contenu), construire_prompt(requete, resume.extrait)
+            cout_resume = min(_chronometrer(lambda: resumer(contenu, requete)) for _ in range(REPETITIONS))
+            with sans_cache():
+                avant = _chronometrer(lambda: client_mistral.chat(prompt_avant, contexte=False))
+                apres = cout_resume + (0.0 if resume.definition else _chronometrer(lambda: client_mistral.chat(prompt_apres, contexte=False)))
+            avant_ms.append(avant * 1000)
+            apres_ms.append(apres * 1000)
+            lignes.append({
+                "page": fichier,
+                "tokens_prompt_avant": estimer_tokens(prompt_avant),
+                "tokens_prompt_apres": estimer_tokens(prompt_apres),
+                "resume_us": round(cout_resume * 1e6),
+                "sans_mistral": bool(resume.definition),
+                "latence_avant_ms": round(avant * 1000, 1),
+                "latence_apres_ms": round(apres * 1000, 1),
+            })
+
+    tokens_avant = sum(ligne["tokens_prompt_avant"] for ligne in lignes)
+    tokens_apres = sum(ligne["tokens_prompt_apres"] for ligne in lignes)
+    print(json.dumps({
+        "numpy": np is not None,
+        "latence_par_token_s": latence_par_token,
+        "pages": lignes,
+        "total": {
+            "tokens_prompt_avant": tokens_avant,
+            "tokens_prompt_apres": tokens_apres,
+            "reduction_tokens": f"{100 * (1 - tokens_apres / tokens_avant):.0f} %",
+            "appels_mistral_evites": sum(ligne["sans_mistral"] for ligne in lignes),
+            "latence_moyenne_avant_ms": round(statistics.mean(avant_ms), 1),
+            "latence_moyenne_apres_ms": round(statistics.mean(apres_ms), 1),
+        },
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# Coût de routage par message : ancienne chaîne de fonctions (liste noire, 4 appels à difflib,
+# double extraction de la politesse, regex de mots vides) contre le routeur précompilé.
+# Utilisation : python -m bench.bench_routeur [répétitions]
+import json
+import random
+import re
+import sys
+import time
+from difflib import get_close_matches
+
+from utils.monchatbot import routeur, POLITESSES, BLACKLIST, SALUTATIONS
+
+MESSAGES = [
+    "bonjour", "salut !", "comment ça va ?", "merci beaucoup",
+    "peux-tu chercher sur wikipedia la photosynthèse stp",
+    "google c'est quoi un trou noir", "calcule 12*7", "svp calcule la dérivée de x^2",
+    "est-ce que tu peux me donner la capitale de la France ?",
+    "Quel est le contenu de ce cours sur l'histoire de la Révolution française et ses conséquences ?",
+    "wikipedia tour eiffel", "je voudrais savoir comment fonctionne un moteur à explosion",
+]
+
+_MOTS_VIDES_ANCIENS = (
+    r"\b(peux-tu|peux tu|pourrais-tu|pourrais tu|tu peux|tu pourrais|tu-peux|"
+    r"s'il te plaît|stp|svp|sil te plait|s il te plait|est ce que|est-ce que|"
+    r"tu-pourrais|donne moi|m'aider|me donner|avoir|sur|dans|avec|la|le|"
+    r"définition|recherche|rechercher|de|du|des|je|tu|il|nous|vous|ils|elle|elles|pourrais|le|la)\b"
+)
+
+
+def _ancien_routage(message: str) -> str:
+    # Copie fidèle du travail fait avant le routeur (sans les appels réseau)
+    msg = message.strip()
+    if any(mot in msg.lower() for mot in BLACKLIST):
+        return "inapproprie"
+    bas = msg.lower().strip()
+    for phrases, _ in SALUTATIONS.values():
+        if get_close_matches(bas, list(phrases), n=1, cutoff=0.8):
+            return "salutation"
+    for _ in range(2):  # extraire_politesse_et_question était appelée deux fois
+        question = msg.strip().lower()
+        trouvees = []
+        for p in POLITESSES:
+            if p in question:
+                trouvees.append(p)
+                question = question.replace(p, "")
+        question = question.strip()
+        if trouvees:
+            random.choice(["a", "b"])
+    for declencheur, route in (("wikipedia", "wikipedia"), ("google", "google")):
+        if declencheur in question.lower():
+            re.sub(_MOTS_VIDES_ANCIENS, "", question.lower().replace(declencheur, "")).strip(" :!?.,\"'")
+            return route
+    if "calcule" in question.lower():
+        question.lower().split("calcule", 1)[-1].strip()
+        return "maths"
+    return "defaut"
+
+
+def _mesurer(fonction, repetitions: int) -> float:
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        for message in MESSAGES:
+            fonction(message)
+    return (time.perf_counter() - debut) / (repetitions * len(MESSAGES))
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    avant = _mesurer(_ancien_routage, repetitions)
+    apres = _mesurer(routeur.analyser, repetitions)
+    print(json.dumps({
+        "avant_us_par_message": round(avant * 1e6, 2),
+        "apres_us_par_message": round(apres * 1e6, 2),
+        "acceleration": round(avant / apres, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
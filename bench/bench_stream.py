@@ -0,0 +1,46 @@
+# Compare le temps jusqu'au premier octet (TTFB) et le temps total de /ask et /ask/stream
+# pour une question qui passe par Mistral, contre un faux serveur Mistral qui émet ses tokens lentement.
+# Utilisation : python -m bench.bench_stream
+import json
+import os
+import threading
+import time
+
+import requests
+from werkzeug.serving import make_server
+
+from bench.serveurs_factices import faux_mistral
+
+
+def _mesurer(url: str, message: str) -> dict:
+    debut = time.perf_counter()
+    with requests.post(url, json={"message": message}, stream=True) as response:
+        premier = None
+        for _ in response.iter_content(chunk_size=None):
+            if premier is None:
+                premier = time.perf_counter() - debut
+        total = time.perf_counter() - debut
+    return {"ttfb_ms": round(premier * 1000, 1), "total_ms": round(total * 1000, 1)}
+
+
+def main():
+    with faux_mistral(delai_token=0.01, taille_reponse=400) as mistral:
+        # La configuration est lue à l'import : on la fixe avant de charger l'application
+        os.environ["MISTRAL_API_URL"] = mistral.url + "/v1/chat/completions"
+        os.environ.setdefault("MISTRAL_API_KEY", "bench")
+        from app.app import app
+
+        serveur = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=serveur.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{serveur.server_port}"
+        message = "calcule explique l'intégrale de x^2"
+        resultats = {
+            "/ask": _mesurer(base + "/ask", message),
+            "/ask/stream": _mesurer(base + "/ask/stream", message),
+        }
+        serveur.shutdown()
+    print(json.dumps(resultats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
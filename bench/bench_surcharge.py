@@ -0,0 +1,127 @@
+# Surcharge : /ask reçoit à débit fixe (boucle ouverte, comme des utilisateurs qui n'attendent pas les autres)
+# plus de questions que Mistral (faux serveur, latence fixe, MISTRAL_MAX_CONCURRENCE places) ne peut en traiter.
+# Trois workers sont comparés : sans protection, avec échéance seule, avec admission bornée + échéance.
+# Mesures : débit utile, latences des réponses réussies, part et latence des refus 503, réponses en erreur.
+# Utilisation : python -m bench.bench_surcharge [debit_par_seconde] [duree_s]
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bench.serveurs_factices import faux_mistral
+
+LATENCE_MISTRAL = 0.2
+PLACES_MISTRAL = 8  # Capacité : 8 / 0,2 s = 40 questions par seconde
+
+
+def _port_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _centiles(durees: list[float]) -> dict:
+    durees = sorted(durees)
+    if not durees:
+        return {}
+    rang = lambda p: durees[min(len(durees) - 1, int(p / 100 * len(durees)))]  # noqa: E731
+    return {"p50_ms": round(rang(50) * 1000), "p95_ms": round(rang(95) * 1000), "p99_ms": round(rang(99) * 1000)}
+
+
+def _charger(base: str, debit: float, duree: float) -> dict:
+    nombre = int(debit * duree)
+    resultats = []
+    verrou = threading.Lock()
+
+    def envoyer(i: int):
+        debut = time.perf_counter()
+        try:
+            response = requests.post(base + "/ask", json={"message": f"calcule explique {i}x^2 + 1"}, timeout=60)
+            statut, texte = response.status_code, response.json().get("response", "")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            statut, texte = None, type(e).__name__
+        with verrou:
+            resultats.append((statut, texte, time.perf_counter() - debut))
+
+    depart = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=nombre) as pool:
+        for i in range(nombre):
+            time.sleep(max(0.0, depart + i / debit - time.perf_counter()))
+            pool.submit(envoyer, i)
+    total = time.perf_counter() - depart
+
+    reussies = [d for statut, texte, d in resultats if statut == 200 and not texte.startswith("Erreur")]
+    en_erreur = [d for statut, texte, d in resultats if statut == 200 and texte.startswith("Erreur")]
+    refusees = [d for statut, _, d in resultats if statut == 503]
+    return {
+        "envoyees": nombre,
+        "debit_utile_rps": round(len(reussies) / total, 1),
+        "reussies": {"nombre": len(reussies), **_centiles(reussies)},
+        "refusees_503": {"nombre": len(refusees), **_centiles(refusees)},
+        "reponses_en_erreur": {"nombre": len(en_erreur), **_centiles(en_erreur)},  # Échéance dépassée, place refusée...
+        "autres_echecs": sum(1 for statut, _, _ in resultats if statut not in (200, 503)),
+    }
+
+
+def _servir(port: int) -> None:
+    import logging
+    from werkzeug.serving import make_server
+
+    from app.app import app
+
+    logging.disable(logging.WARNING)
+    make_server("127.0.0.1", port, app, threaded=True).serve_forever()  # Un thread par connexion, sans limite
+
+
+def main():
+    debit = float(sys.argv[1]) if len(sys.argv) > 1 else 100
+    duree = float(sys.argv[2]) if len(sys.argv) > 2 else 6
+    modes = {
+        "sans_protection": {"ADMISSION_ACTIVE": "0", "REQUETE_DELAI": "0"},
+        "echeance_seule": {"ADMISSION_ACTIVE": "0", "REQUETE_DELAI": "3"},
+        "admission_et_echeance": {"ADMISSION_ACTIVE": "1", "REQUETE_DELAI": "3"},
+    }
+    resultats = {"debit_envoye_rps": debit, "capacite_mistral_rps": PLACES_MISTRAL / LATENCE_MISTRAL}
+    with faux_mistral(latence=LATENCE_MISTRAL) as mistral:
+        for nom, reglages in modes.items():
+            port = _port_libre()
+            env = {
+                **os.environ,
+                "MISTRAL_API_URL": mistral.url + "/v1/chat/completions",
+                "MISTRAL_API_KEY": "bench",
+                "MISTRAL_MAX_CONCURRENCE": str(PLACES_MISTRAL),
+                "LLM_CACHE_ACTIF": "0",
+                "ADMISSION_MAX_EN_COURS": str(PLACES_MISTRAL),
+                "ADMISSION_MAX_FILE": str(PLACES_MISTRAL * 2),
+                "ADMISSION_ATTENTE_MAX": "1",
+                "PRECHAUFFAGE_CONNEXIONS": "0",
+                **reglages,
+            }
+            worker = subprocess.Popen([sys.executable, "-m", "bench.bench_surcharge", "--serveur", str(port)], env=env)
+            base = f"http://127.0.0.1:{port}"
+            try:
+                while True:
+                    try:
+                        if requests.get(base + "/health/ready", timeout=1).status_code == 200:
+                            break
+                    except requests.exceptions.RequestException:
+                        pass
+                    time.sleep(0.05)
+                resultats[nom] = _charger(base, debit, duree)
+            finally:
+                worker.terminate()
+                worker.wait()
+    print(json.dumps(resultats, indent=2))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--serveur":
+        _servir(int(sys.argv[2]))
+    else:
+        main()
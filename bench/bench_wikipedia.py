@@ -0,0 +1,108 @@
+# Appels HTTP à Wikipédia par question répondue, contre le faux serveur MediaWiki : ancienne bibliothèque
+# `wikipedia` (recherche, page, homonymie et résumé en appels séparés, sans connexions réutilisées) puis
+# appels directs à l'API (un appel par question, aperçus des options d'homonymie en un appel groupé).
+# Une page d'homonymie est suivie d'un clic sur sa première option, comme le ferait l'utilisateur.
+# Enfin, un lot de questions (/ask/batch) : une recherche par question, puis recherche_wikipedia_lot.
+# Utilisation : python -m bench.bench_wikipedia [questions] [latence_ms]
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+from bench.serveurs_factices import faux_mediawiki
+
+SUJETS = (
+    "tour eiffel", "photosynthèse", "mercure", "python", "louvre", "jazz", "volcan", "orion", "saturne", "paris",
+    "baleine", "rome", "chocolat", "tennis", "opéra", "glacier", "marathon", "cathédrale", "loire", "cinéma",
+    "atome", "bordeaux", "violon", "pyramide", "dinosaure", "mozart", "éclipse", "corail", "vikings", "bitcoin",
+)
+
+
+def _questions(prefixe: str, nombre: int) -> list[str]:
+    # Questions distinctes (cache froid) d'une phase à l'autre
+    return [f"{SUJETS[i % len(SUJETS)]} {prefixe}{i // len(SUJETS) or ''}".strip() for i in range(nombre)]
+
+
+def _mesurer(service, questions: list[str], repondre) -> dict:
+    # `repondre(questions)` -> nombre de questions qui ont obtenu un résumé (clic sur une option compris)
+    avant = service.compteur
+    debut = time.perf_counter()
+    repondues = repondre(questions)
+    duree = time.perf_counter() - debut
+    appels = service.compteur - avant
+    return {
+        "questions": len(questions),
+        "repondues": repondues,
+        "appels_http": appels,
+        "appels_par_question_repondue": round(appels / max(repondues, 1), 2),
+        "duree_ms_par_question": round(duree * 1000 / len(questions), 1),
+    }
+
+
+def _une_par_une(repondre):
+    return lambda questions: sum(1 for question in questions if repondre(question))
+
+
+def _bibliotheque(url: str):
+    import wikipedia
+    import wikipedia.wikipedia
+
+    wikipedia.set_lang("fr")
+    wikipedia.wikipedia.API_URL = url  # set_lang() remet l'adresse de wikipedia.org
+
+    def repondre(question: str) -> bool:
+        try:
+            return bool(wikipedia.summary(question, sentences=2, auto_suggest=True))
+        except wikipedia.DisambiguationError as e:
+            try:
+                return bool(e.options) and bool(wikipedia.summary(e.options[0], sentences=2, auto_suggest=False))
+            except wikipedia.WikipediaException:
+                return False
+        except wikipedia.WikipediaException:
+            return False
+    return repondre
+
+
+def _api_directe(question: str) -> bool:
+    from utils.wikipedia_search import recherche_wikipedia
+
+    resultat = recherche_wikipedia(question)
+    if isinstance(resultat, list):
+        option = resultat[0].split(" : ")[0]  # « Titre : aperçu »
+        resultat = recherche_wikipedia(option)
+    return isinstance(resultat, str)
+
+
+def main():
+    nombre = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    latence = (float(sys.argv[2]) if len(sys.argv) > 2 else 20) / 1000
+    logging.disable(logging.WARNING)  # Pages introuvables et homonymies : attendues ici
+    warnings.simplefilter("ignore")  # Avertissement de BeautifulSoup dans la bibliothèque wikipedia
+    with faux_mediawiki(latence=latence, taux_homonymie=0.2, taux_redirection=0.2, taux_absent=0.05, options=25) as wikipedia, \
+            tempfile.TemporaryDirectory() as dossier:
+        url = wikipedia.url + "/w/api.php"
+        # La configuration est lue à l'import : on la fixe avant de charger les modules
+        os.environ.update({"WIKIPEDIA_API_URL": url, "CACHE_DB_PATH": os.path.join(dossier, "cache.sqlite3")})
+        from utils.wikipedia_search import recherche_wikipedia, recherche_wikipedia_lot
+
+        resultats = {
+            "latence_ms": latence * 1000,
+            "bibliotheque_wikipedia": _mesurer(wikipedia, _questions("a", nombre), _une_par_une(_bibliotheque(url))),
+            "api_directe": _mesurer(wikipedia, _questions("b", nombre), _une_par_une(_api_directe)),
+        }
+
+        # Lot de titres : une recherche par question, puis des appels groupés (20 titres par appel)
+        lot = ([sujet.capitalize() for sujet in SUJETS] + [f"{sujet.capitalize()} (sens 1)" for sujet in SUJETS])[:nombre]
+        resultats["lot_une_par_une"] = _mesurer(
+            wikipedia, lot, _une_par_une(lambda titre: isinstance(recherche_wikipedia(titre, sentences=3), str)))
+        resultats["lot_groupe"] = _mesurer(
+            wikipedia, lot, lambda titres: sum(isinstance(r, str) for r in recherche_wikipedia_lot(titres, sentences=4).values()))
+        resultats["appels_par_genre"] = wikipedia.compteurs
+    print(json.dumps(resultats, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
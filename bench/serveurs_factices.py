@@ -0,0 +1,366 @@
+# Faux serveurs HTTP locaux imitant les services externes (Mistral, API MediaWiki, recherche Google
+# et pages web) pour mesurer les performances sans appeler les API payantes.
+import html
+import json
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlsplit
+
+
+class _HandlerBase(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, comme les vrais services
+    disable_nagle_algorithm = True  # Évite les 40 ms de delayed-ACK entre en-têtes et corps
+
+    def log_message(self, format, *args):
+        pass  # Pas de log sur la sortie standard pendant les mesures
+
+    def do_HEAD(self):
+        # Ouverture de connexion à l'avance par le client (préchauffage) : réponse vide, connexion gardée
+        self._envoyer(200, b"")
+
+    def _lire_json(self) -> dict:
+        longueur = int(self.headers.get("Content-Length") or 0)
+        corps = self.rfile.read(longueur) if longueur else b""
+        try:
+            return json.loads(corps or b"{}")
+        except ValueError:
+            return {}
+
+    def _envoyer(self, code: int, corps: bytes, content_type: str = "application/json", headers: dict | None = None):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(corps)))
+        for cle, valeur in (headers or {}).items():
+            self.send_header(cle, valeur)
+        self.end_headers()
+        self.wfile.write(corps)
+
+    def _simuler_latence(self):
+        reglages = self.server.reglages
+        latence = reglages.get("latence", 0.0)
+        if latence:
+            with self.server.verrou:
+                duree = self.server.alea.uniform(latence * 0.8, latence * 1.2)
+            time.sleep(duree)
+
+    def _doit_echouer(self, reglage: str = "taux_erreur") -> bool:
+        taux = self.server.reglages.get(reglage, 0.0)
+        if not taux:
+            return False
+        with self.server.verrou:
+            return self.server.alea.random() < taux
+
+    def _compter(self, genre: str):
+        with self.server.verrou:
+            self.server.compteur += 1
+            self.server.compteurs[genre] += 1
+
+    def _parametres(self) -> dict:
+        # Paramètres de la query string (une valeur par nom ; les paramètres vides, ex : redirects=, sont gardés)
+        return {cle: valeurs[-1] for cle, valeurs in parse_qs(urlsplit(self.path).query, keep_blank_values=True).items()}
+
+
+class _MistralHandler(_HandlerBase):
+    # Imite POST /v1/chat/completions
+    def do_POST(self):
+        with self.server.verrou:
+            self.server.en_cours += 1
+            self.server.en_cours_max = max(self.server.en_cours_max, self.server.en_cours)
+        try:
+            self._repondre()
+        finally:
+            with self.server.verrou:
+                self.server.en_cours -= 1
+
+    def _repondre(self):
+        data = self._lire_json()
+        self._compter("chat")
+        self._simuler_latence()
+        with self.server.verrou:
+            erreurs = self.server.reglages.get("erreurs")
+            code = erreurs.pop(0) if erreurs else None
+        if code is None and self._doit_echouer():
+            code = 429
+        if code is not None:
+            corps = json.dumps({"message": "rate limited" if code == 429 else "erreur simulée"}).encode()
+            self._envoyer(code, corps, headers={"Retry-After": self.server.reglages.get("retry_after", "0")})
+            return
+        prompt = data.get("messages", [{}])[-1].get("content", "")
+        # Lecture du prompt : proportionnelle à sa taille (tous les messages, ~4 caractères par token)
+        caracteres = sum(len(m.get("content", "")) for m in data.get("messages", []))
+        time.sleep(self.server.reglages.get("latence_par_token", 0.0) * ((caracteres + 3) // 4))
+        taille = self.server.reglages.get("taille_reponse", 200)
+        contenu = ("Réponse simulée : " + prompt[:50] + " ").ljust(taille, "x")
+        if data.get("stream"):
+            self._envoyer_flux(contenu)
+            return
+        # Sans streaming, la génération complète est attendue avant d'envoyer quoi que ce soit
+        time.sleep(self.server.reglages.get("delai_token", 0.0) * ((len(contenu) + 3) // 4))
+        corps = json.dumps({"choices": [{"message": {"role": "assistant", "content": contenu}}]}).encode()
+        self._envoyer(200, corps)
+
+
+    def _envoyer_flux(self, contenu: str):
+        # Réponse SSE en encodage chunked, un token (ici 4 caractères) toutes les `delai_token` secondes
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        delai = self.server.reglages.get("delai_token", 0.0)
+        morceaux = [contenu[i:i + 4] for i in range(0, len(contenu), 4)]
+        evenements = [{"choices": [{"delta": {"content": m}}]} for m in morceaux]
+        for evenement in evenements:
+            if delai:
+                time.sleep(delai)
+            self._ecrire_chunk(f"data: {json.dumps(evenement)}\n\n".encode())
+        self._ecrire_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _ecrire_chunk(self, donnees: bytes):
+        self.wfile.write(f"{len(donnees):X}\r\n".encode() + donnees + b"\r\n")
+        self.wfile.flush()
+
+
+def _alea(texte: str) -> float:
+    # Tirage déterministe dans [0, 1) : une même page se comporte toujours de la même façon. Le CRC ne sert
+    # que de graine : celui de textes voisins (« 42-1 », « 42-2 »...) est corrélé, les tirages en seraient biaisés
+    return random.Random(zlib.crc32(texte.encode("utf-8"))).random()
+
+
+class _MediaWikiHandler(_HandlerBase):
+    # Imite GET /w/api.php?action=query&format=json : recherche (list=search ou generator=search), informations et propriétés
+    # des pages (prop=info|pageprops), résumés (prop=extracts), contenu des pages d'homonymie (prop=revisions),
+    # redirections et titres multiples (titles=A|B|C), et GET /w/api.php?action=parse&prop=text : HTML d'une page d'homonymie. Le comportement d'un titre
+    # (absent, homonymie, redirection) est tiré une fois pour toutes à partir du titre.
+    def do_GET(self):
+        params = self._parametres()
+        if params.get("action") == "parse":
+            self._compter("parse")
+        else:
+            self._compter(params.get("list") or params.get("generator") or params.get("prop") or "autre")
+        self._simuler_latence()
+        if self._doit_echouer():
+            # Réponse de MediaWiki quand ses serveurs sont saturés
+            self._envoyer(503, json.dumps({"error": {"code": "maxlag", "info": "Pool queue is full"}}).encode())
+            return
+        if params.get("action") == "parse" and params.get("prop") == "text":
+            self._analyser(params.get("page", ""))
+            return
+        if params.get("action", "query") != "query":
+            self._envoyer(200, json.dumps({"error": {"code": "badvalue", "info": "action non imitée"}}).encode())
+            return
+        requete = {}
+        if "srsearch" in params:
+            requete["search"] = [{"title": t} for t in self._rechercher(params["srsearch"], int(params.get("srlimit") or 10))]
+            correction = self.server.reglages.get("corrections", {}).get(params["srsearch"].strip())
+            if correction and "suggestion" in params.get("srinfo", ""):
+                requete["searchinfo"] = {"suggestion": correction}
+        titres = [t for t in params.get("titles", "").split("|") if t]
+        if "gsrsearch" in params:  # generator=search : les pages trouvées, avec les propriétés demandées
+            titres += self._rechercher(params["gsrsearch"], int(params.get("gsrlimit") or 10))
+        titres += [self.server.titres.get(int(i), f"Page {i}") for i in params.get("pageids", "").split("|") if i.isdigit()]
+        if titres:
+            self._pages(titres, params, requete)
+        self._envoyer(200, json.dumps({"batchcomplete": "", "query": requete}, ensure_ascii=False).encode("utf-8"))
+
+    def _genre(self, titre: str) -> str:
+        reglages = self.server.reglages
+        if "introuvable" in titre.lower() or _alea("absent" + titre) < reglages.get("taux_absent", 0.0):
+            return "absent"
+        if titre.endswith(" (article)"):
+            return "article"  # Cible d'une redirection : jamais redirigée à son tour
+        if _alea("homonymie" + titre) < reglages.get("taux_homonymie", 0.1):
+            return "homonymie"
+        if _alea("redirection" + titre) < reglages.get("taux_redirection", 0.1):
+            return "redirection"
+        return "article"
+
+    def _rechercher(self, texte: str, limite: int) -> list[str]:
+        titre = texte.strip()[:1].upper() + texte.strip()[1:]
+        if not titre or texte.strip() in self.server.reglages.get("corrections", {}) or self._genre(titre) == "absent":
+            return []
+        return [titre] + [f"{titre} (sens {i})" for i in range(1, limite)]
+
+    def _pages(self, titres: list[str], params: dict, requete: dict):
+        reglages = self.server.reglages
+        proprietes = set(params.get("prop", "").split("|"))
+        pages = {}
+        for titre in titres:
+            genre = self._genre(titre)
+            if genre == "redirection" and "redirects" in params:
+                cible = f"{titre} (article)"
+                requete.setdefault("redirects", []).append({"from": titre, "to": cible})
+                titre, genre = cible, "article"
+            if genre == "absent":
+                pages[str(-1 - len(pages))] = {"ns": 0, "title": titre, "missing": ""}
+                continue
+            pageid = zlib.crc32(titre.encode("utf-8")) & 0x7FFFFFFF
+            with self.server.verrou:
+                self.server.titres[pageid] = titre
+            page = {"pageid": pageid, "ns": 0, "title": titre}
+            if "info" in proprietes:
+                page["fullurl"] = f"https://fr.wikipedia.org/wiki/{quote(titre.replace(' ', '_'))}"
+            if "pageprops" in proprietes and genre == "homonymie":
+                page["pageprops"] = {"disambiguation": ""}
+            if "extracts" in proprietes:
+                if params.get("exsentences"):
+                    nombre = int(params["exsentences"])
+                elif "exintro" in params:
+                    nombre = reglages.get("phrases_intro", 4)
+                else:
+                    nombre = reglages.get("phrases_page", 40)
+                phrase = f"{titre} est un sujet décrit par le faux serveur MediaWiki".ljust(reglages.get("taille_phrase", 120), ".")
+                page["extract"] = " ".join(f"{phrase} ({i})." for i in range(nombre))
+            if "revisions" in proprietes and genre == "homonymie":  # Lu par l'ancienne bibliothèque `wikipedia`
+                options = "".join(
+                    f'<li><a href="/wiki/{quote(titre)}_{i}">{titre} (sens {i})</a></li>'
+                    for i in range(1, reglages.get("options", 5) + 1)
+                )
+                page["revisions"] = [{"*": f"<p>{titre} peut désigner :</p><ul>{options}</ul>"}]
+            pages[str(pageid)] = page
+        requete["pages"] = pages
+
+    def _analyser(self, titre: str):
+        # action=parse (formatversion=2) : sommaire, styles en <link> et une option par élément de liste, comme
+        # sur une vraie page d'homonymie
+        if self._genre(titre) != "homonymie":
+            self._envoyer(200, json.dumps({"error": {"code": "missingtitle", "info": "page non imitée"}}).encode())
+            return
+        options = "".join(
+            f'<li><a href="/wiki/{quote(f"{titre} (sens {i})".replace(" ", "_"))}" title="{html.escape(f"{titre} (sens {i})")}">'
+            f'{html.escape(titre)}</a>, sens {i}</li>'
+            for i in range(1, self.server.reglages.get("options", 5) + 1)
+        )
+        contenu = (
+            '<div class="mw-parser-output"><link rel="mw-deduplicated-inline-style" href="mw-data:TemplateStyles:r1"/>'
+            f'<p>{html.escape(titre)} peut désigner :</p><div id="toc" class="toc"><ul>'
+            '<li class="toclevel-1 tocsection-1"><a href="#Sens"><span class="toctext">Sens</span></a></li></ul></div>'
+            f'<ul>{options}</ul></div>'
+        )
+        self._envoyer(200, json.dumps({"parse": {"title": titre, "text": contenu}}, ensure_ascii=False).encode("utf-8"))
+
+
+class _PagesHandler(_HandlerBase):
+    # Héberge des pages HTML : /page/<délai_ms>/<id> (avec paragraphes) et /vide/<délai_ms>/<id> (sans contenu utile),
+    # un document qui n'est pas du HTML (/pdf/<délai_ms>/<id>, `taille_page` octets),
+    # et imite l'API de recherche Custom Search JSON (/customsearch/v1?q=...), dont les résultats pointent vers ces pages
+    def do_GET(self):
+        if self.path.startswith("/customsearch/"):
+            self._resultats()
+            return
+        morceaux = self.path.strip("/").split("/")
+        genre = morceaux[0] if morceaux else ""
+        self._compter(genre)
+        delai_ms = int(morceaux[1]) if len(morceaux) > 1 and morceaux[1].isdigit() else 0
+        time.sleep(delai_ms / 1000)
+        if genre not in ("page", "vide", "pdf"):
+            self._envoyer(404, b"not found", "text/plain")
+            return
+        if self._doit_echouer("taux_erreur_page"):
+            self._envoyer(500, b"erreur simulee", "text/plain")
+            return
+        if genre == "pdf":
+            self._envoyer(200, b"%PDF-1.4\n" + b"0" * self.server.reglages.get("taille_page", 0), "application/pdf")
+            return
+        paragraphes = self.server.reglages.get("paragraphes", 6) if genre == "page" else 0
+        texte = "Ce paragraphe de test décrit le sujet demandé avec suffisamment de mots pour être retenu."
+        # Balisage sans texte utile dans l'en-tête (styles, scripts...) pour atteindre `taille_page` octets
+        remplissage = "/* style */" * (self.server.reglages.get("taille_page", 0) // 11)
+        html = (
+            f"<html><head><title>Page {self.path}</title><style>{remplissage}</style></head><body>"
+            + "".join(f"<p>{texte} ({i})</p>" for i in range(paragraphes))
+            + "<p>court</p></body></html>"
+        )
+        self._envoyer(200, html.encode("utf-8"), "text/html; charset=utf-8")
+
+    def _resultats(self):
+        params = self._parametres()
+        self._compter("recherche")
+        self._simuler_latence()
+        if self._doit_echouer():
+            self._envoyer(503, json.dumps({"error": {"code": 503, "message": "Backend Error"}}).encode())
+            return
+        reglages = self.server.reglages
+        hote, port = self.server.server_address[:2]
+        delai_ms = int(reglages.get("latence_page", 0.05) * 1000)
+        identifiant = zlib.crc32(params.get("q", "").encode("utf-8"))
+        items = []
+        for rang in range(int(params.get("num") or 10)):
+            # Une part des résultats ne contient rien d'exploitable (page de navigation, cookies...)
+            genre = "vide" if _alea(f"{identifiant}-{rang}") < reglages.get("taux_pages_vides", 0.2) else "page"
+            items.append({"title": f"Résultat {rang}", "link": f"http://{hote}:{port}/{genre}/{delai_ms}/{identifiant}-{rang}"})
+        self._envoyer(200, json.dumps({"items": items}, ensure_ascii=False).encode("utf-8"))
+
+
+class _Serveur(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # Un client qui abandonne (timeout, annulation) n'est pas une erreur pour un faux serveur
+
+
+class ServeurFactice:
+    # Lance un faux serveur dans un thread ; utilisable comme gestionnaire de contexte.
+    # Latences et erreurs sont tirées d'un générateur propre au serveur (réglage graine, 0 par défaut) :
+    # deux mesures avec les mêmes réglages et les mêmes requêtes voient les mêmes tirages
+    def __init__(self, handler, graine: int = 0, **reglages):
+        self.httpd = _Serveur(("127.0.0.1", 0), handler)
+        self.httpd.reglages = reglages
+        self.httpd.alea = random.Random(graine)
+        self.httpd.compteur = 0  # Nombre total de requêtes reçues
+        self.httpd.compteurs = Counter()  # Requêtes reçues par genre (chat, search, extracts, page...)
+        self.httpd.titres = {}  # Identifiant de page -> titre (faux MediaWiki)
+        self.httpd.en_cours = self.httpd.en_cours_max = 0  # Requêtes traitées en même temps (faux Mistral)
+        self.httpd.verrou = threading.Lock()
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        hote, port = self.httpd.server_address[:2]
+        return f"http://{hote}:{port}"
+
+    @property
+    def compteur(self) -> int:
+        return self.httpd.compteur
+
+    @property
+    def en_cours_max(self) -> int:
+        return self.httpd.en_cours_max
+
+    @property
+    def compteurs(self) -> dict:
+        with self.httpd.verrou:
+            return dict(self.httpd.compteurs)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def faux_mistral(**reglages) -> ServeurFactice:
+    # reglages : latence (s), taux_erreur (0-1, renvoie des 429), taille_reponse (caractères),
+    # delai_token (s entre deux morceaux quand la requête demande stream: true), latence_par_token (s par token du prompt),
+    # erreurs (codes HTTP renvoyés, dans l'ordre, aux premières requêtes), retry_after (en-tête des erreurs, "0" par défaut)
+    return ServeurFactice(_MistralHandler, **reglages)
+
+
+def faux_mediawiki(**reglages) -> ServeurFactice:
+    # reglages : latence (s), taux_erreur (0-1, renvoie des 503), taux_absent, taux_homonymie, taux_redirection
+    # (part des titres concernés), phrases_intro, taille_phrase (caractères), options (sens d'une homonymie),
+    # corrections (recherche mal orthographiée -> correction proposée, la recherche elle-même ne trouvant rien)
+    return ServeurFactice(_MediaWikiHandler, **reglages)
+
+
+def faux_hebergeur_pages(**reglages) -> ServeurFactice:
+    # reglages : paragraphes (nombre de <p> utiles par page), taille_page (octets), taux_erreur_page (0-1, renvoie des 500) ;
+    # le délai d'une page est donné dans son URL. Recherche : latence (s), taux_erreur (0-1, renvoie des 503),
+    # latence_page (s, délai des pages proposées) et taux_pages_vides (part des résultats sans contenu utile)
+    return ServeurFactice(_PagesHandler, **reglages)
@@ -0,0 +1,50 @@
+# Configuration de gunicorn pour la production : gunicorn -c gunicorn.conf.py wsgi:app
+# Tous les réglages viennent de variables d'environnement (même hôte/port que le serveur de développement).
+import multiprocessing
+import os
+
+from app.config import ADMISSION_MAX_EN_COURS, ADMISSION_MAX_FILE, REQUETE_DELAI
+from app.prechauffage import prechauffage
+
+bind = f"{os.getenv('FLASK_HOST', '0.0.0.0')}:{os.getenv('FLASK_PORT', '5000')}"
+
+# Processus (un par cœur par défaut) et threads par processus : les requêtes passent l'essentiel de leur temps
+# à attendre Mistral, Wikipédia ou Google, d'où des threads (gthread) plutôt que davantage de processus.
+# Par défaut, assez de threads pour les requêtes en cours et celles de la file d'admission : c'est le contrôle
+# d'admission de l'application (et non la file de gunicorn) qui décide d'attendre ou de répondre 503.
+# Les conversations sont partagées entre workers par le cache SQLite (MEMOIRE_PARTAGEE=1, par défaut) ;
+# avec MEMOIRE_PARTAGEE=0, garder un seul worker ou des sessions collantes au répartiteur de charge.
+workers = int(os.getenv("GUNICORN_WORKERS", str(multiprocessing.cpu_count())))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", str(ADMISSION_MAX_EN_COURS + ADMISSION_MAX_FILE)))
+
+# Connexions en attente d'un thread au niveau du système (au-delà, le noyau refuse la connexion)
+backlog = int(os.getenv("GUNICORN_BACKLOG", "256"))
+
+# Un worker bloqué plus longtemps que l'échéance des requêtes (plus une marge) est redémarré
+timeout = int(os.getenv("GUNICORN_TIMEOUT", str(int(REQUETE_DELAI) + 30)))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Redémarre périodiquement les workers (fuites mémoire éventuelles), avec un peu d'aléa pour ne pas tous les arrêter ensemble
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+
+# Charge l'application une fois dans le processus maître (démarrage plus rapide, mémoire partagée).
+# Le préchauffage n'y est jamais lancé : ses threads pourraient tenir un verrou au moment du fork,
+# et le worker créé hériterait d'un verrou pris que personne ne rendrait
+preload_app = os.getenv("GUNICORN_PRELOAD", "0") == "1"
+prechauffage.lancer_dans_les_workers()
+
+accesslog = os.getenv("GUNICORN_ACCESSLOG", None)  # "-" : sur la sortie standard
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOGLEVEL", "info")
+
+
+def post_fork(server, worker):
+    # Chaque worker se préchauffe lui-même, une fois créé (rien n'est lancé dans le processus maître)
+    from app.prechauffage import fermer_connexions
+
+    if server.cfg.preload_app:
+        fermer_connexions()
+    prechauffage.lancer(dans_un_worker=True)
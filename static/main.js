@@ -28,6 +28,42 @@ function creerSpinner() {
     return span; // Retourne l’élément <span>
 }
 
+// Lit un flux SSE ("data: {...}" séparés par une ligne vide) et appelle afficher() à chaque nouveau morceau
+async function lireFlux(response, afficher) {
+    const reader = response.body.getReader(); // Lecteur du corps de la réponse
+    const decoder = new TextDecoder(); // Décode les octets UTF-8 reçus
+    let tampon = ""; // Données reçues mais pas encore traitées
+    let texte = ""; // Réponse accumulée
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        tampon += decoder.decode(value, { stream: true });
+
+        let fin;
+        while ((fin = tampon.indexOf("\n\n")) !== -1) {
+            const bloc = tampon.slice(0, fin); // Un événement complet
+            tampon = tampon.slice(fin + 2);
+
+            let evenement = "message";
+            let donnees = "";
+            for (const ligne of bloc.split("\n")) {
+                if (ligne.startsWith("event:")) evenement = ligne.slice(6).trim();
+                else if (ligne.startsWith("data:")) donnees += ligne.slice(5).trim();
+            }
+            const contenu = donnees ? JSON.parse(donnees) : {};
+
+            if (evenement === "fin") return texte; // Réponse terminée
+            if (evenement === "erreur") throw new Error(contenu.response || "Erreur serveur");
+            if (contenu.delta) {
+                texte += contenu.delta;
+                afficher(texte);
+            }
+        }
+    }
+    return texte;
+}
+
 // Fonction principale pour envoyer un message et traiter la réponse du serveur
 async function envoyerMessage() {
     const message = input.value.trim(); // Récupère et nettoie le message saisi par l’utilisateur
@@ -41,24 +77,26 @@ async function envoyerMessage() {
     loadingMsg.appendChild(creerSpinner()); // Ajoute un indicateur de chargement
 
     try {
-        // Envoie la requête POST au backend Flask
-        const response = await fetch("/ask", {
+        // Envoie la requête POST au backend Flask ; la réponse arrive en flux (Server-Sent Events)
+        const response = await fetch("/ask/stream", {
             method: "POST", // Méthode HTTP POST
             headers: { "Content-Type": "application/json" }, // Spécifie le format des données envoyées
             body: JSON.stringify({ message }), // Corps de la requête avec le message utilisateur
         });
 
-        if (!response.ok) throw new Error("Erreur serveur"); // Lève une erreur si le serveur ne répond pas correctement
+        if (!response.ok || !response.body) throw new Error("Erreur serveur"); // Lève une erreur si le serveur ne répond pas correctement
 
-        const data = await response.json(); // Parse la réponse JSON
-        loadingMsg.innerHTML = `<strong>Chatbot :</strong> ${data.response}`; // Affiche la réponse du bot
+        const texte = await lireFlux(response, (texteCourant) => {
+            loadingMsg.innerHTML = `<strong>Chatbot :</strong> ${texteCourant}`; // Affiche la réponse au fur et à mesure
+            chat.scrollTop = chat.scrollHeight; // Garde le dernier morceau visible
+        });
 
         // ✅ Détection de contenu LaTeX pour appliquer un style spécial
-        if (data.response.includes("\\(") || data.response.includes("$$")) {
+        if (texte.includes("\\(") || texte.includes("$$")) {
             loadingMsg.classList.add("math"); // Ajoute une classe spéciale si du LaTeX est détecté
         }
 
-        // ✅ Rendu MathJax (si chargé dans la page)
+        // ✅ Rendu MathJax (si chargé dans la page), une seule fois quand la réponse est complète
         if (window.MathJax) MathJax.typeset(); // Lance le rendu MathJax pour le contenu mathématique
     } catch (err) {
         console.error("Erreur lors de l’envoi :", err); // Affiche une erreur dans la console (utile pour le debug)
@@ -0,0 +1,13 @@
+import os
+import tempfile
+
+# La configuration est lue à l'import des modules : caches, verrous et index dans un dossier temporaire,
+# sans préchauffage ni appel réseau au démarrage
+_DOSSIER = tempfile.mkdtemp(prefix="chatbot-tests-")
+os.environ.update({
+    "CACHE_DB_PATH": os.path.join(_DOSSIER, "cache.sqlite3"),
+    "COALESCENCE_DOSSIER": os.path.join(_DOSSIER, "verrous"),
+    "KNOWLEDGE_INDEX_DIR": os.path.join(_DOSSIER, "index_connaissances"),
+    "PRECHAUFFAGE_ACTIF": "0",
+    "MISTRAL_API_KEY": "tests",
+})
@@ -0,0 +1,78 @@
+import json
+import threading
+
+from app.admission import ControleAdmission
+from utils.delais import temps_restant
+
+
+def _environ(chemin: str = "/ask") -> dict:
+    return {"PATH_INFO": chemin, "REQUEST_METHOD": "POST"}
+
+
+class Reponse:
+    def __init__(self):
+        self.statut = None
+        self.entetes = {}
+
+    def __call__(self, statut, entetes):
+        self.statut = statut
+        self.entetes = dict(entetes)
+
+
+def _application(environ, start_response):
+    start_response("200 OK", [("Content-Type", "application/json")])
+    return [json.dumps({"restant": temps_restant()}).encode()]
+
+
+def test_refus_immediat_file_pleine():
+    controle = ControleAdmission(_application, max_en_cours=1, max_file=0, retry_after=3)
+    occupee = controle(_environ(), Reponse())  # Réponse pas encore envoyée : la place reste prise
+
+    reponse = Reponse()
+    corps = b"".join(controle(_environ(), reponse))
+    assert reponse.statut.startswith("503")
+    assert reponse.entetes["Retry-After"] == "3"
+    assert "sollicité" in json.loads(corps)["response"]
+
+    list(occupee)  # Réponse entièrement envoyée : la place est rendue
+    reponse = Reponse()
+    list(controle(_environ(), reponse))
+    assert reponse.statut == "200 OK"
+    assert controle.statistiques() == {"en_cours": 0, "en_attente": 0}
+
+
+def test_refus_apres_attente_trop_longue():
+    controle = ControleAdmission(_application, max_en_cours=1, max_file=1, attente_max=0.1)
+    occupee = controle(_environ(), Reponse())
+    reponse = Reponse()
+    list(controle(_environ(), reponse))
+    assert reponse.statut.startswith("503")
+    occupee.close()  # Client parti : close() rend aussi la place
+    assert controle.statistiques()["en_cours"] == 0
+
+
+def test_attente_puis_admission():
+    controle = ControleAdmission(_application, max_en_cours=1, max_file=1, attente_max=2)
+    occupee = controle(_environ(), Reponse())
+    reponse = Reponse()
+    thread = threading.Thread(target=lambda: list(controle(_environ(), reponse)))
+    thread.start()
+    threading.Timer(0.1, occupee.close).start()
+    thread.join(3)
+    assert reponse.statut == "200 OK"
+
+
+def test_chemins_hors_ask_jamais_refuses():
+    controle = ControleAdmission(_application, max_en_cours=1, max_file=0)
+    occupee = controle(_environ(), Reponse())
+    reponse = Reponse()
+    list(controle(_environ("/health"), reponse))
+    assert reponse.statut == "200 OK"
+    occupee.close()
+
+
+def test_echeance_des_requetes_admises():
+    controle = ControleAdmission(_application, delai_requete=30)
+    restant = json.loads(b"".join(controle(_environ(), Reponse())))["restant"]
+    assert 29 < restant <= 30
+    assert json.loads(b"".join(controle(_environ("/ask/batch"), Reponse())))["restant"] is None
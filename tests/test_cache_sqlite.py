@@ -0,0 +1,66 @@
+import pytest
+
+import utils.cache_sqlite
+from utils.cache_sqlite import CacheSQLite, cle_cache, normaliser_texte
+
+
+class Horloge:
+    def __init__(self):
+        self.maintenant = 1_000_000.0
+
+    def __call__(self):
+        return self.maintenant
+
+
+@pytest.fixture
+def horloge(monkeypatch):
+    horloge = Horloge()
+    monkeypatch.setattr(utils.cache_sqlite.time, "time", horloge)
+    return horloge
+
+
+def test_lecture_ecriture(tmp_path):
+    cache = CacheSQLite(str(tmp_path / "cache.sqlite3"), "essai")
+    cache.ecrire("cle", {"type": "resume", "texte": "Paris"})
+    assert cache.lire("cle") == {"type": "resume", "texte": "Paris"}
+    assert cache.lire("absente", defaut="rien") == "rien"
+    assert cache.statistiques()["espaces"]["defaut"] == {"hits": 1, "misses": 1, "ecritures": 1, "taux_hit": 0.5}
+
+
+def test_expiration(tmp_path, horloge):
+    cache = CacheSQLite(str(tmp_path / "cache.sqlite3"), "essai", ttl_defaut=60)
+    cache.ecrire("courte", "a", ttl=10)
+    cache.ecrire("defaut", "b")
+    horloge.maintenant += 30
+    assert cache.lire("courte") is None
+    assert cache.lire("defaut") == "b"
+    horloge.maintenant += 31
+    assert cache.lire("defaut") is None
+
+
+def test_eviction_des_moins_recemment_utilisees(tmp_path, horloge):
+    cache = CacheSQLite(str(tmp_path / "cache.sqlite3"), "essai", max_entrees=3)
+    for i in range(5):
+        horloge.maintenant += 1
+        cache.ecrire(f"cle{i}", i)
+    horloge.maintenant += 1
+    assert cache.lire("cle0") == 0  # Relue : redevient récente
+    cache.nettoyer()
+    restantes = {cle for cle in (f"cle{i}" for i in range(5)) if cache.lire(cle) is not None}
+    assert restantes == {"cle0", "cle3", "cle4"}
+    assert cache.statistiques()["entrees"] == 3
+
+
+def test_nettoyage_retire_les_expirees(tmp_path, horloge):
+    cache = CacheSQLite(str(tmp_path / "cache.sqlite3"), "essai")
+    cache.ecrire("expiree", 1, ttl=1)
+    cache.ecrire("valide", 2, ttl=100)
+    horloge.maintenant += 10
+    cache.nettoyer()
+    assert cache.statistiques()["entrees"] == 1
+
+
+def test_cles_normalisees():
+    assert normaliser_texte("  Tour   EIFFEL ") == normaliser_texte("tour eiffel")
+    assert cle_cache("llm", normaliser_texte("Bonjour")) == cle_cache("llm", "bonjour")
+    assert cle_cache("llm", "a") != cle_cache("web", "a")
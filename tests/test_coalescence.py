@@ -0,0 +1,112 @@
+import threading
+import time
+
+from utils.coalescence import Coalesceur
+from utils.delais import EcheanceDepassee, annulable, borner
+
+
+def _en_parallele(fonction, nombre: int) -> list:
+    # `nombre` threads appellent `fonction` au même instant ; retourne leurs résultats (ou exceptions)
+    depart = threading.Barrier(nombre)
+    resultats = [None] * nombre
+
+    def client(i):
+        depart.wait()
+        try:
+            resultats[i] = fonction()
+        except Exception as e:
+            resultats[i] = e
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(nombre)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return resultats
+
+
+def test_appels_simultanes_un_seul_appel_amont():
+    coalesceur = Coalesceur("test_simultanes", inter_processus=False)
+    appels = []
+
+    def amont():
+        appels.append(1)
+        time.sleep(0.2)  # Les autres demandes arrivent pendant l'appel
+        return "résumé"
+
+    resultats = _en_parallele(lambda: coalesceur.executer("tour eiffel", amont), 20)
+    assert resultats == ["résumé"] * 20
+    assert len(appels) == 1
+    assert coalesceur.statistiques()["partages"] == 19
+
+
+def test_erreur_du_service_partagee():
+    coalesceur = Coalesceur("test_erreur", inter_processus=False)
+    appels = []
+
+    def amont():
+        appels.append(1)
+        time.sleep(0.2)
+        raise ValueError("service indisponible")
+
+    resultats = _en_parallele(lambda: coalesceur.executer("cle", amont), 5)
+    assert all(isinstance(r, ValueError) for r in resultats)
+    assert len(appels) == 1
+
+
+def test_premier_annule_les_suivants_obtiennent_un_resultat():
+    # Le premier perd une course (annulé) pendant l'appel : les autres ne reçoivent pas son échec
+    coalesceur = Coalesceur("test_annulation", inter_processus=False)
+    appels = []
+    demarre, reprendre = threading.Event(), threading.Event()
+
+    def amont():
+        appels.append(1)
+        demarre.set()
+        reprendre.wait(2)
+        borner(1.0)  # Prochain appel externe : abandonné si la requête a été annulée
+        time.sleep(0.2)  # Les suivants rejoignent l'appel refait
+        return "résumé"
+
+    annulation = threading.Event()
+    resultat_premier = []
+
+    def premier():
+        with annulable(annulation):
+            try:
+                resultat_premier.append(coalesceur.executer("volcan", amont))
+            except EcheanceDepassee as e:
+                resultat_premier.append(e)
+
+    thread = threading.Thread(target=premier)
+    thread.start()
+    assert demarre.wait(2)
+
+    suivants = []
+    threads = [threading.Thread(target=lambda: suivants.append(coalesceur.executer("volcan", amont))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)  # Les suivants attendent l'appel en cours
+    annulation.set()
+    reprendre.set()
+    thread.join(5)
+    for t in threads:
+        t.join(5)
+
+    assert isinstance(resultat_premier[0], EcheanceDepassee)
+    assert suivants == ["résumé"] * 5
+    assert len(appels) == 2  # L'appel abandonné, puis un seul appel pour tous les suivants
+    assert coalesceur.statistiques()["reprises"] == 5
+
+
+def test_desactive_chaque_appel_interroge_le_service():
+    coalesceur = Coalesceur("test_desactive", actif=False, inter_processus=False)
+    appels = []
+
+    def amont():
+        appels.append(1)
+        time.sleep(0.05)
+        return 1
+
+    _en_parallele(lambda: coalesceur.executer("cle", amont), 5)
+    assert len(appels) == 5
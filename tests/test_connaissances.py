@@ -0,0 +1,63 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from utils import monchatbot
+from utils.knowledge import BaseConnaissances, Resultat
+
+
+@pytest.fixture
+def sources(monkeypatch):
+    # La base connaît la tour Eiffel ; Wikipédia et Google répondent autre chose
+    consultees = []
+
+    def meilleure_reponse(question, *args, **kwargs):
+        consultees.append(question)
+        return Resultat("Tour Eiffel", "Réponse de la base.", "tour.json", 12.0, 1.0)
+
+    monkeypatch.setattr(monchatbot.base_connaissances, "meilleure_reponse", meilleure_reponse)
+    monkeypatch.setattr(monchatbot, "recherche_wikipedia", lambda *a, **k: "Réponse de Wikipédia.")
+    monkeypatch.setattr(monchatbot, "recherche_google", lambda *a, **k: "Réponse de Google.")
+    monkeypatch.setattr(monchatbot, "preparer_recherche_google", lambda *a, **k: None)
+    return consultees
+
+
+def test_base_repond_sans_source_demandee(sources):
+    assert "Réponse de la base." in monchatbot.obtenir_la_response("tour eiffel")
+    assert sources == ["tour eiffel"]
+
+
+def test_source_demandee_explicitement(sources):
+    assert "Réponse de Wikipédia." in monchatbot.obtenir_la_response("wikipedia tour eiffel")
+    assert "Réponse de Google." in monchatbot.obtenir_la_response("google tour eiffel")
+    assert sources == []
+
+
+def _ecrire(dossier, nom, titre, contenu):
+    with open(os.path.join(dossier, nom), "w", encoding="utf-8") as f:
+        json.dump({"titre": titre, "contenu": contenu}, f)
+
+
+def test_dossier_verifie_en_arriere_plan(tmp_path, monkeypatch):
+    documents = tmp_path / "documents"
+    documents.mkdir()
+    _ecrire(documents, "a.json", "Photosynthèse", "La photosynthèse transforme la lumière en énergie chimique.")
+    base = BaseConnaissances(str(documents), str(tmp_path / "index"), intervalle_scan=0.05)
+    scans = []
+    scanner = base._scanner
+    monkeypatch.setattr(base, "_scanner", lambda: scans.append(threading.current_thread().name) or scanner())
+    try:
+        assert base.chercher("photosynthèse")[0].titre == "Photosynthèse"  # Première recherche : index construit
+        scans.clear()
+
+        _ecrire(documents, "b.json", "Volcan", "Un volcan émet de la lave lors d'une éruption.")
+        limite = time.monotonic() + 2
+        while not base.chercher("volcan éruption") and time.monotonic() < limite:
+            time.sleep(0.02)
+        assert base.chercher("volcan éruption")[0].titre == "Volcan"
+        assert scans and set(scans) == {"connaissances"}  # Jamais sur le thread de la requête
+    finally:
+        base.arreter_surveillance()
@@ -0,0 +1,72 @@
+import threading
+import time
+
+from utils.coalescence import Coalesceur
+from utils.course import Course
+from utils.delais import borner
+
+
+def test_gagnant_le_plus_rapide_et_perdant_abandonne():
+    course = Course("test_rapide", delai=2.0)
+    perdant_abandonne = threading.Event()
+
+    def lent():
+        time.sleep(0.2)
+        try:
+            borner(1.0)
+        except Exception:
+            perdant_abandonne.set()
+            raise
+        return "lent"
+
+    def rapide():
+        time.sleep(0.05)  # Le concurrent lent a démarré : il sera abandonné en cours de route
+        return "rapide"
+
+    assert course.lancer({"rapide": rapide, "lent": lent}) == ("rapide", "rapide")
+    assert perdant_abandonne.wait(2)
+    assert course.statistiques() == {"rapide:premier": 1}
+
+
+def test_preferee_dans_la_fenetre_de_grace():
+    course = Course("test_grace", delai=2.0, preferee="wikipedia", grace=0.5)
+
+    def wikipedia():
+        time.sleep(0.1)
+        return "wikipedia"
+
+    assert course.lancer({"wikipedia": wikipedia, "google": lambda: "google"}) == ("wikipedia", "wikipedia")
+    assert course.statistiques() == {"wikipedia:preference": 1}
+
+
+def test_perdant_annule_dans_un_appel_partage():
+    # La recherche Google d'une course (perdue) et une demande « google volcan » explicite partagent le même
+    # appel : l'annulation du perdant ne doit pas priver la demande explicite de son résultat
+    coalescence = Coalesceur("test_course_partage", inter_processus=False)
+    appels = []
+    demarre = threading.Event()
+
+    def google_amont():
+        appels.append(1)
+        demarre.set()
+        time.sleep(0.2)
+        borner(1.0)  # Appel externe suivant (pages, Mistral) : abandonné si la course est perdue
+        return "page google"
+
+    def google():
+        return coalescence.executer("volcan", google_amont)
+
+    def wikipedia():
+        demarre.wait(1)
+        time.sleep(0.05)  # Le Google de la course est déjà en cours quand Wikipédia gagne
+        return "résumé wikipédia"
+
+    explicite = []
+    thread = threading.Thread(target=lambda: (demarre.wait(1), explicite.append(google())))
+    thread.start()
+    course = Course("test_partage", delai=2.0)
+    assert course.lancer({"wikipedia": wikipedia, "google": google}) == ("wikipedia", "résumé wikipédia")
+    thread.join(5)
+
+    assert explicite == ["page google"]
+    assert len(appels) == 2
@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+
+from bench.serveurs_factices import faux_hebergeur_pages
+from utils import extraction_html, google_search
+from utils.extraction_html import est_html, extraire_paragraphes
+
+TEXTE = "Ce paragraphe de test décrit le sujet demandé avec suffisamment de mots pour être retenu."
+
+
+def _morceaux(debut: str, remplissage: bytes, taille: int, lus: list):
+    # Début de page, puis du balisage sans fin (la page n'est jamais lue en entier) ; `lus` compte les morceaux produits
+    lus.append(1)
+    yield debut.encode("utf-8")
+    while True:
+        lus.append(1)
+        yield remplissage * (taille // len(remplissage))
+
+
+@pytest.mark.parametrize("content_type, attendu", [
+    ("text/html; charset=utf-8", True),
+    ("application/xhtml+xml", True),
+    ("TEXT/HTML", True),
+    (None, True),
+    ("application/pdf", False),
+    ("image/png", False),
+    ("text/plain", False),
+])
+def test_types_de_contenu(content_type, attendu):
+    assert est_html(content_type) is attendu
+
+
+def test_arret_a_la_limite_d_octets():
+    lus = []
+    paragraphes, titre, octets = extraire_paragraphes(
+        _morceaux("<html><head><title>Sans fin</title><style>", b"/* style */", 16 * 1024, lus), max_octets=64 * 1024)
+    assert octets == 64 * 1024
+    assert len(lus) == 5  # Le début, puis 4 morceaux de 16 Ko au plus : aucun morceau lu au-delà de la limite
+    assert (paragraphes, titre) == ([], "Sans fin")
+
+
+def test_arret_apres_les_premiers_paragraphes():
+    lus = []
+    debut = "<html><body>" + "".join(f"<p>{TEXTE} ({i})</p>" for i in range(5))
+    paragraphes, _, octets = extraire_paragraphes(_morceaux(debut, b"<p>suite</p>", 16 * 1024, lus), max_paragraphes=4)
+    assert paragraphes == [f"{TEXTE} ({i})" for i in range(4)]
+    assert len(lus) <= 2 and octets < 20 * 1024
+
+
+def test_paragraphe_coupe_par_la_limite():
+    page = f"<html><body><p>{TEXTE} {TEXTE}</p></body></html>".encode("utf-8")
+    paragraphes, _, octets = extraire_paragraphes([page], max_octets=len(f"<html><body><p>{TEXTE}".encode("utf-8")))
+    assert paragraphes == [TEXTE]
+    assert octets < len(page)
+
+
+def test_analyseur_standard_sans_lxml(monkeypatch):
+    monkeypatch.setattr(extraction_html, "etree", None)
+    page = f"<html><head><meta charset='latin-1'><title>Été</title></head><body><p>{TEXTE}</p>".encode("latin-1")
+    assert extraire_paragraphes([page]) == ([TEXTE], "Été", len(page))
+
+
+def test_document_non_html_ignore():
+    # Le PDF n'est pas lu : seuls ses en-têtes sont reçus
+    with faux_hebergeur_pages(taille_page=4 * 1024 * 1024) as hote:
+        assert google_search.extraire_page(hote.url + "/pdf/0/document", threading.Event()) is None
+    assert hote.compteurs == {"pdf": 1}
+
+
+def test_page_au_dela_de_la_limite(monkeypatch):
+    # Paragraphes après 1 Mo de styles : hors de la limite de lecture, la page est inexploitable
+    monkeypatch.setattr(google_search, "GOOGLE_FETCH_MAX_OCTETS", 64 * 1024)
+    with faux_hebergeur_pages(taille_page=1024 * 1024) as hote:
+        evenement = threading.Event()
+        assert google_search.extraire_page(hote.url + "/page/0/lourde", evenement) is None
+        monkeypatch.setattr(google_search, "GOOGLE_FETCH_MAX_OCTETS", 2 * 1024 * 1024)
+        assert google_search.extraire_page(hote.url + "/page/0/lourde", evenement) is not None
@@ -0,0 +1,73 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from bench.serveurs_factices import faux_hebergeur_pages
+from utils import google_search
+from utils.google_search import extraire_page, recuperer_contenu
+
+
+@pytest.fixture
+def hote():
+    with faux_hebergeur_pages(latence=0, latence_page=0, taux_pages_vides=0, paragraphes=3) as serveur:
+        yield serveur
+
+
+def _url(hote, genre: str, delai_ms: int, nom: str) -> str:
+    return f"{hote.url}/{genre}/{delai_ms}/{nom}"
+
+
+def test_classement_de_google_respecte(hote):
+    # Le premier résultat répond en dernier, mais dans la fenêtre de classement : c'est lui qui est retenu
+    urls = [_url(hote, "page", 300, "premier"), _url(hote, "page", 0, "deuxieme"), _url(hote, "page", 0, "troisieme")]
+    url, titre, contenu = recuperer_contenu(urls, fenetre_classement=2)
+    assert url == urls[0]
+    assert titre == "Page /page/300/premier"
+    assert contenu.count("\n") == 2  # Un paragraphe utile par ligne
+
+
+def test_resultat_suivant_si_le_premier_est_inexploitable(hote):
+    urls = [_url(hote, "vide", 0, "premier"), _url(hote, "page", 100, "deuxieme"), _url(hote, "page", 0, "troisieme")]
+    assert recuperer_contenu(urls, fenetre_classement=2)[0] == urls[1]
+
+
+def test_fenetre_de_classement_ecoulee(hote):
+    # Le premier résultat est trop lent : le suivant, déjà disponible, l'emporte une fois la fenêtre écoulée
+    urls = [_url(hote, "page", 1500, "premier"), _url(hote, "page", 0, "deuxieme")]
+    debut = time.monotonic()
+    assert recuperer_contenu(urls, fenetre_classement=0.1)[0] == urls[1]
+    assert time.monotonic() - debut < 1
+
+
+def test_delai_global(hote):
+    debut = time.monotonic()
+    assert recuperer_contenu([_url(hote, "page", 1500, "lente")], delai_global=0.2) is None
+    assert time.monotonic() - debut < 1
+
+
+def test_pages_en_attente_annulees(hote, monkeypatch):
+    # Une seule page à la fois : une fois la première retenue, les suivantes ne sont pas téléchargées
+    monkeypatch.setattr(google_search, "_pool_pages", ThreadPoolExecutor(max_workers=1))
+    urls = [_url(hote, "page", 50, f"page-{i}") for i in range(6)]
+    assert recuperer_contenu(urls)[0] == urls[0]
+    time.sleep(0.2)  # Laisse le temps à une éventuelle page démarrée avant l'annulation
+    assert hote.compteurs["page"] <= 2
+
+
+def test_page_annulee_non_telechargee(hote):
+    annulation = threading.Event()
+    annulation.set()
+    assert extraire_page(_url(hote, "page", 0, "perdante"), annulation) is None
+    assert hote.compteurs == {}
+
+
+def test_recherche_par_l_api(hote, monkeypatch):
+    # Résultats de l'API Custom Search dans l'ordre du classement
+    monkeypatch.setattr(google_search, "GOOGLE_API_KEY", "tests")
+    monkeypatch.setattr(google_search, "GOOGLE_CX", "tests")
+    monkeypatch.setattr(google_search, "GOOGLE_SEARCH_API_URL", hote.url + "/customsearch/v1")
+    urls = google_search.rechercher_urls("volcan", num_results=4)
+    assert [url.rsplit("-", 1)[1] for url in urls] == ["0", "1", "2", "3"]
+    assert hote.compteurs == {"recherche": 1}
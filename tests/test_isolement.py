@@ -0,0 +1,36 @@
+import math
+import time
+
+import pytest
+
+from utils.delais import echeance
+from utils.isolement import DelaiCalculDepasse, ProcessusIsoles
+
+
+@pytest.fixture
+def isolement():
+    isolement = ProcessusIsoles("tests", nombre=2, delai=5)
+    yield isolement
+    isolement.arreter()
+
+
+def test_resultat_et_erreur(isolement):
+    assert isolement.executer(math.factorial, 10) == 3628800
+    with pytest.raises(RuntimeError, match="ValueError"):
+        isolement.executer(math.sqrt, -1)
+    assert isolement.executer(pow, 2, 10) == 1024  # Le processus reste utilisable après une erreur
+    assert isolement.statistiques()["processus_libres"] == 1
+
+
+def test_calcul_trop_long_arrete(isolement):
+    debut = time.monotonic()
+    with pytest.raises(DelaiCalculDepasse):
+        isolement.executer(time.sleep, 30, delai=0.3)
+    assert time.monotonic() - debut < 2
+    assert isolement.statistiques()["delais_depasses"] == 1
+    assert isolement.executer(abs, -3) == 3  # Processus tué, remplacé au calcul suivant
+
+
+def test_echeance_de_la_requete(isolement):
+    with echeance(0.3), pytest.raises(DelaiCalculDepasse):
+        isolement.executer(time.sleep, 30)
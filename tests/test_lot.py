@@ -0,0 +1,70 @@
+import json
+import time
+
+import pytest
+
+import app.app as module_app
+import utils.monchatbot as monchatbot
+from app.app import app
+from utils.delais import temps_restant
+
+
+@pytest.fixture
+def appels(monkeypatch):
+    # Réponses factices : le lot ne sollicite aucun service externe
+    appels = {"reponses": []}
+
+    def obtenir_la_response(message):
+        appels["reponses"].append(message)
+        if message == "plante":
+            raise RuntimeError("service en panne")
+        if message == "bloque":
+            time.sleep(3)  # Ne regarde pas son échéance (calcul sans fin...)
+        if message == "échéance ?":
+            return f"{temps_restant():.1f}"
+        return f"réponse à {message}"
+
+    monkeypatch.setattr(monchatbot, "obtenir_la_response", obtenir_la_response)
+    return appels
+
+
+def _lot(messages):
+    reponse = app.test_client().post("/ask/batch", json={"messages": messages})
+    assert reponse.status_code == 200
+    assert reponse.mimetype == "application/x-ndjson"
+    return {ligne["index"]: ligne for ligne in map(json.loads, reponse.get_data(as_text=True).splitlines())}
+
+
+def test_doublons_traites_une_fois(appels):
+    lignes = _lot(["Bonjour", "tour eiffel", "  bonjour ", "BONJOUR"])
+    assert sorted(lignes) == [0, 1, 2, 3]
+    assert {lignes[i]["response"] for i in (0, 2, 3)} == {"réponse à Bonjour"}
+    assert lignes[1]["response"] == "réponse à tour eiffel"
+    assert sorted(appels["reponses"]) == ["Bonjour", "tour eiffel"]
+
+
+def test_messages_vides_et_erreurs(appels):
+    lignes = _lot(["", "salut", {"message": "   "}, "plante", 42])
+    for i in (0, 2, 4):
+        assert lignes[i] == {"index": i, "error": "Veuillez écrire quelque chose."}
+    assert lignes[1]["response"] == "réponse à salut"
+    assert lignes[3]["error"] == "Erreur interne lors du traitement."
+    assert "" not in appels["reponses"]
+
+
+def test_lot_ndjson_et_erreurs_de_format(appels):
+    reponse = app.test_client().post(
+        "/ask/batch", data='{"message": "a"}\n{"message": "b"}\n', content_type="application/x-ndjson")
+    assert {json.loads(l)["index"] for l in reponse.get_data(as_text=True).splitlines()} == {0, 1}
+    assert app.test_client().post("/ask/batch", data="[pas du json", content_type="application/json").status_code == 400
+
+
+def test_echeance_par_message(appels, monkeypatch):
+    monkeypatch.setattr(module_app, "REQUETE_DELAI", 0.3)
+    monkeypatch.setattr(module_app, "MARGE_ECHEANCE_LOT", 0.1)
+    debut = time.monotonic()
+    lignes = _lot(["bloque", "échéance ?", "salut"])
+    assert time.monotonic() - debut < 2  # Le message bloqué n'a pas retenu le flux
+    assert lignes[0] == {"index": 0, "error": "Délai dépassé pour ce message."}
+    assert lignes[1]["response"] == "0.3"  # Chaque message a sa propre échéance
+    assert lignes[2]["response"] == "réponse à salut"
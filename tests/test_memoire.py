@@ -0,0 +1,40 @@
+from app.memory import MemoireSessions, MemoireSessionsPartagee
+
+
+def test_sessions_partagees_entre_workers(tmp_path):
+    # Deux instances sur le même fichier : deux workers gunicorn
+    chemin = str(tmp_path / "cache.sqlite3")
+    worker_a = MemoireSessionsPartagee(chemin, max_tours=2)
+    worker_b = MemoireSessionsPartagee(chemin, max_tours=2)
+
+    worker_a.ajouter("session-1", "quelle est la capitale de la France ?", "Paris.")
+    worker_b.ajouter("session-1", "et sa population ?", "Environ 2,1 millions d'habitants.")
+    worker_a.ajouter("session-1", "et celle de Lyon ?", "Environ 520 000 habitants.")
+
+    historique = worker_b.historique("session-1", budget_tokens=1000)
+    assert [m["content"] for m in historique] == [
+        "et sa population ?", "Environ 2,1 millions d'habitants.", "et celle de Lyon ?", "Environ 520 000 habitants.",
+    ]
+    assert worker_a.historique("autre-session", budget_tokens=1000) == []
+
+    worker_b.oublier("session-1")
+    assert worker_a.historique("session-1", budget_tokens=1000) == []
+
+
+def test_historique_dans_le_budget():
+    memoire = MemoireSessions()
+    memoire.ajouter("s", "ancienne " * 100, "réponse")
+    memoire.ajouter("s", "récente", "réponse")
+    # L'échange ancien ne tient pas : seul le plus récent est gardé
+    assert [m["content"] for m in memoire.historique("s", budget_tokens=20)] == ["récente", "réponse"]
+
+
+def test_sessions_les_moins_recentes_oubliees():
+    memoire = MemoireSessions(max_sessions=2)
+    for session in ("a", "b"):
+        memoire.ajouter(session, "question", "réponse")
+    memoire.historique("a", budget_tokens=100)  # « a » redevient la plus récente
+    memoire.ajouter("c", "question", "réponse")
+    assert memoire.historique("b", budget_tokens=100) == []
+    assert memoire.historique("a", budget_tokens=100)
+    assert memoire.statistiques()["evictions"] == 1
@@ -0,0 +1,104 @@
+import re
+
+import utils.monchatbot as monchatbot
+from app.app import app
+from utils.metriques import Compteur, Histogramme, appel_amont, etape, marquer_route
+
+# Format texte de Prometheus (0.0.4) : commentaires HELP/TYPE, puis « nom{étiquette="valeur",...} valeur »
+_ECHANTILLON = re.compile(
+    r'(?P<nom>[a-zA-Z_:][a-zA-Z0-9_:]*)'
+    r'(?:\{(?P<etiquettes>[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\[\\"n])*"(?:,[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\[\\"n])*")*)\})?'
+    r' (?P<valeur>[-+]?(?:\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|\.\d+|Inf|NaN))'
+)
+_ETIQUETTE = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+_SUFFIXES = {"histogram": ("_bucket", "_sum", "_count"), "counter": ("", "_total"), "gauge": ("",)}
+
+
+def _analyser(texte: str) -> tuple[dict, list]:
+    # Vérifie la syntaxe de chaque ligne ; retourne (famille -> type, [(famille, nom, étiquettes, valeur)])
+    assert texte.endswith("\n")
+    types, echantillons = {}, []
+    for ligne in texte[:-1].split("\n"):
+        if ligne.startswith("# TYPE "):
+            _, _, nom, genre = ligne.split(" ")
+            assert nom not in types, f"TYPE en double : {nom}"
+            assert genre in _SUFFIXES
+            types[nom] = genre
+            continue
+        if ligne.startswith("# HELP "):
+            continue
+        trouve = _ECHANTILLON.fullmatch(ligne)
+        assert trouve, f"Ligne invalide : {ligne!r}"
+        nom = trouve["nom"]
+        famille = next(
+            (f for f, genre in types.items() for suffixe in _SUFFIXES[genre] if nom == f + suffixe), None)
+        assert famille, f"Échantillon sans TYPE préalable : {ligne!r}"
+        if echantillons and echantillons[-1][0] != famille:
+            assert famille not in {e[0] for e in echantillons}, f"Famille {famille} en plusieurs morceaux"
+        echantillons.append((famille, nom, dict(_ETIQUETTE.findall(trouve["etiquettes"] or "")), float(trouve["valeur"])))
+    return types, echantillons
+
+
+def _verifier_histogrammes(types: dict, echantillons: list) -> None:
+    # Intervalles croissants et cumulés, terminés par +Inf, égal au nombre d'observations
+    for famille in (f for f, genre in types.items() if genre == "histogram"):
+        series = {}
+        for _, nom, etiquettes, valeur in (e for e in echantillons if e[0] == famille):
+            cle = tuple(sorted((k, v) for k, v in etiquettes.items() if k != "le"))
+            serie = series.setdefault(cle, {"seuils": [], "comptes": []})
+            if nom.endswith("_bucket"):
+                serie["seuils"].append(float(etiquettes["le"].replace("+Inf", "inf")))
+                serie["comptes"].append(valeur)
+            elif nom.endswith("_count"):
+                serie["count"] = valeur
+        for serie in series.values():
+            assert serie["seuils"] == sorted(serie["seuils"]) and serie["seuils"][-1] == float("inf")
+            assert serie["comptes"] == sorted(serie["comptes"])
+            assert serie["comptes"][-1] == serie["count"]
+
+
+def test_format_prometheus(monkeypatch):
+    def obtenir_la_response(message):
+        marquer_route("tests")
+        with etape("routage"):
+            pass
+        try:
+            with appel_amont("mistral"):
+                raise TimeoutError("lent")
+        except TimeoutError:
+            pass
+        return "ok"
+
+    monkeypatch.setattr(monchatbot, "obtenir_la_response", obtenir_la_response)
+    client = app.test_client()
+    assert client.post("/ask", json={"message": "bonjour"}).status_code == 200
+
+    reponse = client.get("/metrics")
+    assert reponse.status_code == 200
+    assert reponse.headers["Content-Type"] == "text/plain; version=0.0.4; charset=utf-8"
+    types, echantillons = _analyser(reponse.get_data(as_text=True))
+    _verifier_histogrammes(types, echantillons)
+
+    assert types["chatbot_requete_duree_secondes"] == "histogram"
+    assert types["chatbot_amont_erreurs_total"] == "counter"
+    assert any(
+        nom == "chatbot_requete_duree_secondes_count" and etiquettes == {"endpoint": "/ask", "route": "tests"}
+        for _, nom, etiquettes, _ in echantillons)
+    assert any(
+        nom == "chatbot_amont_erreurs_total" and etiquettes == {"amont": "mistral", "type": "TimeoutError"} and valeur >= 1
+        for _, nom, etiquettes, valeur in echantillons)
+    assert types["chatbot_admission_en_cours"] == "gauge"  # Collecteurs enregistrés (admission, caches...)
+
+
+def test_etiquettes_echappees():
+    compteur = Compteur("tests_total", "Compteur de test", ("texte",))
+    compteur.inc('guillemet " barre \\ saut\nde ligne')
+    histogramme = Histogramme("tests_duree_secondes", "Histogramme de test", ("etape",), seuils=(0.1, 1.0))
+    for duree in (0.05, 0.5, 5.0):
+        histogramme.observer(duree, "a")
+    texte = "\n".join([*compteur.exposer(), *histogramme.exposer()]) + "\n"
+    types, echantillons = _analyser(texte)
+    _verifier_histogrammes(types, echantillons)
+    assert 'tests_total{texte="guillemet \\" barre \\\\ saut\\nde ligne"} 1' in texte
+    assert [valeur for _, nom, _, valeur in echantillons if nom.endswith("_bucket")] == [1, 2, 3]
+    assert 'tests_duree_secondes_sum{etape="a"} 5.550000' in texte
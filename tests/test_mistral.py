@@ -0,0 +1,123 @@
+import socket
+import threading
+import time
+
+from bench.serveurs_factices import faux_mistral
+from utils.coalescence import Coalesceur
+from utils.delais import echeance
+from utils.Mistral_API import MistralClient
+
+
+def _client(serveur, **reglages) -> MistralClient:
+    reglages = {"api_key": "tests", "url": serveur.url + "/v1/chat/completions", **reglages}
+    return MistralClient(**reglages)
+
+
+def test_echeance_du_premier_non_partagee():
+    # Le premier appel n'a que 0,3 s (Mistral en met 0,6) : le suivant, qui a 10 s, refait l'appel au lieu
+    # de recevoir le « Read timed out » du premier
+    with faux_mistral(latence=0.6) as serveur:
+        client = _client(serveur, coalescence=Coalesceur("tests-mistral", inter_processus=False))
+        reponses = {}
+
+        def demander(nom, delai):
+            with echeance(delai):
+                reponses[nom] = client.chat("même question")
+
+        premier = threading.Thread(target=demander, args=("premier", 0.3))
+        premier.start()
+        time.sleep(0.1)
+        demander("suivant", 10)
+        premier.join()
+
+    assert reponses["premier"].startswith("Erreur de requête")
+    assert reponses["suivant"].startswith("Réponse simulée : même question")
+    assert serveur.compteurs["chat"] == 2
+    assert client.coalescence.statistiques()["reprises"] == 1
+
+
+def test_nouvelles_tentatives_sur_429_et_5xx():
+    # Retry-After (0,2 s) respecté à chaque nouvelle tentative, au lieu du backoff
+    with faux_mistral(erreurs=[429, 503], retry_after="0.2") as serveur:
+        client = _client(serveur, backoff_base=0, max_retries=3)
+        debut = time.monotonic()
+        reponse = client.chat("bonjour")
+        duree = time.monotonic() - debut
+    assert reponse.startswith("Réponse simulée : bonjour")
+    assert serveur.compteurs["chat"] == 3
+    assert duree >= 0.4
+
+
+def test_tentatives_limitees():
+    with faux_mistral(erreurs=[502] * 5) as serveur:
+        reponse = _client(serveur, backoff_base=0, max_retries=2).chat("bonjour")
+    assert reponse.startswith("Erreur de requête : 502")
+    assert serveur.compteurs["chat"] == 3
+
+
+def test_pas_de_nouvelle_tentative_sur_les_autres_4xx():
+    for code in (400, 401, 404):
+        with faux_mistral(erreurs=[code]) as serveur:
+            reponse = _client(serveur, backoff_base=0, max_retries=3).chat("bonjour")
+        assert reponse.startswith(f"Erreur de requête : {code}")
+        assert serveur.compteurs["chat"] == 1
+
+
+def test_retry_after_au_dela_de_l_echeance():
+    # Attendre 5 s dépasserait l'échéance de la requête : abandon immédiat, sans dormir
+    with faux_mistral(erreurs=[429], retry_after="5") as serveur:
+        client = _client(serveur, max_retries=3)
+        debut = time.monotonic()
+        with echeance(1):
+            reponse = client.chat("bonjour")
+        duree = time.monotonic() - debut
+    assert reponse.startswith("Erreur de requête : Délai de la requête dépassé")
+    assert duree < 0.5
+    assert serveur.compteurs["chat"] == 1
+
+
+def test_plafond_de_requetes_en_vol():
+    with faux_mistral(latence=0.2) as serveur:
+        client = _client(serveur, max_concurrence=2)
+        appels = [threading.Thread(target=client.chat, args=(f"question {i}",)) for i in range(6)]
+        for appel in appels:
+            appel.start()
+        for appel in appels:
+            appel.join()
+    assert serveur.compteurs["chat"] == 6
+    assert serveur.en_cours_max == 2
+
+
+def test_delai_de_lecture():
+    # Mistral répond en 0,5 s, le client n'attend que 0,2 s : pas de nouvelle tentative après un délai de lecture
+    with faux_mistral(latence=0.5) as serveur:
+        client = _client(serveur, read_timeout=0.2, max_retries=3)
+        debut = time.monotonic()
+        reponse = client.chat("bonjour")
+        duree = time.monotonic() - debut
+    assert reponse.startswith("Erreur de requête") and "timed out" in reponse
+    assert duree < 0.4
+    assert serveur.compteurs["chat"] == 1
+
+
+def test_delai_de_lecture_borne_par_l_echeance():
+    with faux_mistral(latence=0.5) as serveur:
+        client = _client(serveur, read_timeout=30)
+        debut = time.monotonic()
+        with echeance(0.2):
+            reponse = client.chat("bonjour")
+        duree = time.monotonic() - debut
+    assert reponse.startswith("Erreur de requête : Délai de la requête dépassé")
+    assert duree < 0.4
+
+
+def test_connexion_impossible():
+    # Port fermé : la requête n'est jamais partie, elle est renvoyée jusqu'à max_retries fois
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    client = MistralClient(api_key="tests", url=f"http://127.0.0.1:{port}/v1/chat/completions", backoff_base=0.05, max_retries=2)
+    envois = []
+    client.session.post = lambda *a, _post=client.session.post, **k: envois.append(1) or _post(*a, **k)
+    assert client.chat("bonjour").startswith("Erreur de requête")
+    assert len(envois) == 3
@@ -0,0 +1,45 @@
+import time
+
+import pytest
+
+from utils.moteur_maths import resoudre_localement
+
+pytest.importorskip("sympy")
+
+
+@pytest.mark.parametrize("question", [
+    "simplifie 9^9^9",
+    "développe (x+1)^3000",
+    "simplifie ((x+1)^50)^50",
+    "simplifie 10^(10^5)",
+    "simplifie factorial(9^9)",
+    "factorial(100000)",
+])
+def test_calcul_symbolique_trop_long_refuse(question):
+    # Refusé avant tout calcul : la question part vers Mistral au lieu de bloquer le worker
+    debut = time.monotonic()
+    assert resoudre_localement(question) is None
+    assert time.monotonic() - debut < 2
+
+
+def test_calcul_symbolique_raisonnable():
+    assert "x^{3} + 3 x^{2} + 3 x + 1" in resoudre_localement("développe (x+1)^3")
+    assert "120" in resoudre_localement("simplifie factorial(5)")
+    assert resoudre_localement("2^10") == "2^10 = 1024"
+
+
+@pytest.mark.parametrize("question", [
+    "résous x^100 + x + 1 = 0",  # Ne se terminait pas
+    "résous x^6 + x + 1 = 0",  # Racines en CRootOf
+    "résous x^7 + x + 1 > 0",
+    "10 < 5",  # Comparaison sans inconnue
+])
+def test_equations_laissees_a_mistral(question):
+    debut = time.monotonic()
+    assert resoudre_localement(question) is None
+    assert time.monotonic() - debut < 2
+
+
+def test_equations_resolues():
+    assert "x = \\(-2\\)" in resoudre_localement("résous x^4 - 5x^2 + 4 = 0")
+    assert "\\left(2, \\infty\\right)" in resoudre_localement("résous x^2 > 4")
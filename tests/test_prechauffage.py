@@ -0,0 +1,53 @@
+import threading
+
+from app.prechauffage import Prechauffage
+
+
+def _prechauffage() -> Prechauffage:
+    return Prechauffage(actif=True, connexions=False, fichier_requetes="", delai_max=30)
+
+
+def test_rien_dans_le_processus_maitre():
+    # Configuration de gunicorn : le chargement de l'application (preload) ne lance aucun thread
+    prechauffage = _prechauffage()
+    prechauffage.lancer_dans_les_workers()
+    avant = threading.active_count()
+    prechauffage.lancer()
+    assert threading.active_count() == avant
+    assert not prechauffage.est_pret()
+
+    prechauffage.lancer(en_arriere_plan=False, dans_un_worker=True)  # post_fork
+    assert prechauffage.est_pret()
+    assert set(prechauffage.statistiques()["etapes"]) == {"imports", "pipeline"}
+
+
+def test_pret_seulement_apres_le_prechauffage(monkeypatch):
+    # /health/ready : 503 tant que le préchauffage tourne (le répartiteur de charge n'envoie rien), puis 200
+    import app.app as module_app
+    import app.prechauffage as module_prechauffage
+
+    debloquer = threading.Event()
+    monkeypatch.setattr(module_prechauffage, "_pipeline", lambda: debloquer.wait(5))
+    prechauffage = _prechauffage()
+    monkeypatch.setattr(module_app, "prechauffage", prechauffage)
+    client = module_app.app.test_client()
+
+    prechauffage.lancer()
+    reponse = client.get("/health/ready")
+    assert reponse.status_code == 503
+    assert reponse.get_json()["status"] == "prechauffage"
+    assert client.get("/health/live").status_code == 200  # Le processus répond pendant ce temps
+
+    debloquer.set()
+    assert prechauffage.pret.wait(5)
+    reponse = client.get("/health/ready")
+    assert reponse.status_code == 200
+    assert reponse.get_json()["status"] == "ok"
+    assert set(reponse.get_json()["etapes"]) == {"imports", "pipeline"}
+
+
+def test_pret_sans_prechauffage(monkeypatch):
+    import app.app as module_app
+
+    monkeypatch.setattr(module_app, "prechauffage", Prechauffage(actif=False))
+    assert module_app.app.test_client().get("/health/ready").status_code == 200
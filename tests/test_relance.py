@@ -0,0 +1,44 @@
+import pytest
+
+from utils import monchatbot
+from utils.Mistral_API import avec_historique, historique_en_cours
+
+
+@pytest.mark.parametrize("question, attendu", [
+    ("et sa population ?", True),
+    ("elle mesure combien ?", True),
+    ("pourquoi ?", True),
+    ("la photosynthèse", False),
+    ("quelle est la population de la ville de lyon en france cette année ?", False),
+])
+def test_est_relance(question, attendu):
+    assert monchatbot.est_relance(question) is attendu
+
+
+def test_relance_envoyee_a_mistral_avec_historique(monkeypatch):
+    recus = []
+
+    def chat(prompt, *args, **kwargs):
+        recus.append((prompt, historique_en_cours()))
+        return "Environ 2,1 millions d'habitants."
+
+    monkeypatch.setattr(monchatbot.client_mistral, "chat", chat)
+    historique = [{"role": "user", "content": "quelle est la capitale de la France ?"}, {"role": "assistant", "content": "Paris."}]
+    with avec_historique(historique):
+        reponse = monchatbot.obtenir_la_response("et sa population ?")
+
+    assert reponse == "Environ 2,1 millions d'habitants."
+    assert recus == [("et sa population ?", tuple(historique))]
+
+
+def test_calcul_envoye_sans_historique(monkeypatch):
+    # Le prompt de calcul se suffit à lui-même : pas d'historique, même clé de cache pour toutes les sessions
+    from utils import Calcul_Maths
+
+    recus = []
+    monkeypatch.setattr(Calcul_Maths.client_mistral, "chat", lambda prompt, **options: recus.append(options) or "42")
+    monkeypatch.setattr(Calcul_Maths.client_mistral, "stream", lambda prompt, **options: iter([recus.append(options) or "42"]))
+    with avec_historique([{"role": "user", "content": "bonjour"}, {"role": "assistant", "content": "Salut !"}]):
+        assert Calcul_Maths.resoudre_maths("explique 6*7") == "42"
+        assert list(Calcul_Maths.resoudre_maths_flux("explique 6*7")) == ["42"]
+    assert recus == [{"contexte": False}, {"contexte": False}]
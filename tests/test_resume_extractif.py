@@ -0,0 +1,65 @@
+import pytest
+
+from utils import google_search
+from utils.resume_extractif import resumer
+from utils.tokens import estimer_tokens
+
+PAGE = "\n".join([
+    "Accepter les cookies pour continuer la lecture de ce site internet.",
+    "La photosynthèse est un processus biologique qui permet aux plantes de produire de la matière organique.",
+    "Elle utilise la lumière du soleil, le dioxyde de carbone et l'eau pour fabriquer du glucose.",
+    "La photosynthèse libère aussi de l'oxygène dans l'atmosphère, ce qui est essentiel pour la vie.",
+    "La photosynthèse libère aussi de l'oxygène dans l'atmosphère terrestre.",
+    "Chez les plantes, la photosynthèse a lieu dans les chloroplastes des cellules des feuilles.",
+    "Abonnez-vous à notre lettre d'information pour recevoir nos derniers articles.",
+] + [f"La photosynthèse varie selon la saison numéro {i} et selon l'intensité de la lumière reçue." for i in range(30)])
+
+
+@pytest.mark.parametrize("budget", [20, 40, 80, 150])
+def test_budget_de_tokens_respecte(budget):
+    resume = resumer(PAGE, "photosynthèse", budget_tokens=budget)
+    assert resume.tokens_apres == estimer_tokens(resume.extrait) <= budget
+    assert resume.tokens_avant == estimer_tokens(PAGE) > budget
+
+
+def test_budget_trop_petit_pour_une_phrase():
+    resume = resumer(PAGE, "photosynthèse", budget_tokens=5)
+    assert resume.extrait and resume.tokens_apres <= 5
+
+
+def test_phrases_hors_sujet_et_doublons_ecartes():
+    extrait = resumer(PAGE, "photosynthèse", budget_tokens=1000).extrait
+    assert "cookies" not in extrait and "Abonnez-vous" not in extrait
+    assert extrait.count("libère aussi de l'oxygène") == 1  # Deux formulations de la même phrase : une seule gardée
+    assert extrait.count("selon la saison numéro") == 1
+    assert extrait.index("processus biologique") < extrait.index("chloroplastes")  # Ordre de la page
+
+
+def test_definition_en_tete_de_page():
+    assert resumer(PAGE, "photosynthèse").definition == (
+        "La photosynthèse est un processus biologique qui permet aux plantes de produire de la matière organique.")
+
+
+@pytest.mark.parametrize("texte, reglages", [
+    # Définition trop longue pour être donnée telle quelle
+    ("La photosynthèse est un processus biologique " + "très " * 80 + "important.", {}),
+    # Le sujet n'est pas avant le verbe : la phrase définit autre chose
+    ("Le glucose est une molécule produite pendant la photosynthèse des plantes vertes.", {}),
+    # Pas de tournure de définition parmi les premières phrases qui nomment le sujet
+    ("La photosynthèse a lieu le jour. La photosynthèse ralentit en hiver. La photosynthèse est un processus vital.", {}),
+    # Définitions désactivées
+    ("La photosynthèse est un processus biologique des plantes.", {"definition_max": 0}),
+])
+def test_phrases_qui_ne_sont_pas_des_definitions(texte, reglages):
+    assert resumer(texte, "photosynthèse", **reglages).definition is None
+
+
+def test_definition_sans_appel_a_mistral(monkeypatch):
+    def chat(*args, **kwargs):
+        raise AssertionError("Mistral ne doit pas être appelé")
+
+    preparation = ("prompt", "https://exemple.fr/photosynthese", "Photosynthèse", "La photosynthèse est un processus biologique.")
+    monkeypatch.setattr(google_search, "preparer_recherche_google", lambda *args, **kwargs: preparation)
+    monkeypatch.setattr(google_search.client_mistral, "chat", chat)
+    reponse = google_search.recherche_google("photosynthèse")
+    assert reponse.startswith("La photosynthèse est un processus biologique.<br><a href='https://exemple.fr/photosynthese'")
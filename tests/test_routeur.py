@@ -0,0 +1,71 @@
+import pytest
+
+from utils.routeur import (
+    RouteurIntentions, ROUTE_DEFAUT, ROUTE_GOOGLE, ROUTE_INAPPROPRIE, ROUTE_MATHS, ROUTE_SALUTATION, ROUTE_VIDE,
+    ROUTE_WIKIPEDIA,
+)
+
+
+@pytest.fixture(scope="module")
+def routeur():
+    return RouteurIntentions(
+        liste_noire=["con", "idiot"],
+        politesses=["stp", "s'il te plaît", "peux-tu"],
+        salutations={"bonjour": ["bonjour", "salut"], "merci": ["merci beaucoup"]},
+        declencheurs={"wikipedia": ROUTE_WIKIPEDIA, "google": ROUTE_GOOGLE, "calcule": ROUTE_MATHS},
+        mots_vides=["sur", "la", "le", "de"],
+    )
+
+
+@pytest.mark.parametrize("message", ["t'es con", "Espèce d'IDIOT !"])
+def test_liste_noire(routeur, message):
+    assert routeur.analyser(message).route == ROUTE_INAPPROPRIE
+
+
+@pytest.mark.parametrize("message", ["le contenu de la page", "consulte la constitution"])
+def test_liste_noire_mots_entiers(routeur, message):
+    # « con » n'est refusé que comme mot entier
+    assert routeur.analyser(message).route == ROUTE_DEFAUT
+
+
+@pytest.mark.parametrize("message, route, requete", [
+    ("wikipedia tour eiffel", ROUTE_WIKIPEDIA, "tour eiffel"),
+    ("la tour eiffel sur wikipedia stp", ROUTE_WIKIPEDIA, "tour eiffel"),
+    ("google prix du pain", ROUTE_GOOGLE, "prix du pain"),
+    ("calcule 2*3", ROUTE_MATHS, "2*3"),
+])
+def test_declencheurs_exacts(routeur, message, route, requete):
+    intention = routeur.analyser(message)
+    assert (intention.route, intention.requete) == (route, requete)
+
+
+@pytest.mark.parametrize("message, route, requete", [
+    ("wikipdia tour eiffel", ROUTE_WIKIPEDIA, "tour eiffel"),
+    ("gogle prix du pain", ROUTE_GOOGLE, "prix du pain"),
+    ("calcul 2*3", ROUTE_MATHS, "2*3"),
+])
+def test_declencheurs_avec_fautes(routeur, message, route, requete):
+    intention = routeur.analyser(message)
+    assert (intention.route, intention.requete) == (route, requete)
+
+
+def test_declencheur_prioritaire(routeur):
+    # Plusieurs mots-clés : l'ordre des déclencheurs décide
+    assert routeur.analyser("google ou wikipedia pour la tour eiffel").route == ROUTE_WIKIPEDIA
+
+
+@pytest.mark.parametrize("message, groupe", [("bonjour", "bonjour"), ("bonjuor !", "bonjour"), ("merci beaucop", "merci")])
+def test_salutations_tolerantes(routeur, message, groupe):
+    intention = routeur.analyser(message)
+    assert (intention.route, intention.groupe_salutation) == (ROUTE_SALUTATION, groupe)
+
+
+def test_politesse_retiree(routeur):
+    intention = routeur.analyser("peux-tu chercher la photosynthèse stp")
+    assert intention.route == ROUTE_DEFAUT
+    assert intention.politesse
+    assert intention.question == "chercher la photosynthèse"
+
+
+def test_message_vide(routeur):
+    assert routeur.analyser("   ").route == ROUTE_VIDE
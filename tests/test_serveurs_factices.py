@@ -0,0 +1,34 @@
+import requests
+
+from bench.serveurs_factices import _alea, faux_hebergeur_pages, faux_mistral
+
+
+def test_tirages_deterministes_et_uniformes():
+    assert _alea("page-1") == _alea("page-1")
+    tirages = [_alea(f"{identifiant}-{rang}") for identifiant in range(500) for rang in range(10)]
+    assert 0.18 < sum(t < 0.2 for t in tirages) / len(tirages) < 0.22
+    assert 0.48 < sum(t < 0.5 for t in tirages) / len(tirages) < 0.52
+
+
+def test_part_des_pages_vides():
+    with faux_hebergeur_pages(latence=0, latence_page=0, taux_pages_vides=0.3) as hote, requests.Session() as session:
+        liens = [
+            item["link"]
+            for i in range(100)
+            for item in session.get(hote.url + "/customsearch/v1", params={"q": f"sujet {i}", "num": 10}).json()["items"]
+        ]
+    vides = sum("/vide/" in lien for lien in liens)
+    assert 0.25 < vides / len(liens) < 0.35
+
+
+def _codes(graine: int) -> list[int]:
+    with faux_mistral(taux_erreur=0.5, graine=graine) as serveur, requests.Session() as session:
+        return [session.post(serveur.url + "/v1/chat/completions", json={"messages": [{"role": "user", "content": "bonjour"}]}).status_code for _ in range(40)]
+
+
+def test_erreurs_reproductibles():
+    # Mêmes réglages et même graine : les mêmes requêtes échouent d'une mesure à l'autre
+    codes = _codes(7)
+    assert codes == _codes(7)
+    assert codes != _codes(8)
+    assert 10 < codes.count(429) < 30
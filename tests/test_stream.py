@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+import utils.monchatbot as monchatbot
+from app.app import app
+from app.memory import memoire_sessions
+from bench.serveurs_factices import faux_mistral
+from utils.Mistral_API import MistralClient
+
+
+@pytest.fixture
+def flux(monkeypatch):
+    # Réponse factice en morceaux ; `etat` note ce que le générateur a produit et s'il a été fermé
+    etat = {"produits": [], "ferme": False}
+
+    def obtenir_la_response_flux(message):
+        try:
+            if message == "plante":
+                yield "Début"
+                raise RuntimeError("service en panne")
+            morceaux = ["Bon", "", "jour"] if message == "salut" else (f"morceau {i} " for i in range(1000))
+            for morceau in morceaux:
+                etat["produits"].append(morceau)
+                yield morceau
+        finally:
+            etat["ferme"] = True
+
+    monkeypatch.setattr(monchatbot, "obtenir_la_response_flux", obtenir_la_response_flux)
+    return etat
+
+
+def _evenements(corps: str) -> list[tuple]:
+    # Événements SSE (séparés par une ligne vide) : (nom, données JSON), nom None pour les simples « data: »
+    evenements = []
+    for bloc in corps.split("\n\n")[:-1]:
+        champs = dict(ligne.split(": ", 1) for ligne in bloc.split("\n"))
+        assert set(champs) <= {"event", "data"}
+        evenements.append((champs.get("event"), json.loads(champs["data"])))
+    return evenements
+
+
+def test_format_sse(flux):
+    reponse = app.test_client().post("/ask/stream", json={"message": "salut"})
+    assert reponse.status_code == 200
+    assert reponse.mimetype == "text/event-stream"
+    assert reponse.headers["Cache-Control"] == "no-cache"
+    corps = reponse.get_data(as_text=True)
+    assert corps.endswith("\n\n")
+    # Un événement par morceau non vide, puis l'événement de fin
+    assert _evenements(corps) == [(None, {"delta": "Bon"}), (None, {"delta": "jour"}), ("fin", {})]
+
+
+def test_erreur_en_cours_de_flux(flux):
+    corps = app.test_client().post("/ask/stream", json={"message": "plante"}).get_data(as_text=True)
+    assert _evenements(corps) == [(None, {"delta": "Début"}), ("erreur", {"response": "Erreur interne lors du traitement."})]
+
+
+def test_message_vide(flux):
+    reponse = app.test_client().post("/ask/stream", json={"message": "   "})
+    assert reponse.status_code == 400
+    assert not flux["produits"]
+
+
+def test_client_deconnecte(flux):
+    # Le client part après le premier événement : la production s'arrête et l'échange n'est pas mémorisé
+    reponse = app.test_client().post("/ask/stream", json={"message": "longue réponse", "session_id": "deconnexion-1"}, buffered=False)
+    evenements = iter(reponse.response)
+    assert next(evenements).startswith(b'data: {"delta": "morceau 0 "}')
+    reponse.close()
+    assert flux["ferme"]
+    assert len(flux["produits"]) < 1000
+    assert memoire_sessions.historique("deconnexion-1", 1000) == []
+
+
+def test_flux_mistral_abandonne():
+    # Fermer le flux (client parti) ferme la réponse de Mistral et rend la place « llm »
+    with faux_mistral(delai_token=0.01, taille_reponse=400) as serveur:
+        client = MistralClient(api_key="tests", url=serveur.url + "/v1/chat/completions")
+        morceaux = client.stream("bonjour")
+        assert next(morceaux).startswith("Répo")
+        assert client._limite.en_cours == 1
+        morceaux.close()
+        assert client._limite.en_cours == 0
+        assert "".join(client.stream("bonsoir")).startswith("Réponse simulée : bonsoir")
@@ -0,0 +1,64 @@
+import pytest
+
+from bench.serveurs_factices import faux_mediawiki
+from utils import wikipedia_search
+from utils.wikipedia_search import _LecteurOptions, recherche_wikipedia, recherche_wikipedia_lot
+
+
+@pytest.fixture
+def wikipedia(monkeypatch):
+    reglages = {"latence": 0, "taux_absent": 0, "taux_homonymie": 0, "taux_redirection": 0, "corrections": {"photosynthese verte": "photosynthèse"}}
+    with faux_mediawiki(**reglages) as serveur:
+        monkeypatch.setattr(wikipedia_search, "WIKIPEDIA_API_URL", serveur.url + "/w/api.php")
+        yield serveur
+
+
+def test_resume_trouve(wikipedia):
+    assert recherche_wikipedia("volcan").startswith("Volcan est un sujet")
+    assert wikipedia.compteurs == {"search": 1}
+
+
+def test_correction_proposee(wikipedia):
+    # Recherche sans résultat : relancée avec la correction de Wikipédia
+    assert recherche_wikipedia("photosynthese verte").startswith("Photosynthèse est un sujet")
+    assert wikipedia.compteurs == {"search": 3}
+
+
+def test_sans_correction(wikipedia):
+    assert recherche_wikipedia("photosynthese verte", auto_suggest=False) is None
+    assert wikipedia.compteurs == {"search": 1}
+
+
+def test_lot_sans_effet_sur_la_recherche(wikipedia):
+    # Un titre lu par appel groupé n'est pas pris pour le résultat d'une recherche sur le même texte
+    assert recherche_wikipedia_lot(["Glacier"])["Glacier"].startswith("Glacier est un sujet")
+    assert wikipedia.compteurs == {"extracts|pageprops": 1}
+    assert recherche_wikipedia("Glacier").startswith("Glacier est un sujet")
+    assert wikipedia.compteurs == {"extracts|pageprops": 1, "search": 1}
+    recherche_wikipedia_lot(["Glacier"])
+    assert wikipedia.compteurs == {"extracts|pageprops": 1, "search": 1}
+
+
+def test_options_d_une_homonymie(monkeypatch):
+    with faux_mediawiki(latence=0, taux_absent=0, taux_homonymie=1, options=3) as serveur:
+        monkeypatch.setattr(wikipedia_search, "WIKIPEDIA_API_URL", serveur.url + "/w/api.php")
+        options = recherche_wikipedia("mercure", apercus=False)
+    assert options == ["Mercure (sens 1)", "Mercure (sens 2)", "Mercure (sens 3)"]
+    assert serveur.compteurs["parse"] == 1
+
+
+def test_lecture_des_options():
+    lecteur = _LecteurOptions()
+    lecteur.feed(
+        '<link rel="mw-deduplicated-inline-style" href="mw-data:TemplateStyles:r1"/>'
+        '<div id="toc"><ul><li class="toclevel-1 tocsection-1"><a href="#Astronomie">Astronomie</a></li></ul></div>'
+        '<ul><li>Sans lien, mais <b>en gras</b></li>'
+        '<li><a href="/wiki/Mercure_(plan%C3%A8te)" title="Mercure (planète)">la planète</a>, '
+        'voir aussi <a href="/wiki/Soleil" title="Soleil">Soleil</a></li>'
+        '<li><a href="/w/index.php?title=Mercure_(film)&amp;action=edit&amp;redlink=1" class="new" title="Mercure (film)">film</a></li>'
+        '<li><a href="/wiki/Mercure_(chimie)">Mercure (chimie)</a><ul>'
+        '<li><a href="/wiki/Mercure_(alchimie)" title="Mercure (alchimie)">alchimie</a></li></ul></li>'
+        '<li><a href="https://example.org/" title="Externe">lien externe</a></li></ul>'
+    )
+    lecteur.close()
+    assert lecteur.options == ["Mercure (planète)", "Mercure (alchimie)", "Mercure (chimie)"]
@@ -1,28 +1,60 @@
-from utils.Mistral_API import Mistral  # Importe la fonction pour interagir avec l'API Mistral
-                                            
-def resoudre_maths(expression: str) -> str:
-    # Fonction qui traite une expression mathématique (avec ou sans explication),
-    # et retourne la réponse générée par l'API Mistral.
+from typing import Iterator  # Pour typer la version en streaming
 
-    expression = expression.strip()  # Supprime les espaces inutiles en début et fin d'expression
+from utils.Mistral_API import client_mistral  # Importe le client partagé pour interagir avec l'API Mistral
+from utils.moteur_maths import resoudre_localement  # Calcul local (arithmétique, SymPy) sans appel réseau
 
-    if not expression:
-        # Vérifie si l'utilisateur a bien saisi quelque chose
-        return "Tu dois entrer une expression mathématique à résoudre."
+
+def construire_prompt_maths(expression: str) -> str:
+    # Construit le prompt envoyé à Mistral pour une expression (avec ou sans explication)
 
     demande_explicite = "explique" in expression.lower()
     # Détecte si l'utilisateur demande une explication (recherche du mot "explique", insensible à la casse)
 
     if demande_explicite:
         # Si une explication est demandée, on construit un prompt instructif et détaillé
-        prompt = (
+        return (
             f"En français : explique étape par étape comment résoudre l'expression mathématique suivante, "
             f"puis donne la réponse finale à la fin :\n{expression}"
         )
-    else:
-        # Sinon, on demande un calcul direct et concis sans explication
-        prompt = (
-            f"En français : calcule cette expression mathématique et donne uniquement le résultat final, sans explication :\n{expression}"
-        )
-    
-    return Mistral(prompt)  # Envoie le prompt à l'API Mistral et retourne la réponse
\ No newline at end of file
+    # Sinon, on demande un calcul direct et concis sans explication
+    return (
+        f"En français : calcule cette expression mathématique et donne uniquement le résultat final, sans explication :\n{expression}"
+    )
+
+
+def reponse_locale(expression: str) -> str | None:
+    # Réponse du moteur local, sauf si l'utilisateur demande une explication (rédigée par Mistral)
+    if "explique" in expression.lower():
+        return None
+    return resoudre_localement(expression)
+
+
+def resoudre_maths(expression: str) -> str:
+    # Fonction qui traite une expression mathématique (avec ou sans explication) :
+    # calcul local quand c'est possible, sinon réponse générée par l'API Mistral.
+
+    expression = expression.strip()  # Supprime les espaces inutiles en début et fin d'expression
+
+    if not expression:
+        # Vérifie si l'utilisateur a bien saisi quelque chose
+        return "Tu dois entrer une expression mathématique à résoudre."
+
+    if (locale := reponse_locale(expression)) is not None:
+        return locale  # Calculé sur place : ni réseau ni tokens
+
+    prompt = construire_prompt_maths(expression)
+    # Le prompt se suffit à lui-même : sans l'historique de la conversation, la même question est trouvée
+    # en cache quelle que soit la session
+    return client_mistral.chat(prompt, contexte=False)  # Envoie le prompt à l'API Mistral et retourne la réponse
+
+
+def resoudre_maths_flux(expression: str) -> Iterator[str]:
+    # Version en streaming de resoudre_maths : la réponse locale arrive en un seul morceau
+    expression = expression.strip()
+    if not expression:
+        yield "Tu dois entrer une expression mathématique à résoudre."
+        return
+    if (locale := reponse_locale(expression)) is not None:
+        yield locale
+        return
+    yield from client_mistral.stream(construire_prompt_maths(expression), contexte=False)
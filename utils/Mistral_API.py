@@ -1,34 +1,287 @@
+import json  # Pour décoder les événements du flux de réponse
+import contextvars  # Pour désactiver le cache le temps d'une requête
+import random  # Pour ajouter un peu d'aléa (jitter) au délai entre deux tentatives
+import time  # Pour attendre entre deux tentatives
+from contextlib import contextmanager  # Pour le gestionnaire de contexte sans_cache()
+from email.utils import parsedate_to_datetime  # Pour lire un en-tête Retry-After exprimé sous forme de date
+from typing import Iterator, Optional  # Pour typer les générateurs et les arguments pouvant valoir None
+
 import requests  # Pour effectuer des requêtes HTTP
-from app.config import MISTRAL_API_KEY  # Importe la clé API depuis la configuration du projet
+from requests.adapters import HTTPAdapter  # Pour configurer le pool de connexions persistantes
 
-def Mistral(prompt, model="mistral-small"):
-    # Fonction qui envoie un prompt à l’API Mistral et retourne la réponse du modèle
+from app.config import (  # Importe la clé API et les réglages réseau depuis la configuration du projet
+    MISTRAL_API_KEY,
+    MISTRAL_API_URL,
+    MISTRAL_CONNECT_TIMEOUT,
+    MISTRAL_READ_TIMEOUT,
+    MISTRAL_MAX_RETRIES,
+    MISTRAL_BACKOFF_BASE,
+    MISTRAL_MAX_CONCURRENCE,
+    LLM_CACHE_ACTIF,
+    CACHE_DB_PATH,
+    LLM_CACHE_TTL,
+    LLM_CACHE_MAX_ENTREES,
+)
+from utils.cache_sqlite import CacheSQLite, cle_cache, normaliser_texte  # Cache disque partagé entre les workers
+from utils.coalescence import Coalesceur, DelaiCoalescenceDepasse  # Un seul appel pour les prompts identiques simultanés
+from utils.delais import EcheanceDepassee, LimiteConcurrence, borner, temps_restant  # Échéance de la requête, places « llm »
+from utils.metriques import appel_amont, compter_erreur, enregistrer_collecteur, exposer_caches  # Durées et erreurs
+
+SYSTEM_PROMPT = "Tu es un assistant utile et précis qui répond uniquement en français."  # Message système pour fixer le contexte
 
-    if not MISTRAL_API_KEY:
-        # Vérifie que la clé API est définie
-        return "Clé API Mistral manquante. Vérifie ton fichier config.py"
+CODES_A_REESSAYER = {429, 500, 502, 503, 504}  # Codes HTTP pour lesquels une nouvelle tentative a du sens
 
-    url = "https://api.mistral.ai/v1/chat/completions"  # URL de l'API Mistral pour générer une réponse
+_cache_contourne = contextvars.ContextVar("mistral_cache_contourne", default=False)  # True : ni lecture ni écriture du cache
+_historique = contextvars.ContextVar("mistral_historique", default=())  # Échanges précédents de la conversation
 
-    headers = {
-        "Authorization": f"Bearer {MISTRAL_API_KEY}",  # Authentification avec la clé API
-        "Content-Type": "application/json"  # Spécifie que les données envoyées sont au format JSON
-    }
 
-    # ✅ Préparation des données à envoyer à l'API (prompt + rôle)
-    data = {
-        "model": model,  # Nom du modèle à utiliser (ex : mistral-small)
-        "messages": [
-            {"role": "system", "content": "Tu es un assistant utile et précis qui répond uniquement en français."},  # Message système pour fixer le contexte
-            {"role": "user", "content": prompt}  # Message de l'utilisateur avec le prompt fourni
-        ]
-    }
+@contextmanager
+def sans_cache():
+    # Désactive le cache des réponses Mistral pour tout ce qui est exécuté dans le bloc (ex : une requête HTTP)
+    jeton = _cache_contourne.set(True)
+    try:
+        yield
+    finally:
+        _cache_contourne.reset(jeton)
+
 
+@contextmanager
+def avec_historique(messages: list[dict]):
+    # Ajoute les échanges précédents (rôles user/assistant) aux appels faits dans le bloc (ex : une requête HTTP)
+    jeton = _historique.set(tuple(messages))
     try:
-        response = requests.post(url, headers=headers, json=data)  # Envoie la requête POST à l’API Mistral
-        response.raise_for_status()  # Déclenche une exception si la réponse contient une erreur HTTP
-        return response.json()["choices"][0]["message"]["content"]  # Retourne le texte de réponse généré
-    except requests.exceptions.RequestException as e:
-        return f"Erreur de requête : {e}"  # En cas d'erreur réseau ou HTTP, retourne un message d'erreur
-    except KeyError:
-        return f"Réponse inattendue de l'API : {response.text}"  # Si la structure JSON est incorrecte, affiche le texte brut
+        yield
+    finally:
+        _historique.reset(jeton)
+
+
+def historique_en_cours() -> tuple:
+    # Échanges précédents de la conversation en cours (vide hors requête ou sans mémoire)
+    return _historique.get()
+
+
+class MistralClient:
+    # Client réutilisable pour l'API Mistral : connexions persistantes (keep-alive), délais de connexion/lecture,
+    # nouvelles tentatives avec backoff exponentiel sur 429/5xx (en respectant Retry-After),
+    # plafond sur le nombre de requêtes en vol (classe « llm ») et respect de l'échéance de la requête en cours.
+
+    def __init__(
+        self,
+        api_key: Optional[str] = MISTRAL_API_KEY,
+        url: str = MISTRAL_API_URL,
+        connect_timeout: float = MISTRAL_CONNECT_TIMEOUT,
+        read_timeout: float = MISTRAL_READ_TIMEOUT,
+        max_retries: int = MISTRAL_MAX_RETRIES,
+        backoff_base: float = MISTRAL_BACKOFF_BASE,
+        max_concurrence: int = MISTRAL_MAX_CONCURRENCE,
+        cache: Optional[CacheSQLite] = None,
+        coalescence: Optional[Coalesceur] = None,
+    ):
+        self.api_key = api_key
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)  # Tuple (connexion, lecture) compris par requests
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_concurrence = max_concurrence
+        self._limite = LimiteConcurrence("llm", max_concurrence, attente_max=read_timeout)  # Requêtes autorisées en même temps
+        self.cache = cache  # None : pas de cache
+        self.coalescence = coalescence  # None : chaque appel interroge l'API, même si le même prompt est en cours
+
+        # Session partagée : les connexions TCP+TLS sont réutilisées d'un appel à l'autre
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrence, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _headers(self) -> dict:
+        return {
+            "Authorization": f"Bearer {self.api_key}",  # Authentification avec la clé API
+            "Content-Type": "application/json"  # Spécifie que les données envoyées sont au format JSON
+        }
+
+    def _payload(self, prompt: str, model: str, historique: tuple = ()) -> dict:
+        # Prépare les données à envoyer à l'API (prompt + rôle), précédées des échanges de la conversation
+        return {
+            "model": model,  # Nom du modèle à utiliser (ex : mistral-small)
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                *historique,
+                {"role": "user", "content": prompt}  # Message de l'utilisateur avec le prompt fourni
+            ]
+        }
+
+    def _delai_attente(self, tentative: int, response: Optional[requests.Response]) -> float:
+        # Calcule le temps à attendre avant la prochaine tentative :
+        # Retry-After s'il est fourni par le serveur, sinon backoff exponentiel avec jitter
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return max(0.0, float(retry_after))  # Format en secondes
+                except ValueError:
+                    try:
+                        date = parsedate_to_datetime(retry_after)  # Format date HTTP
+                        return max(0.0, date.timestamp() - time.time())
+                    except (TypeError, ValueError):
+                        pass
+        return self.backoff_base * (2 ** tentative) * (0.5 + random.random() / 2)
+
+    def _envoyer(self, payload: dict, stream: bool = False) -> requests.Response:
+        # Envoie le payload à l'API avec gestion des tentatives ; lève une exception requests en cas d'échec définitif
+        tentative = 0
+        while True:
+            response = None
+            try:
+                # Délai de lecture réduit au temps qu'il reste à la requête en cours
+                timeout = (self.timeout[0], borner(self.timeout[1]))
+                with appel_amont("mistral"):  # Jusqu'aux en-têtes de la réponse (le flux est lu ensuite)
+                    response = self.session.post(
+                        self.url, headers=self._headers(), json=payload, timeout=timeout, stream=stream
+                    )
+                if response.status_code >= 400:
+                    compter_erreur("mistral", f"http_{response.status_code}")
+                if response.status_code not in CODES_A_REESSAYER or tentative >= self.max_retries:
+                    response.raise_for_status()  # Déclenche une exception si la réponse contient une erreur HTTP
+                    return response
+            except requests.exceptions.ReadTimeout as e:
+                if timeout[1] < self.timeout[1]:
+                    # Délai raccourci par l'échéance de la requête : c'est elle qui est dépassée, pas Mistral qui est lent
+                    raise EcheanceDepassee(f"Délai de la requête dépassé ({e})") from e
+                raise
+            except (requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout):
+                # Erreur de connexion : la requête n'a pas été traitée, on peut la renvoyer sans risque
+                if tentative >= self.max_retries:
+                    raise
+            delai = self._delai_attente(tentative, response)
+            if response is not None:
+                response.close()  # Rend la connexion au pool avant d'attendre
+            if (restant := temps_restant()) is not None and delai >= restant:
+                raise EcheanceDepassee("Délai de la requête dépassé avant la prochaine tentative")
+            time.sleep(delai)
+            tentative += 1
+
+    def post(self, payload: dict) -> requests.Response:
+        # Envoie le payload en respectant le plafond de requêtes simultanées
+        with self._limite.place():
+            return self._envoyer(payload)
+
+    def _cle(self, prompt: str, model: str, espace: str, historique: tuple = ()) -> Optional[str]:
+        # Clé de cache (espace, modèle, prompt système, prompt normalisé et historique éventuel),
+        # ou None si le cache n'est pas utilisé
+        if self.cache is None or _cache_contourne.get():
+            return None
+        if historique:
+            return cle_cache(espace, model, SYSTEM_PROMPT, normaliser_texte(prompt), historique)
+        return cle_cache(espace, model, SYSTEM_PROMPT, normaliser_texte(prompt))
+
+    def chat(
+        self, prompt: str, model: str = "mistral-small", espace: str = "llm", ttl: Optional[int] = None, contexte: bool = True
+    ) -> str:
+        # Envoie un prompt à l'API Mistral et retourne la réponse du modèle (ou un message d'erreur lisible).
+        # `espace` sépare les statistiques de cache (ex : "web" pour les prompts construits à partir de pages),
+        # `ttl` fixe la durée de vie de la réponse en cache, `contexte` ajoute l'historique de la conversation.
+
+        if not self.api_key:
+            # Vérifie que la clé API est définie
+            return "Clé API Mistral manquante. Vérifie ton fichier config.py"
+
+        historique = _historique.get() if contexte else ()
+        cle = self._cle(prompt, model, espace, historique)
+        if cle and (en_cache := self.cache.lire(cle, espace=espace)) is not None:
+            return en_cache
+        try:
+            if self.coalescence is None:
+                return self._demander(prompt, model, historique, cle, espace, ttl)
+
+            # Même prompt déjà envoyé par une autre requête : on attend sa réponse (ou son message d'erreur).
+            # Les délais dépassés sortent de executer() en exception : si c'est l'échéance de la requête du
+            # premier, les suivantes refont l'appel avec leur propre temps au lieu de recevoir son échec
+            cle_appel = cle or cle_cache(espace, model, SYSTEM_PROMPT, normaliser_texte(prompt), historique)
+            return self.coalescence.executer(
+                cle_appel,
+                lambda: self._demander(prompt, model, historique, cle, espace, ttl),
+                relire=(lambda: self.cache.lire(cle, espace=espace)) if cle else None,
+            )
+        except (DelaiCoalescenceDepasse, requests.exceptions.Timeout) as e:
+            return f"Erreur de requête : {e}"
+
+    def _demander(self, prompt: str, model: str, historique: tuple, cle: Optional[str], espace: str, ttl: Optional[int]) -> str:
+        # Appel effectif à l'API, puis mise en cache de la réponse (si `cle`) ; les délais dépassés (dont
+        # EcheanceDepassee) sont levés, les autres erreurs deviennent un message
+        response = None
+        try:
+            response = self.post(self._payload(prompt, model, historique))
+            contenu = response.json()["choices"][0]["message"]["content"]  # Texte de réponse généré
+        except requests.exceptions.Timeout:
+            raise
+        except requests.exceptions.RequestException as e:
+            return f"Erreur de requête : {e}"  # En cas d'erreur réseau ou HTTP, retourne un message d'erreur
+        except (KeyError, IndexError, ValueError):
+            return f"Réponse inattendue de l'API : {response.text if response is not None else ''}"  # Structure JSON incorrecte
+
+        if cle:
+            self.cache.ecrire(cle, contenu, ttl=ttl, espace=espace)  # Seules les vraies réponses sont mises en cache
+        return contenu
+
+    def stream(
+        self, prompt: str, model: str = "mistral-small", espace: str = "llm", ttl: Optional[int] = None, contexte: bool = True
+    ) -> Iterator[str]:
+        # Même chose que chat(), mais produit les morceaux de texte au fur et à mesure qu'ils arrivent (stream: true)
+
+        if not self.api_key:
+            yield "Clé API Mistral manquante. Vérifie ton fichier config.py"
+            return
+
+        historique = _historique.get() if contexte else ()
+        cle = self._cle(prompt, model, espace, historique)
+        if cle and (en_cache := self.cache.lire(cle, espace=espace)) is not None:
+            yield en_cache  # Réponse déjà connue : un seul morceau
+            return
+        morceaux = []  # Réponse complète, mise en cache si le flux va jusqu'au bout
+
+        payload = self._payload(prompt, model, historique)
+        payload["stream"] = True  # Demande à l'API d'envoyer les tokens en Server-Sent Events
+
+        try:
+            # La place reste réservée tant que le flux est en cours de lecture
+            with self._limite.place(), self._envoyer(payload, stream=True) as response:
+                # chunk_size=None : chaque morceau est transmis dès sa réception, sans attendre de remplir un tampon
+                for ligne in response.iter_lines(chunk_size=None):
+                    ligne = ligne.decode("utf-8", errors="replace")
+                    if not ligne or not ligne.startswith("data:"):
+                        continue  # Ignore les lignes vides et les commentaires SSE
+                    donnees = ligne[len("data:"):].strip()
+                    if donnees == "[DONE]":
+                        if cle and morceaux:
+                            self.cache.ecrire(cle, "".join(morceaux), ttl=ttl, espace=espace)
+                        break  # Fin du flux annoncée par l'API
+                    try:
+                        morceau = json.loads(donnees)["choices"][0]["delta"].get("content")
+                    except (KeyError, IndexError, ValueError):
+                        continue  # Événement sans texte (ex : rôle ou statistiques d'usage)
+                    if morceau:
+                        morceaux.append(morceau)
+                        yield morceau
+        except requests.exceptions.RequestException as e:
+            yield f"Erreur de requête : {e}"
+
+    def ouvrir_connexion(self) -> None:
+        # Établit la connexion TCP+TLS à l'avance (préchauffage) : elle reste dans le pool pour le premier vrai appel
+        if not self.api_key:
+            return  # Aucun appel ne sera fait
+        self.session.head(self.url, timeout=self.timeout).close()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+cache_llm = CacheSQLite(CACHE_DB_PATH, "reponses_llm", max_entrees=LLM_CACHE_MAX_ENTREES, ttl_defaut=LLM_CACHE_TTL)
+enregistrer_collecteur(exposer_caches("llm", cache_llm.statistiques))  # Taux de succès exposés sur /metrics
+
+# Client partagé par tout le processus (un pool de connexions par worker, un cache commun à tous les workers)
+client_mistral = MistralClient(cache=cache_llm if LLM_CACHE_ACTIF else None, coalescence=Coalesceur("mistral"))
+
+
+def Mistral(prompt, model="mistral-small"):
+    # Fonction historique conservée pour compatibilité : délègue au client partagé
+    return client_mistral.chat(prompt, model=model)
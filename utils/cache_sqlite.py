@@ -0,0 +1,148 @@
+import hashlib  # Pour construire des clés courtes et de taille fixe
+import json  # Pour stocker les valeurs (texte, listes, dictionnaires)
+import logging  # Pour signaler les problèmes d'accès au cache sans interrompre la requête
+import os  # Pour créer le dossier du fichier de cache
+import re  # Pour valider le nom de table
+import sqlite3  # Stockage sur disque partagé entre les processus
+import threading  # Une connexion SQLite par thread
+import time  # Pour les dates d'expiration et d'accès
+import unicodedata  # Pour normaliser les textes avant de construire une clé
+from typing import Any, Optional  # Pour typer les valeurs stockées
+
+logger = logging.getLogger(__name__)  # Logger du module
+
+_ABSENT = object()  # Sentinelle : distingue « pas dans le cache » d'une valeur None mise en cache
+
+
+def normaliser_texte(texte: str) -> str:
+    # Deux textes qui ne diffèrent que par la casse, les espaces ou la forme Unicode donnent la même clé
+    return " ".join(unicodedata.normalize("NFKC", texte).casefold().split())
+
+
+def cle_cache(*parties: Any) -> str:
+    # Construit une clé stable (sha256) à partir de plusieurs éléments sérialisables en JSON
+    brut = json.dumps(parties, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    return hashlib.sha256(brut.encode("utf-8")).hexdigest()
+
+
+class CacheSQLite:
+    # Cache clé/valeur dans un fichier SQLite (mode WAL) : partagé par tous les workers d'une même machine,
+    # conservé au redémarrage, avec expiration (TTL) par entrée et éviction LRU au-delà de `max_entrees`.
+    # Toute erreur SQLite est journalisée et traitée comme un défaut de cache : le cache ne casse jamais une requête.
+
+    EVICTION_TOUTES_LES = 128  # Nombre d'écritures entre deux passes de nettoyage
+
+    def __init__(self, chemin: str, table: str, max_entrees: int = 10000, ttl_defaut: int = 3600):
+        if not re.fullmatch(r"[a-z_][a-z0-9_]*", table):
+            raise ValueError(f"Nom de table invalide : {table!r}")
+        self.chemin = chemin
+        self.table = table
+        self.max_entrees = max_entrees
+        self.ttl_defaut = ttl_defaut
+        self._local = threading.local()  # Connexion propre à chaque thread
+        self._verrou = threading.Lock()
+        self._ecritures = 0
+        self._stats: dict[str, dict[str, int]] = {}  # Espace -> compteurs (propres au processus)
+        self._schema_pret = False
+
+    def _connexion(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            dossier = os.path.dirname(self.chemin)
+            if dossier:
+                os.makedirs(dossier, exist_ok=True)
+            conn = sqlite3.connect(self.chemin, timeout=5, isolation_level=None)  # Autocommit
+            conn.execute("PRAGMA journal_mode=WAL")  # Lecteurs et écrivain ne se bloquent pas
+            conn.execute("PRAGMA synchronous=NORMAL")  # Suffisant pour un cache
+            if not self._schema_pret:
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                    "cle TEXT PRIMARY KEY, valeur TEXT NOT NULL, expire REAL NOT NULL, acces REAL NOT NULL)"
+                )
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_acces ON {self.table}(acces)")
+                self._schema_pret = True
+            self._local.conn = conn
+        return conn
+
+    def _compter(self, espace: str, evenement: str) -> None:
+        with self._verrou:
+            compteurs = self._stats.setdefault(espace, {"hits": 0, "misses": 0, "ecritures": 0})
+            compteurs[evenement] += 1
+
+    def lire(self, cle: str, espace: str = "defaut", defaut: Any = None) -> Any:
+        # Retourne la valeur associée à la clé, ou `defaut` si elle est absente ou expirée
+        valeur = self._lire(cle)
+        if valeur is _ABSENT:
+            self._compter(espace, "misses")
+            return defaut
+        self._compter(espace, "hits")
+        return valeur
+
+    def _lire(self, cle: str) -> Any:
+        maintenant = time.time()
+        try:
+            conn = self._connexion()
+            ligne = conn.execute(
+                f"SELECT valeur, expire FROM {self.table} WHERE cle = ?", (cle,)
+            ).fetchone()
+            if ligne is None or ligne[1] < maintenant:
+                return _ABSENT
+            conn.execute(f"UPDATE {self.table} SET acces = ? WHERE cle = ?", (maintenant, cle))  # Pour l'ordre LRU
+            return json.loads(ligne[0])
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"Cache {self.table} : lecture impossible ({e})")
+            return _ABSENT
+
+    def ecrire(self, cle: str, valeur: Any, ttl: Optional[int] = None, espace: str = "defaut") -> None:
+        # Enregistre la valeur pour `ttl` secondes (ttl_defaut si non précisé)
+        maintenant = time.time()
+        expire = maintenant + (self.ttl_defaut if ttl is None else ttl)
+        try:
+            self._connexion().execute(
+                f"INSERT OR REPLACE INTO {self.table} (cle, valeur, expire, acces) VALUES (?, ?, ?, ?)",
+                (cle, json.dumps(valeur, ensure_ascii=False), expire, maintenant),
+            )
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"Cache {self.table} : écriture impossible ({e})")
+            return
+        self._compter(espace, "ecritures")
+
+        with self._verrou:
+            self._ecritures += 1
+            nettoyer = self._ecritures % self.EVICTION_TOUTES_LES == 0
+        if nettoyer:
+            self.nettoyer()
+
+    def nettoyer(self) -> None:
+        # Supprime les entrées expirées puis les moins récemment utilisées au-delà de max_entrees
+        try:
+            conn = self._connexion()
+            conn.execute(f"DELETE FROM {self.table} WHERE expire < ?", (time.time(),))
+            (total,) = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+            if total > self.max_entrees:
+                conn.execute(
+                    f"DELETE FROM {self.table} WHERE cle IN "
+                    f"(SELECT cle FROM {self.table} ORDER BY acces ASC LIMIT ?)",
+                    (total - self.max_entrees,),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Cache {self.table} : nettoyage impossible ({e})")
+
+    def vider(self) -> None:
+        try:
+            self._connexion().execute(f"DELETE FROM {self.table}")
+        except sqlite3.Error as e:
+            logger.warning(f"Cache {self.table} : vidage impossible ({e})")
+
+    def statistiques(self) -> dict:
+        # Compteurs de ce processus par espace, plus le nombre d'entrées actuellement stockées (tous processus)
+        with self._verrou:
+            stats = {espace: dict(c) for espace, c in self._stats.items()}
+        for compteurs in stats.values():
+            total = compteurs["hits"] + compteurs["misses"]
+            compteurs["taux_hit"] = round(compteurs["hits"] / total, 3) if total else 0.0
+        try:
+            (entrees,) = self._connexion().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        except sqlite3.Error:
+            entrees = None
+        return {"entrees": entrees, "espaces": stats}
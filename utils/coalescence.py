@@ -0,0 +1,182 @@
+import os  # Pour créer le dossier des verrous
+import threading  # Les appels identiques arrivent de plusieurs threads
+import time  # Pour borner l'attente d'un verrou entre processus
+import zlib  # Pour répartir les clés sur un nombre fixe de fichiers verrous
+from contextlib import contextmanager  # Pour le verrou entre processus
+from typing import Callable, Iterator, Optional, TypeVar  # Pour typer les fonctions regroupées
+
+try:
+    import fcntl  # Verrou entre les workers (indisponible sous Windows)
+except ImportError:
+    fcntl = None
+
+from app.config import (  # Activation, attente maximale et mode inter-processus
+    COALESCENCE_ACTIVE,
+    COALESCENCE_DELAI,
+    COALESCENCE_INTER_PROCESSUS,
+    COALESCENCE_DOSSIER,
+)
+from utils.delais import EcheanceDepassee, temps_restant  # L'attente ne dépasse pas l'échéance de la requête en cours
+from utils.metriques import enregistrer_collecteur  # Appels partagés exposés sur /metrics
+
+# Regroupement des appels identiques en cours (« single flight ») : quand plusieurs requêtes demandent
+# la même chose en même temps (un sujet à la mode), la première fait l'appel au service externe et
+# les suivantes attendent son résultat (ou son exception) au lieu de refaire l'appel. Si le premier abandonne
+# pour des raisons qui ne regardent que sa requête (échéance dépassée, perdant d'une course annulé), les
+# suivantes ne reçoivent pas cet échec : l'une d'elles refait l'appel, les autres l'attendent.
+# En mode inter-processus, le premier thread de chaque processus prend en plus un verrou fichier par clé :
+# les autres processus attendent ce verrou, puis relisent le cache partagé (SQLite) que le premier a rempli.
+
+T = TypeVar("T")
+
+NB_VERROUS = 256  # Fichiers verrous par service (plusieurs clés peuvent partager un fichier)
+ATTENTE_VERROU = 0.02  # Secondes entre deux essais pour prendre un verrou déjà tenu par un autre processus
+
+
+class DelaiCoalescenceDepasse(TimeoutError):
+    # Le résultat de l'appel déjà en cours n'est pas arrivé dans le délai accordé
+    pass
+
+
+class _Vol:
+    # Appel en cours pour une clé : les threads qui arrivent ensuite attendent `termine`
+    __slots__ = ("termine", "resultat", "erreur", "abandonne")
+
+    def __init__(self):
+        self.termine = threading.Event()
+        self.resultat = None
+        self.erreur: Optional[BaseException] = None
+        self.abandonne = False  # Échec propre à la requête du premier : à ne pas partager
+
+
+def _abandon_du_premier(vol: _Vol) -> bool:
+    # Échéance (ou annulation) de la requête du premier, et non réponse du service : son échec ou son
+    # résultat vide ne vaut pas pour les requêtes qui ont encore du temps
+    if isinstance(vol.erreur, EcheanceDepassee):
+        return True
+    restant = temps_restant()
+    return vol.erreur is None and vol.resultat is None and restant is not None and restant <= 0
+
+
+class Coalesceur:
+    def __init__(
+        self,
+        nom: str,
+        delai_attente: float = COALESCENCE_DELAI,
+        actif: bool = COALESCENCE_ACTIVE,
+        inter_processus: bool = COALESCENCE_INTER_PROCESSUS,
+        dossier_verrous: str = COALESCENCE_DOSSIER,
+    ):
+        self.nom = nom
+        self.delai_attente = delai_attente
+        self.actif = actif
+        self.inter_processus = inter_processus and fcntl is not None
+        self.dossier_verrous = dossier_verrous
+        self._vols: dict[str, _Vol] = {}  # Clé -> appel en cours dans ce processus
+        self._verrou = threading.Lock()
+        self._stats = {"appels": 0, "partages": 0, "relus": 0, "delais_depasses": 0, "reprises": 0}
+        if self.inter_processus:
+            os.makedirs(dossier_verrous, exist_ok=True)
+        _coalesceurs.append(self)
+
+    def executer(self, cle: str, fonction: Callable[[], T], relire: Optional[Callable[[], Optional[T]]] = None) -> T:
+        # Exécute `fonction` une seule fois pour tous les appels simultanés de même clé.
+        # `relire` (facultatif) cherche le résultat dans le cache partagé : en mode inter-processus,
+        # il est appelé une fois le verrou de la clé obtenu, avant de faire soi-même l'appel.
+        if not self.actif:
+            return fonction()
+
+        limite = time.monotonic() + self.delai_attente
+        while True:
+            with self._verrou:
+                vol = self._vols.get(cle)
+                premier = vol is None
+                if premier:
+                    vol = self._vols[cle] = _Vol()
+            if premier:
+                break
+
+            attente = max(0.0, limite - time.monotonic())
+            if (restant := temps_restant()) is not None:
+                attente = max(0.0, min(attente, restant))
+            if not vol.termine.wait(attente):
+                self._compter("delais_depasses")
+                raise DelaiCoalescenceDepasse(f"{self.nom} : pas de réponse après {self.delai_attente:g} s")
+            if vol.abandonne:
+                self._compter("reprises")
+                continue  # Le premier a abandonné pour sa propre requête : on refait l'appel (ou on rejoint le suivant)
+            self._compter("partages")
+            if vol.erreur is not None:
+                raise vol.erreur  # La même erreur pour tous ceux qui attendaient cet appel
+            return vol.resultat
+
+        try:
+            vol.resultat = self._executer_premier(cle, fonction, relire)
+            return vol.resultat
+        except BaseException as e:
+            vol.erreur = e
+            raise
+        finally:
+            vol.abandonne = _abandon_du_premier(vol)
+            with self._verrou:
+                del self._vols[cle]  # Les demandes suivantes referont l'appel (ou trouveront le cache)
+            vol.termine.set()
+
+    def _executer_premier(self, cle: str, fonction: Callable[[], T], relire: Optional[Callable[[], Optional[T]]]) -> T:
+        if not (self.inter_processus and relire):
+            self._compter("appels")
+            return fonction()
+        with self._verrou_fichier(cle):
+            # Un autre processus vient peut-être de faire le même appel pendant qu'on attendait le verrou
+            if (valeur := relire()) is not None:
+                self._compter("relus")
+                return valeur
+            self._compter("appels")
+            return fonction()
+
+    @contextmanager
+    def _verrou_fichier(self, cle: str) -> Iterator[None]:
+        chemin = os.path.join(self.dossier_verrous, f"{self.nom}-{zlib.crc32(cle.encode('utf-8')) % NB_VERROUS:03d}.lock")
+        limite = time.monotonic() + self.delai_attente
+        with open(chemin, "a") as f:
+            while True:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= limite:
+                        self._compter("delais_depasses")
+                        raise DelaiCoalescenceDepasse(f"{self.nom} : verrou tenu par un autre processus depuis {self.delai_attente:g} s")
+                    time.sleep(ATTENTE_VERROU)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _compter(self, evenement: str) -> None:
+        with self._verrou:
+            self._stats[evenement] += 1
+
+    def statistiques(self) -> dict:
+        # appels : faits au service externe ; partages : résultats reçus d'un appel en cours dans ce processus ;
+        # relus : résultats trouvés dans le cache après l'appel d'un autre processus ;
+        # reprises : appels refaits après l'abandon du premier (échéance ou annulation de sa requête)
+        with self._verrou:
+            return {**self._stats, "en_cours": len(self._vols)}
+
+
+_coalesceurs: list[Coalesceur] = []
+
+
+def _metriques_coalescence() -> Iterator[str]:
+    yield "# TYPE chatbot_coalescence_total counter"
+    for coalesceur in _coalesceurs:
+        stats = coalesceur.statistiques()
+        for resultat in ("appels", "partages", "relus", "delais_depasses", "reprises"):
+            yield f'chatbot_coalescence_total{{amont="{coalesceur.nom}",resultat="{resultat}"}} {stats[resultat]}'
+    yield "# TYPE chatbot_coalescence_en_cours gauge"
+    for coalesceur in _coalesceurs:
+        yield f'chatbot_coalescence_en_cours{{amont="{coalesceur.nom}"}} {coalesceur.statistiques()["en_cours"]}'
+
+
+enregistrer_collecteur(_metriques_coalescence)
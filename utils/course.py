@@ -0,0 +1,136 @@
+import contextvars  # Chaque concurrent reçoit une copie du contexte (trace et échéance de la requête)
+import logging  # Pour signaler les concurrents en erreur
+import threading  # Un signal d'abandon par concurrent
+import time  # Pour mesurer la course et la fenêtre de grâce
+from collections import Counter  # Issues des courses de ce processus
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED  # Concurrents lancés en parallèle
+from typing import Any, Callable, Iterator, Optional  # Pour typer les concurrents et les valeurs pouvant valoir None
+
+from app.config import DEFAUT_RECHERCHE_WORKERS  # Taille du pool partagé par les courses
+from utils.delais import annulable, echeance, temps_restant  # Délai commun et abandon des perdants
+from utils.metriques import Compteur, Histogramme, enregistrer_collecteur  # Issues exposées sur /metrics
+
+logger = logging.getLogger(__name__)  # Logger du module
+
+# Course entre plusieurs sources pour une même question : toutes sont interrogées en même temps, sous un même
+# délai, et la première réponse utile (autre que None) l'emporte. Une source préférée peut encore gagner si elle
+# répond dans la fenêtre de grâce qui suit la première réponse utile. Les perdants sont abandonnés : pas encore
+# démarrés, ils ne partent jamais ; en cours, leur prochain appel externe s'arrête (voir utils.delais.annulable).
+# Chaque issue est comptée (gagnant et raison) pour régler le délai, la source préférée et la fenêtre de grâce.
+
+_pool_course = ThreadPoolExecutor(max_workers=DEFAUT_RECHERCHE_WORKERS, thread_name_prefix="course")
+
+issues = Compteur("chatbot_course_total", "Issues des courses entre sources", ("course", "gagnant", "raison"))
+durees = Histogramme("chatbot_course_duree_secondes", "Durée des courses entre sources, par gagnant", ("course", "gagnant"))
+retards = Histogramme(
+    "chatbot_course_retard_preferee_secondes",
+    "Retard de la réponse utile de la source préférée sur la première réponse utile",
+    ("course",),
+)
+
+
+def _courir(fonction: Callable[[], Any], annulation: threading.Event, delai: float) -> Any:
+    with annulable(annulation), echeance(delai):
+        return fonction()
+
+
+class Course:
+    def __init__(self, nom: str, delai: float, preferee: Optional[str] = None, grace: float = 0.0):
+        self.nom = nom  # Nom de la course dans les métriques
+        self.delai = delai  # Secondes laissées aux concurrents (jamais au-delà de l'échéance de la requête)
+        self.preferee = preferee or None  # Concurrent qui l'emporte s'il répond dans la fenêtre de grâce
+        self.grace = grace  # Secondes d'attente de la source préférée après la première réponse utile
+        self._verrou = threading.Lock()
+        self._issues = Counter()  # (gagnant, raison) -> nombre
+
+    def lancer(self, concurrents: dict[str, Callable[[], Any]]) -> tuple[Optional[str], Any]:
+        # Lance les concurrents (nom -> fonction) ; retourne (nom, résultat) du gagnant, ou (None, None)
+        debut = time.monotonic()
+        delai = self.delai
+        if (restant := temps_restant()) is not None:
+            delai = min(delai, max(restant, 0.0))
+        limite = debut + delai
+        annulations = {nom: threading.Event() for nom in concurrents}
+        futures = {
+            _pool_course.submit(contextvars.copy_context().run, _courir, fonction, annulations[nom], delai): nom
+            for nom, fonction in concurrents.items()
+        }
+        utiles: dict[str, tuple[Any, float]] = {}  # Nom -> (résultat, instant de la réponse)
+        en_cours = set(futures)
+        gagnant, raison = None, "aucun_resultat"
+
+        try:
+            while True:
+                maintenant = time.monotonic()
+                premier = min(utiles, key=lambda nom: utiles[nom][1]) if utiles else None
+                if self.preferee in utiles:
+                    gagnant, raison = self.preferee, "premier" if premier == self.preferee else "preference"
+                elif premier is not None:
+                    preferee_en_cours = any(futures[future] == self.preferee for future in en_cours)
+                    if not preferee_en_cours:
+                        gagnant, raison = premier, "premier"
+                    elif maintenant - utiles[premier][1] >= self.grace:
+                        gagnant, raison = premier, "grace_expiree"
+                if gagnant is not None:
+                    break
+                if not en_cours:
+                    break  # Tous ont répondu, aucun utilement
+                if maintenant >= limite:
+                    raison = "delai"
+                    break
+
+                attente = limite - maintenant
+                if premier is not None:
+                    attente = min(attente, utiles[premier][1] + self.grace - maintenant)
+                termines, en_cours = wait(en_cours, timeout=max(attente, 0), return_when=FIRST_COMPLETED)
+                for future in termines:
+                    nom = futures[future]
+                    try:
+                        resultat = future.result()
+                    except Exception as e:  # Un concurrent en erreur perd simplement la course
+                        logger.warning(f"Course {self.nom} : {nom} en erreur ({e})")
+                        continue
+                    if resultat is not None:
+                        utiles[nom] = (resultat, time.monotonic())
+        finally:
+            for nom, annulation in annulations.items():
+                if nom != gagnant:
+                    annulation.set()
+            for future in en_cours:
+                future.cancel()  # Pas encore démarré : ne partira jamais
+
+        self._noter(gagnant, raison, time.monotonic() - debut)
+        if gagnant is not None and gagnant != self.preferee:
+            self._suivre_preferee(futures, en_cours, utiles[gagnant][1])
+        elif raison == "preference":
+            retards.observer(utiles[gagnant][1] - utiles[premier][1], self.nom)
+        return (gagnant, utiles[gagnant][0]) if gagnant is not None else (None, None)
+
+    def _suivre_preferee(self, futures: dict, en_cours: set, depuis: float) -> None:
+        # La source préférée a perdu mais tourne encore : son retard éventuel est mesuré quand elle finit
+        for future in en_cours:
+            if futures[future] == self.preferee:
+                def noter(future):
+                    if not future.cancelled() and future.exception() is None and future.result() is not None:
+                        retards.observer(time.monotonic() - depuis, self.nom)
+                future.add_done_callback(noter)
+
+    def _noter(self, gagnant: Optional[str], raison: str, duree: float) -> None:
+        gagnant = gagnant or "aucun"
+        with self._verrou:
+            self._issues[(gagnant, raison)] += 1
+        issues.inc(self.nom, gagnant, raison)
+        durees.observer(duree, self.nom, gagnant)
+
+    def statistiques(self) -> dict:
+        # Nombre de courses par issue, « gagnant:raison » (ex : « wikipedia:preference », « aucun:delai »)
+        with self._verrou:
+            return {f"{gagnant}:{raison}": nombre for (gagnant, raison), nombre in sorted(self._issues.items())}
+
+
+def _metriques_courses() -> Iterator[str]:
+    for metrique in (issues, durees, retards):
+        yield from metrique.exposer()
+
+
+enregistrer_collecteur(_metriques_courses)
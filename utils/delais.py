@@ -0,0 +1,129 @@
+import contextvars  # Échéance de la requête en cours, propre à chaque requête (et copiée dans les threads du pool)
+import threading  # Pour limiter le nombre d'appels simultanés par type de service
+import time  # Pour calculer le temps restant
+from contextlib import contextmanager  # Pour les blocs à échéance et les places réservées
+from typing import Iterator, Optional  # Pour typer les générateurs et les valeurs pouvant valoir None
+
+import requests  # Les dépassements sont des Timeout : ils suivent le chemin d'erreur des appels HTTP
+
+from app.config import WEB_MAX_CONCURRENCE  # Appels simultanés vers Wikipédia et Google, par processus
+from utils.metriques import enregistrer_collecteur  # Places occupées exposées sur /metrics
+
+# Échéance de la requête HTTP en cours (fixée à l'admission) : chaque appel externe borne son propre délai
+# (connexion, lecture, attente d'une place, nouvelles tentatives) par le temps qu'il reste à la requête.
+# Limites de concurrence par type de service : « llm » (Mistral, plafond du client Mistral) et « web »
+# (Wikipédia, recherche Google), pour qu'un service lent n'occupe pas tous les threads du worker.
+# Un travail abandonné (perdant d'une course, voir utils/course.py) n'a plus de temps restant : son prochain
+# appel externe s'arrête aussitôt.
+
+_echeance = contextvars.ContextVar("chatbot_echeance", default=None)  # Instant (time.monotonic) ou None
+_annulation = contextvars.ContextVar("chatbot_annulation", default=None)  # threading.Event levé à l'abandon, ou None
+
+
+class EcheanceDepassee(requests.exceptions.Timeout):
+    # Plus de temps pour cette requête : l'appel n'est pas (ou plus) tenté
+    pass
+
+
+class ServiceSature(requests.exceptions.ConnectionError):
+    # Toutes les places de ce type de service sont prises, et aucune ne s'est libérée à temps
+    pass
+
+
+def definir_echeance(secondes: Optional[float]) -> contextvars.Token:
+    # Fixe l'échéance à maintenant + `secondes` (None ou 0 : pas d'échéance) ; retourne le jeton pour la rétablir
+    return _echeance.set(time.monotonic() + secondes if secondes else None)
+
+
+def retablir_echeance(jeton: contextvars.Token) -> None:
+    _echeance.reset(jeton)
+
+
+@contextmanager
+def echeance(secondes: Optional[float]):
+    # Échéance pour tout ce qui est exécuté dans le bloc (jamais plus tardive que celle déjà en place)
+    restant = temps_restant()
+    if restant is not None and (not secondes or restant < secondes):
+        secondes = max(restant, 1e-6)
+    jeton = definir_echeance(secondes)
+    try:
+        yield
+    finally:
+        retablir_echeance(jeton)
+
+
+@contextmanager
+def annulable(annulation: threading.Event):
+    # Les appels externes faits dans le bloc sont abandonnés (EcheanceDepassee) une fois `annulation` levé
+    jeton = _annulation.set(annulation)
+    try:
+        yield
+    finally:
+        _annulation.reset(jeton)
+
+
+def temps_restant() -> Optional[float]:
+    # Secondes avant l'échéance de la requête en cours (négatif si dépassée), ou None s'il n'y en a pas
+    if (annulation := _annulation.get()) is not None and annulation.is_set():
+        return 0.0  # Travail abandonné : plus de temps pour lui
+    limite = _echeance.get()
+    return None if limite is None else limite - time.monotonic()
+
+
+def borner(delai: float) -> float:
+    # Délai d'un appel, réduit au temps restant à la requête ; lève EcheanceDepassee s'il ne reste rien
+    restant = temps_restant()
+    if restant is None:
+        return delai
+    if restant <= 0:
+        raise EcheanceDepassee("Délai de la requête dépassé")
+    return min(delai, restant)
+
+
+_limites: dict[str, "LimiteConcurrence"] = {}
+
+
+class LimiteConcurrence:
+    def __init__(self, nom: str, maximum: int, attente_max: float = 5.0):
+        self.nom = nom
+        self.maximum = maximum
+        self.attente_max = attente_max  # Attente maximale d'une place (sans échéance plus proche)
+        self._places = threading.BoundedSemaphore(maximum)
+        self._verrou = threading.Lock()
+        self.en_cours = 0
+        self.refus = 0
+        _limites[nom] = self  # Une seule limite par classe dans les métriques (la dernière créée)
+
+    @contextmanager
+    def place(self) -> Iterator[None]:
+        # Réserve une place pour un appel ; lève ServiceSature (ou EcheanceDepassee) si aucune ne se libère à temps
+        if not self._places.acquire(timeout=borner(self.attente_max)):
+            with self._verrou:
+                self.refus += 1
+            if (restant := temps_restant()) is not None and restant <= self.attente_max:
+                raise EcheanceDepassee(f"Délai de la requête dépassé en attendant une place ({self.nom})")
+            raise ServiceSature(f"Trop d'appels {self.nom} en cours, réessaie plus tard.")
+        with self._verrou:
+            self.en_cours += 1
+        try:
+            yield
+        finally:
+            with self._verrou:
+                self.en_cours -= 1
+            self._places.release()
+
+
+limite_web = LimiteConcurrence("web", WEB_MAX_CONCURRENCE)
+
+
+def _metriques_limites():
+    limites = sorted(_limites.items())
+    yield "# TYPE chatbot_amont_places_occupees gauge"
+    for nom, limite in limites:
+        yield f'chatbot_amont_places_occupees{{classe="{nom}"}} {limite.en_cours}'
+    yield "# TYPE chatbot_amont_places_refusees_total counter"
+    for nom, limite in limites:
+        yield f'chatbot_amont_places_refusees_total{{classe="{nom}"}} {limite.refus}'
+
+
+enregistrer_collecteur(_metriques_limites)
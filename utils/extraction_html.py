@@ -0,0 +1,168 @@
+import codecs  # Décodage incrémental des morceaux d'octets reçus
+import re  # Pour repérer l'encodage déclaré dans le début de la page
+from html.parser import HTMLParser  # Analyseur incrémental de la bibliothèque standard
+from typing import Iterable, Optional  # Pour typer les morceaux reçus et les valeurs pouvant valoir None
+
+try:
+    from lxml import etree  # Analyseur en C, plus rapide, utilisé s'il est installé
+except ImportError:
+    etree = None
+
+# Extraction en flux des premiers paragraphes d'une page HTML : les morceaux téléchargés sont donnés à un
+# analyseur incrémental au fur et à mesure, et la lecture s'arrête dès que les paragraphes voulus sont lus
+# (ou quand la limite d'octets est atteinte). La page n'est jamais chargée ni analysée en entier.
+
+_TYPES_HTML = ("text/html", "application/xhtml+xml")
+_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.IGNORECASE)
+_IGNORES = {"script", "style", "noscript", "template", "svg"}  # Leur texte n'est jamais du contenu lisible
+
+
+def est_html(content_type: Optional[str]) -> bool:
+    # Type de contenu annoncé par le serveur ; absent, on tente quand même l'analyse
+    if not content_type:
+        return True
+    return content_type.split(";")[0].strip().lower() in _TYPES_HTML
+
+
+class _Collecteur:
+    # Reçoit les événements de l'analyseur (interface « target » de lxml) et garde le titre et les paragraphes
+
+    def __init__(self, max_paragraphes: int, longueur_min: int):
+        self.max_paragraphes = max_paragraphes
+        self.longueur_min = longueur_min
+        self.paragraphes: list[str] = []  # Paragraphes assez longs, dans l'ordre de la page
+        self.vus = 0  # Nombre de paragraphes rencontrés (courts compris)
+        self.titre: Optional[str] = None
+        self._texte: Optional[list[str]] = None  # Texte du paragraphe ou du titre en cours
+        self._dans = None  # "p" ou "title"
+        self._ignores = 0  # Profondeur dans <script>, <style>...
+
+    @property
+    def termine(self) -> bool:
+        return self.vus >= self.max_paragraphes
+
+    def _fermer(self) -> None:
+        texte = " ".join("".join(self._texte).split())
+        if self._dans == "p":
+            self.vus += 1
+            if len(texte) > self.longueur_min:
+                self.paragraphes.append(texte)
+        elif self.titre is None and texte:
+            self.titre = texte
+        self._texte, self._dans = None, None
+
+    def start(self, tag: str, attrib=None) -> None:
+        tag = tag.lower()
+        if tag in _IGNORES:
+            self._ignores += 1
+        elif tag in ("p", "title") and not self.termine:
+            if self._dans == "p":
+                self._fermer()  # <p> ne s'imbrique pas : un nouveau paragraphe ferme le précédent
+            if tag == "p" and self.termine:
+                return
+            self._dans, self._texte = tag, []
+
+    def end(self, tag: str) -> None:
+        tag = tag.lower()
+        if tag in _IGNORES:
+            self._ignores = max(0, self._ignores - 1)
+        elif tag == self._dans:
+            self._fermer()
+
+    def data(self, texte: str) -> None:
+        if self._texte is not None and not self._ignores:
+            self._texte.append(texte)
+
+    def close(self) -> None:
+        if self._dans:
+            self._fermer()  # Paragraphe coupé par la limite d'octets : on garde ce qui a été lu
+
+
+class _AnalyseurStandard(HTMLParser):
+    # html.parser de la bibliothèque standard, branché sur le même collecteur que lxml
+
+    def __init__(self, collecteur: _Collecteur, encodage: str):
+        super().__init__(convert_charrefs=True)
+        self.collecteur = collecteur
+        self._decodeur = codecs.getincrementaldecoder(encodage)(errors="replace")
+
+    def handle_starttag(self, tag, attrs):
+        self.collecteur.start(tag)
+
+    def handle_endtag(self, tag):
+        self.collecteur.end(tag)
+
+    def handle_data(self, data):
+        self.collecteur.data(data)
+
+    def envoyer(self, morceau: bytes) -> None:
+        self.feed(self._decodeur.decode(morceau))
+
+    def terminer(self) -> None:
+        self.feed(self._decodeur.decode(b"", final=True))
+        self.close()
+        self.collecteur.close()
+
+
+class _AnalyseurLxml:
+    # Analyseur HTML de lxml en mode incrémental (il gère lui-même l'encodage)
+
+    def __init__(self, collecteur: _Collecteur, encodage: str):
+        self.collecteur = collecteur
+        self._analyseur = etree.HTMLParser(target=collecteur, encoding=encodage, recover=True)
+
+    def envoyer(self, morceau: bytes) -> None:
+        self._analyseur.feed(morceau)
+
+    def terminer(self) -> None:
+        try:
+            self._analyseur.close()
+        except etree.Error:
+            self.collecteur.close()  # Document vide ou tronqué
+
+
+def _encodage(declare: Optional[str], debut: bytes) -> str:
+    # Encodage annoncé par l'en-tête HTTP, sinon par une balise <meta>, sinon UTF-8
+    for candidat in (declare, (m.group(1).decode("ascii", "ignore") if (m := _CHARSET.search(debut)) else None)):
+        if candidat:
+            try:
+                return codecs.lookup(candidat).name
+            except LookupError:
+                pass
+    return "utf-8"
+
+
+def _nouvel_analyseur(collecteur: _Collecteur, encodage: str):
+    return (_AnalyseurLxml if etree is not None else _AnalyseurStandard)(collecteur, encodage)
+
+
+def extraire_paragraphes(
+    morceaux: Iterable[bytes],
+    encodage: Optional[str] = None,
+    max_paragraphes: int = 4,
+    longueur_min: int = 60,
+    max_octets: int = 1024 * 1024,
+) -> tuple[list[str], Optional[str], int]:
+    # Parmi les `max_paragraphes` premiers <p>, ceux de plus de `longueur_min` caractères.
+    # Retourne (paragraphes, titre, octets lus) ; s'arrête dès que les paragraphes sont lus ou à `max_octets`.
+    collecteur = _Collecteur(max_paragraphes, longueur_min)
+    analyseur = None
+    debut = b""  # Premiers octets, gardés jusqu'à pouvoir y chercher l'encodage déclaré
+    lus = 0
+    for morceau in morceaux:
+        morceau = morceau[:max_octets - lus]
+        lus += len(morceau)
+        if analyseur is None:
+            debut += morceau
+            if len(debut) < 1024 and lus < max_octets:
+                continue
+            morceau, analyseur = debut, _nouvel_analyseur(collecteur, _encodage(encodage, debut))
+        analyseur.envoyer(morceau)
+        if collecteur.termine or lus >= max_octets:
+            break
+    if analyseur is None and debut:
+        analyseur = _nouvel_analyseur(collecteur, _encodage(encodage, debut))  # Page de moins de 1 Ko
+        analyseur.envoyer(debut)
+    if analyseur is not None:
+        analyseur.terminer()
+    return collecteur.paragraphes, collecteur.titre, lus
@@ -1,15 +1,191 @@
+import contextvars  # Pour transmettre la trace de la requête aux threads de téléchargement
 import logging  # Pour gérer les logs d'informations, d'erreurs, etc.
+import threading  # Pour signaler aux téléchargements encore en cours qu'ils peuvent s'arrêter
+import time  # Pour mesurer le délai global de la recherche
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED  # Pour télécharger les pages en parallèle
 from googlesearch import search  # Pour effectuer une recherche Google à partir d'une requête
-from bs4 import BeautifulSoup  # Pour analyser et extraire du texte HTML
 import requests  # Pour faire des requêtes HTTP
 from typing import Optional  # Pour indiquer qu'un argument peut être de type ou None
 
-from utils.Mistral_API import Mistral  # Importe la fonction pour interroger l'API Mistral
+from utils.Mistral_API import client_mistral  # Importe le client partagé pour interroger l'API Mistral
+from utils.cache_sqlite import cle_cache, normaliser_texte  # Clé des recherches identiques
+from utils.coalescence import Coalesceur, DelaiCoalescenceDepasse  # Un seul appel pour les recherches identiques simultanées
+from utils.delais import EcheanceDepassee, ServiceSature, borner, limite_web  # Échéance de la requête et places « web »
+from utils.extraction_html import est_html, extraire_paragraphes  # Lecture en flux des premiers paragraphes
+from utils.metriques import appel_amont, etape  # Durées et erreurs des appels externes, durée du résumé local
+from utils.resume_extractif import resumer  # Phrases utiles des pages, avant l'envoi à Mistral
+from app.config import (  # Réglages du téléchargement parallèle des pages
+    GOOGLE_FETCH_WORKERS,
+    GOOGLE_FETCH_TIMEOUT,
+    GOOGLE_FETCH_DEADLINE,
+    GOOGLE_FETCH_GRACE,
+    GOOGLE_FETCH_MAX_OCTETS,
+    LLM_CACHE_TTL_WEB,
+    RESUME_ACTIF,
+    GOOGLE_API_KEY,
+    GOOGLE_CX,
+    GOOGLE_SEARCH_API_URL,
+)
 
 logger = logging.getLogger(__name__)  # Initialise un logger spécifique au module courant
 
-def recherche_google(query: str, logger: Optional[logging.Logger] = None, num_results: int = 3) -> Optional[str]:
-    # Fonction qui cherche un mot via Google, extrait du texte utile d’un site, et demande à Mistral de résumer
+# Pool de threads partagé : borne le nombre de pages téléchargées en même temps par processus
+_pool_pages = ThreadPoolExecutor(max_workers=GOOGLE_FETCH_WORKERS, thread_name_prefix="google-pages")
+
+TAILLE_MORCEAU = 16 * 1024  # Octets lus à chaque fois sur la connexion
+
+_session_recherche = requests.Session()  # Connexions réutilisées d'une recherche à l'autre (API Custom Search)
+
+# Recherche + téléchargement des pages, partagés entre les requêtes identiques simultanées
+# (le résumé par Mistral est ensuite partagé par le client Mistral lui-même)
+coalescence_google = Coalesceur("google")
+
+
+def lien_source(url: str, titre: str) -> str:
+    # Lien cliquable vers la page d'où provient le contenu résumé
+    return f"<br><a href='{url}' target='_blank' rel='noopener noreferrer'>{titre}</a>"
+
+
+def extraire_page(url: str, annulation: threading.Event, timeout: float = GOOGLE_FETCH_TIMEOUT) -> Optional[tuple[str, str]]:
+    # Télécharge une page en flux et retourne (contenu, titre), ou None si elle ne contient rien d'exploitable.
+    # La lecture s'arrête dès que les premiers paragraphes sont analysés, ou à GOOGLE_FETCH_MAX_OCTETS.
+
+    if annulation.is_set():
+        return None  # Une autre page a déjà gagné, inutile de télécharger celle-ci
+
+    with appel_amont("page"), requests.get(url, timeout=timeout, stream=True) as response:  # Seuls les en-têtes sont lus ici
+        response.raise_for_status()  # Provoque une erreur si le code HTTP n’est pas 200
+
+        type_contenu = response.headers.get("Content-Type", "")
+        if not est_html(type_contenu):
+            logger.info(f"Page ignorée ({type_contenu}) : {url}")  # PDF, image... : rien à extraire
+            return None
+
+        def morceaux():
+            for morceau in response.iter_content(chunk_size=TAILLE_MORCEAU):
+                if annulation.is_set():
+                    return  # Une autre page a gagné : on arrête de télécharger celle-ci
+                yield morceau
+
+        # Encodage annoncé par le serveur (sinon cherché dans la page) ; paragraphes de plus de 60 caractères
+        # parmi les 4 premiers, comme avant, mais sans charger ni analyser toute la page
+        encodage = requests.utils.get_encoding_from_headers(response.headers) if "charset" in type_contenu else None
+        paragraphes, titre, _ = extraire_paragraphes(morceaux(), encodage=encodage, max_octets=GOOGLE_FETCH_MAX_OCTETS)
+
+    if annulation.is_set() or not paragraphes:
+        return None
+    return "\n".join(paragraphes), titre or url  # Un paragraphe par ligne ; titre de la page, ou l'URL si absent
+
+
+def rechercher_urls(query: str, num_results: int = 3) -> list[str]:
+    # Adresses des premiers résultats : API Custom Search JSON si une clé est configurée,
+    # sinon lecture de la page de résultats de Google (bibliothèque googlesearch)
+    if not (GOOGLE_API_KEY and GOOGLE_CX):
+        return list(search(query, num_results=num_results, lang="fr"))
+    response = _session_recherche.get(
+        GOOGLE_SEARCH_API_URL,
+        params={"key": GOOGLE_API_KEY, "cx": GOOGLE_CX, "q": query, "num": min(num_results, 10), "lr": "lang_fr"},
+        timeout=borner(GOOGLE_FETCH_TIMEOUT),
+    )
+    response.raise_for_status()
+    return [item["link"] for item in response.json().get("items", []) if item.get("link")]
+
+
+def ouvrir_connexions() -> None:
+    # Établit à l'avance la connexion à l'API de recherche (préchauffage), si elle est utilisée
+    if GOOGLE_API_KEY and GOOGLE_CX:
+        _session_recherche.head(GOOGLE_SEARCH_API_URL, timeout=GOOGLE_FETCH_TIMEOUT).close()
+
+
+def fermer_connexions() -> None:
+    _session_recherche.close()  # La session reste utilisable : de nouvelles connexions seront ouvertes
+
+
+def recuperer_contenu(
+    urls: list[str],
+    logger: Optional[logging.Logger] = None,
+    delai_global: float = GOOGLE_FETCH_DEADLINE,
+    fenetre_classement: float = GOOGLE_FETCH_GRACE,
+) -> Optional[tuple[str, str, str]]:
+    # Télécharge les pages en parallèle et retourne (url, titre, contenu) de la première page exploitable.
+    # L'ordre du classement Google est respecté : un résultat moins bien classé n'est retenu que si
+    # les pages mieux classées ont échoué, ou n'ont pas répondu dans la fenêtre `fenetre_classement`.
+
+    if logger is None:
+        logger = logging.getLogger(__name__)
+
+    delai_global = borner(delai_global)  # Jamais au-delà de l'échéance de la requête en cours
+    annulation = threading.Event()  # Mis à True dès qu'on a un gagnant : les autres téléchargements s'arrêtent
+    limite = time.monotonic() + delai_global
+    futures = {
+        # Chaque téléchargement reçoit une copie du contexte : ses durées rejoignent la trace de la requête
+        _pool_pages.submit(contextvars.copy_context().run, extraire_page, url, annulation, min(GOOGLE_FETCH_TIMEOUT, delai_global)): i
+        for i, url in enumerate(urls)
+    }
+    resultats: dict[int, Optional[tuple[str, str]]] = {}  # Rang -> résultat pour les pages terminées
+    en_cours = set(futures)
+    candidat_depuis = None  # Instant où un résultat exploitable (mais pas le mieux classé) est devenu disponible
+
+    try:
+        while True:
+            # Cherche le gagnant : le premier rang exploitable dont tous les rangs précédents sont terminés
+            candidat = None
+            for i in range(len(urls)):
+                if i not in resultats:
+                    break  # Une page mieux classée est encore en cours
+                if resultats[i]:
+                    return urls[i], resultats[i][1], resultats[i][0]
+
+            # Sinon, le meilleur résultat exploitable déjà disponible (s'il y en a un)
+            for i in sorted(resultats):
+                if resultats[i]:
+                    candidat = i
+                    break
+
+            maintenant = time.monotonic()
+            if candidat is not None:
+                candidat_depuis = candidat_depuis or maintenant
+                if not en_cours or maintenant - candidat_depuis >= fenetre_classement:
+                    return urls[candidat], resultats[candidat][1], resultats[candidat][0]
+
+            if not en_cours or maintenant >= limite:
+                if en_cours:
+                    logger.warning(f"Délai global dépassé, {len(en_cours)} page(s) abandonnée(s).")
+                return None
+
+            attente = limite - maintenant
+            if candidat is not None:
+                attente = min(attente, candidat_depuis + fenetre_classement - maintenant)
+            termines, en_cours = wait(en_cours, timeout=max(attente, 0), return_when=FIRST_COMPLETED)
+
+            for future in termines:
+                rang = futures[future]
+                try:
+                    resultats[rang] = future.result()
+                except Exception as e:
+                    logger.warning(f"Erreur en lisant {urls[rang]} : {e}")  # Log d’erreur si une page n’a pas pu être lue
+                    resultats[rang] = None
+    finally:
+        annulation.set()
+        for future in en_cours:
+            future.cancel()  # Les pages pas encore démarrées ne seront jamais téléchargées
+
+
+def construire_prompt(query: str, contenu: str) -> str:
+    # 🧠 Prompt orienté "définir le mot" : demande à Mistral une explication à partir du texte trouvé
+    return (
+        f"Voici un extrait de texte qui parle du mot « {query} » :\n\n"
+        f"{contenu}\n\n"
+        f"Explique simplement ce que signifie le mot « {query} » en français, en 2 phrases maximum."
+    )
+
+
+def preparer_recherche_google(
+    query: str, logger: Optional[logging.Logger] = None, num_results: int = 3
+) -> Optional[tuple[str, str, str, Optional[str]]]:
+    # Cherche un mot via Google et extrait du texte utile d’un site ; retourne (prompt pour Mistral, url, titre,
+    # définition) ou None si rien d'exploitable n'a été trouvé. Définition : courte définition trouvée en tête
+    # de page, à donner telle quelle sans appeler Mistral (None sinon)
 
     if logger is None:
         logger = logging.getLogger(__name__)  # Si aucun logger n'est fourni, on en crée un localement
@@ -19,50 +195,74 @@ def recherche_google(query: str, logger: Optional[logging.Logger] = None, num_re
         logger.warning("Requête Google vide.")  # Avertit si la requête est vide
         return None  # Arrête la fonction si aucune requête n’a été saisie
 
+    # Même recherche déjà en cours : on attend son résultat au lieu de relancer Google et les téléchargements
+    try:
+        return coalescence_google.executer(
+            cle_cache(normaliser_texte(query), num_results),
+            lambda: _preparer_recherche_google(query, logger, num_results),
+        )
+    except DelaiCoalescenceDepasse as e:
+        logger.warning(f"Google : {e}")
+        return None
+    except EcheanceDepassee as e:
+        # Plus de temps pour cette requête, ou recherche perdante d'une course : cas normal, sans trace
+        logger.debug(f"Google : '{query}' abandonnée ({e})")
+        return None
+
+
+def _preparer_recherche_google(query: str, logger: logging.Logger, num_results: int) -> Optional[tuple[str, str, str, Optional[str]]]:
     try:
         logger.info(f"Recherche Google lancée pour : '{query}'")  # Log d'information sur le début de la recherche
-        urls = list(search(query, num_results=num_results, lang="fr"))  # Effectue la recherche Google et récupère les URL
+        with limite_web.place(), appel_amont("google_search"):
+            urls = rechercher_urls(query, num_results=num_results)  # Effectue la recherche Google et récupère les URL
 
         if not urls:
             logger.warning(f"Aucun résultat Google pour '{query}'")  # Avertit s’il n’y a aucun résultat
             return None  # Retourne None si aucun lien n’a été trouvé
 
-        for url in urls:  # Parcourt chaque URL trouvée
-            try:
-                response = requests.get(url, timeout=5)  # Tente de charger le contenu de la page (5s max)
-                response.raise_for_status()  # Provoque une erreur si le code HTTP n’est pas 200
+        trouve = recuperer_contenu(urls, logger=logger)  # Télécharge les pages en parallèle
+        if not trouve:
+            logger.warning("Aucun contenu exploitable trouvé dans les résultats Google.")  # Avertit si aucun contenu valable n’a été trouvé
+            return None  # Retourne None car aucun résultat n’a fonctionné
+
+        url, titre, contenu = trouve
+        logger.info(f"Contenu trouvé sur : {url}")  # Log indiquant qu’un contenu a été trouvé
 
-                soup = BeautifulSoup(response.text, "html.parser")  # Analyse le HTML de la page
+        # Seules les phrases utiles (sans doublons ni texte hors sujet) partent dans le prompt
+        definition = None
+        if RESUME_ACTIF:
+            with etape("resume_local"):
+                resume = resumer(contenu, query)
+            contenu, definition = resume.extrait, resume.definition
+            logger.debug(f"Résumé local : {resume.tokens_avant} -> {resume.tokens_apres} tokens estimés")
 
-                # 🔍 Récupère plusieurs paragraphes utiles
-                paragraphes = soup.find_all("p")  # Trouve tous les paragraphes de la page
-                contenu = " ".join(  # Concatène les textes de paragraphes sélectionnés
-                    p.get_text(strip=True)  # Extrait le texte sans espace superflu
-                    for p in paragraphes[:4]  # Prend les 4 premiers paragraphes
-                    if len(p.get_text(strip=True)) > 60  # Ignore les paragraphes trop courts
-                )
+        return construire_prompt(query, contenu), url, titre, definition
+
+    # Échéance de cette requête : remontée pour que les requêtes qui attendent le même appel le refassent
+    except EcheanceDepassee:
+        raise
+    except ServiceSature as e:
+        logger.warning(f"Google : '{query}' abandonnée ({e})")  # Trop d'appels web en cours : rien d'inattendu
+        return None
+    except Exception as e:
+        logger.error(f"Erreur globale Google pour '{query}' : {e}", exc_info=True)  # Log d’erreur globale inattendue
+        return None  # Retourne None en cas d’erreur majeure
 
-                if contenu:  # Si on a trouvé du contenu exploitable
-                    titre = soup.title.string.strip() if soup.title and soup.title.string else url  # Récupère le titre de la page, ou l'URL si vide
-                    logger.info(f"Contenu trouvé sur : {url}")  # Log indiquant qu’un contenu a été trouvé
 
-                    # 🧠 Prompt orienté "définir le mot"
-                    prompt = (  # Crée un prompt à envoyer à Mistral pour demander une explication
-                        f"Voici un extrait de texte qui parle du mot « {query} » :\n\n"
-                        f"{contenu}\n\n"
-                        f"Explique simplement ce que signifie le mot « {query} » en français, en 2 phrases maximum."
-                    )
-                    resume = Mistral(prompt)  # Envoie le prompt à Mistral et récupère la réponse
+def recherche_google(query: str, logger: Optional[logging.Logger] = None, num_results: int = 3) -> Optional[str]:
+    # Fonction qui cherche un mot via Google, extrait du texte utile d’un site, et demande à Mistral de résumer
 
-                    # Retourne le résumé avec un lien cliquable vers la source
-                    return f"{resume}<br><a href='{url}' target='_blank' rel='noopener noreferrer'>{titre}</a>"
+    preparation = preparer_recherche_google(query, logger=logger, num_results=num_results)
+    if preparation is None:
+        return None
 
-            except Exception as e:
-                logger.warning(f"Erreur en lisant {url} : {e}")  # Log d’erreur si une page n’a pas pu être lue
+    prompt, url, titre, definition = preparation
+    if definition:
+        return f"{definition}{lien_source(url, titre)}"  # La page donne déjà une courte définition : pas d'appel à Mistral
 
-        logger.warning("Aucun contenu exploitable trouvé dans les résultats Google.")  # Avertit si aucun contenu valable n’a été trouvé
-        return None  # Retourne None car aucun résultat n’a fonctionné
+    # Envoie le prompt à Mistral ; le contenu web change plus vite : espace de cache séparé, durée de vie plus courte.
+    # Le prompt se suffit à lui-même : sans l'historique de la conversation, la réponse reste partagée en cache.
+    resume = client_mistral.chat(prompt, espace="web", ttl=LLM_CACHE_TTL_WEB, contexte=False)
 
-    except Exception as e:
-        logger.error(f"Erreur globale Google pour '{query}' : {e}", exc_info=True)  # Log d’erreur globale inattendue
-        return None  # Retourne None en cas d’erreur majeure
+    # Retourne le résumé avec un lien cliquable vers la source
+    return f"{resume}{lien_source(url, titre)}"
@@ -0,0 +1,107 @@
+from typing import Any, Iterable, Optional  # Pour typer les valeurs associées aux phrases
+
+# Index de recherche approximative (principe de SymSpell, « symmetric delete ») :
+# à la construction, chaque phrase est enregistrée avec toutes ses variantes obtenues en supprimant
+# jusqu'à `distance_max` caractères ; à la recherche, on génère les suppressions du texte demandé et
+# on ne compare (distance de Damerau-Levenshtein) qu'aux phrases partageant une variante.
+# Le coût d'une recherche dépend de la longueur du texte, pas du nombre de phrases indexées.
+
+
+def distance_edition(a: str, b: str, maximum: int) -> int:
+    # Distance de Damerau-Levenshtein restreinte (transposition de deux lettres voisines = 1) ;
+    # retourne maximum + 1 dès que la distance dépasse forcément `maximum`
+    if abs(len(a) - len(b)) > maximum:
+        return maximum + 1
+    precedente_2 = None
+    precedente = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        courante = [i] + [0] * len(b)
+        minimum_ligne = i
+        for j in range(1, len(b) + 1):
+            cout = 0 if a[i - 1] == b[j - 1] else 1
+            valeur = min(precedente[j] + 1, courante[j - 1] + 1, precedente[j - 1] + cout)
+            if (precedente_2 is not None and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                valeur = min(valeur, precedente_2[j - 2] + 1)
+            courante[j] = valeur
+            minimum_ligne = min(minimum_ligne, valeur)
+        if minimum_ligne > maximum:
+            return maximum + 1
+        precedente_2, precedente = precedente, courante
+    return precedente[len(b)]
+
+
+def _suppressions(mot: str, distance: int) -> set[str]:
+    # Toutes les variantes de `mot` obtenues en supprimant au plus `distance` caractères (mot compris)
+    variantes = {mot}
+    frontiere = {mot}
+    for _ in range(distance):
+        suivante = {v[:i] + v[i + 1:] for v in frontiere for i in range(len(v))} - variantes
+        variantes |= suivante
+        frontiere = suivante
+    return variantes
+
+
+class IndexFlou:
+    def __init__(self, seuil: float = 0.8, distance_max: int = 2):
+        # seuil : similarité minimale 1 - distance / longueur de la plus longue des deux chaînes
+        #         (0.8 : une faute tolérée à partir de 5 caractères, deux à partir de 10)
+        self.seuil = seuil
+        self.distance_max = distance_max
+        self._phrases: dict[str, Any] = {}  # Phrase -> valeur associée
+        self._variantes: dict[str, list[str]] = {}  # Variante -> phrases qui la produisent
+        self._longueurs: set[int] = set()  # Longueurs des phrases indexées
+
+    def _distance_permise(self, longueur: int) -> int:
+        return min(self.distance_max, int(longueur * (1 - self.seuil) + 1e-9))
+
+    def ajouter(self, phrase: str, valeur: Any = None) -> None:
+        if phrase in self._phrases:
+            self._phrases[phrase] = valeur
+            return
+        self._phrases[phrase] = valeur
+        self._longueurs.add(len(phrase))
+        for variante in _suppressions(phrase, self._distance_permise(len(phrase))):
+            self._variantes.setdefault(variante, []).append(phrase)
+
+    def ajouter_tout(self, phrases: Iterable[str], valeur: Any = None) -> None:
+        for phrase in phrases:
+            self.ajouter(phrase, valeur)
+
+    def __len__(self) -> int:
+        return len(self._phrases)
+
+    def __contains__(self, phrase: str) -> bool:
+        return phrase in self._phrases
+
+    def chercher(self, texte: str) -> Optional[tuple[str, Any, int]]:
+        # Phrase indexée la plus proche de `texte` : (phrase, valeur, distance), ou None sous le seuil
+        if texte in self._phrases:
+            return texte, self._phrases[texte], 0  # Correspondance exacte : pas de calcul de distance
+
+        # Distance tolérée la plus grande parmi les longueurs de phrases compatibles avec le texte :
+        # 0 si aucune (ex : un long message face à des salutations), ce qui évite de générer les suppressions
+        distance_requete = 0
+        for longueur in self._longueurs:
+            permise = self._distance_permise(max(longueur, len(texte)))
+            if abs(longueur - len(texte)) <= permise and permise > distance_requete:
+                distance_requete = permise
+        if distance_requete == 0:
+            return None
+
+        meilleure = None
+        vues = set()
+        for variante in _suppressions(texte, distance_requete):
+            for phrase in self._variantes.get(variante, ()):
+                if phrase in vues:
+                    continue
+                vues.add(phrase)
+                permise = min(self.distance_max, int(max(len(phrase), len(texte)) * (1 - self.seuil) + 1e-9))
+                limite = permise if meilleure is None else min(permise, meilleure[2] - 1)
+                if limite < 1:
+                    continue
+                distance = distance_edition(texte, phrase, limite)
+                if distance <= limite:
+                    meilleure = (phrase, self._phrases[phrase], distance)
+                    if distance == 1:
+                        return meilleure  # On ne trouvera pas mieux qu'une seule faute
+        return meilleure
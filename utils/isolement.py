@@ -0,0 +1,139 @@
+import logging  # Pour signaler les calculs arrêtés
+import multiprocessing  # Les calculs tournent dans des processus que l'on peut tuer
+import threading  # Les processus libres sont partagés par les threads du worker
+import time  # Pour borner l'attente d'un processus libre et du résultat
+from typing import Callable, Optional  # Pour typer la fonction exécutée
+
+from utils.delais import temps_restant  # Le calcul ne dépasse pas l'échéance de la requête en cours
+from utils.metriques import enregistrer_collecteur  # Calculs arrêtés exposés sur /metrics
+
+logger = logging.getLogger(__name__)  # Logger du module
+
+# Exécution d'une fonction dans un processus à part, avec un délai strict : un thread ne peut pas être
+# interrompu au milieu d'un calcul (SymPy peut chercher des heures les racines de x^100 + x + 1), un
+# processus peut être tué. Les processus sont gardés d'un calcul à l'autre (leurs imports restent chargés) ;
+# celui d'un calcul trop long est tué et remplacé au calcul suivant.
+# Les processus sont créés par un serveur de fork (« forkserver ») : jamais par fork du worker lui-même,
+# dont les autres threads peuvent tenir des verrous au moment du fork.
+
+
+class DelaiCalculDepasse(TimeoutError):
+    # Pas de résultat (ni de processus libre) dans le délai accordé
+    pass
+
+
+def _boucle(connexion, modules: tuple) -> None:
+    # Corps d'un processus : exécute les fonctions reçues jusqu'à la fermeture de la connexion
+    for module in modules:
+        try:
+            __import__(module)
+        except ImportError:
+            pass  # Dépendance facultative absente : la fonction appelée s'en rend compte elle-même
+    while True:
+        try:
+            fonction, arguments = connexion.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            connexion.send((True, fonction(*arguments)))
+        except Exception as e:  # L'erreur est renvoyée à l'appelant, le processus reste utilisable
+            connexion.send((False, f"{type(e).__name__}: {e}"))
+
+
+class _Processus:
+    def __init__(self, contexte, modules: tuple):
+        self.connexion, enfant = contexte.Pipe()
+        self.processus = contexte.Process(target=_boucle, args=(enfant, modules), daemon=True)
+        self.processus.start()
+        enfant.close()
+
+    def arreter(self) -> None:
+        self.processus.kill()
+        self.processus.join(1)
+        self.connexion.close()
+
+
+class ProcessusIsoles:
+    def __init__(self, nom: str, nombre: int, delai: float, modules: tuple = ()):
+        self.nom = nom
+        self.delai = delai  # Durée maximale d'un calcul (et de l'attente d'un processus libre)
+        self.modules = modules  # Importés au démarrage de chaque processus
+        methodes = multiprocessing.get_all_start_methods()
+        self._contexte = multiprocessing.get_context("forkserver" if "forkserver" in methodes else "spawn")
+        self._places = threading.BoundedSemaphore(nombre)
+        self._libres: list[_Processus] = []
+        self._verrou = threading.Lock()
+        self._stats = {"calculs": 0, "delais_depasses": 0}
+        _isolements.append(self)
+
+    def executer(self, fonction: Callable, *arguments, delai: Optional[float] = None):
+        # fonction(*arguments) dans un processus libre ; `fonction` doit être définie au niveau d'un module
+        # (elle est transmise par son nom), ses arguments et son résultat doivent pouvoir être sérialisés
+        delai = self.delai if delai is None else delai
+        if (restant := temps_restant()) is not None:
+            delai = min(delai, restant)
+        limite = time.monotonic() + max(0.0, delai)
+        if delai <= 0 or not self._places.acquire(timeout=delai):
+            self._compter("delais_depasses")
+            raise DelaiCalculDepasse(f"{self.nom} : aucun processus libre en {delai:g} s")
+        processus = None
+        try:
+            processus = self._prendre()
+            processus.connexion.send((fonction, arguments))
+            if not processus.connexion.poll(max(0.0, limite - time.monotonic())):
+                self._compter("delais_depasses")
+                logger.warning(f"{self.nom} : calcul arrêté après {delai:g} s")
+                raise DelaiCalculDepasse(f"{self.nom} : calcul arrêté après {delai:g} s")
+            reussi, valeur = processus.connexion.recv()
+            self._rendre(processus)
+            processus = None
+            self._compter("calculs")
+            if not reussi:
+                raise RuntimeError(valeur)
+            return valeur
+        finally:
+            if processus is not None:
+                processus.arreter()  # Calcul trop long ou processus disparu : remplacé au prochain appel
+            self._places.release()
+
+    def _prendre(self) -> _Processus:
+        with self._verrou:
+            while self._libres:
+                processus = self._libres.pop()
+                if processus.processus.is_alive():
+                    return processus
+                processus.connexion.close()
+        return _Processus(self._contexte, self.modules)
+
+    def _rendre(self, processus: _Processus) -> None:
+        with self._verrou:
+            self._libres.append(processus)
+
+    def _compter(self, evenement: str) -> None:
+        with self._verrou:
+            self._stats[evenement] += 1
+
+    def arreter(self) -> None:
+        # Arrête les processus libres (les calculs en cours se terminent, leur processus est alors gardé)
+        with self._verrou:
+            libres, self._libres = self._libres, []
+        for processus in libres:
+            processus.arreter()
+
+    def statistiques(self) -> dict:
+        with self._verrou:
+            return {**self._stats, "processus_libres": len(self._libres)}
+
+
+_isolements: list[ProcessusIsoles] = []
+
+
+def _metriques_isolement():
+    yield "# TYPE chatbot_calculs_isoles_total counter"
+    for isolement in _isolements:
+        stats = isolement.statistiques()
+        for resultat in ("calculs", "delais_depasses"):
+            yield f'chatbot_calculs_isoles_total{{pool="{isolement.nom}",resultat="{resultat}"}} {stats[resultat]}'
+
+
+enregistrer_collecteur(_metriques_isolement)
@@ -0,0 +1,496 @@
+import bisect  # Recherche dichotomique dans les listes de documents d'un mot (triées)
+import heapq  # Pour garder les n meilleurs documents sans tout trier
+import json  # Format des documents sources, du manifeste et des documents stockés dans l'index
+import logging  # Pour signaler les fichiers illisibles sans interrompre l'indexation
+import math  # Pour le calcul de l'IDF (BM25)
+import mmap  # L'index est lu directement depuis le disque, sans être chargé en mémoire
+import os  # Parcours du dossier de documents, écriture atomique des fichiers d'index
+import re  # Découpage des textes en mots
+import struct  # En-tête binaire des segments
+import threading  # Une seule synchronisation à la fois dans un processus
+import unicodedata  # Pour retirer les accents avant l'indexation
+from array import array  # Tableaux d'entiers compacts écrits tels quels dans les segments
+from collections import Counter  # Fréquence de chaque mot dans un document
+from contextlib import contextmanager  # Pour le verrou entre processus
+from dataclasses import dataclass  # Pour les résultats de recherche
+from typing import Iterator, Optional  # Pour typer les générateurs et les valeurs pouvant valoir None
+
+try:
+    import fcntl  # Verrou entre les workers (indisponible sous Windows)
+except ImportError:
+    fcntl = None
+
+from app.config import (  # Emplacements et seuils de la base de connaissances
+    KNOWLEDGE_DIR,
+    KNOWLEDGE_INDEX_DIR,
+    KNOWLEDGE_SCAN_INTERVAL,
+    KNOWLEDGE_SCORE_MIN,
+    KNOWLEDGE_COUVERTURE_MIN,
+)
+
+logger = logging.getLogger(__name__)  # Logger du module
+
+# Base de connaissances locale : un dossier de fichiers JSON, indexé en index inversé avec un score BM25.
+#
+# Formats acceptés pour un fichier : un document, une liste de documents, ou {"documents": [...]}.
+# Un document : {"titre": "...", "contenu": "...", "questions": ["formulations possibles", ...]}
+# (« title »/« content » et « reponse » sont aussi acceptés).
+#
+# L'index est découpé en segments immuables (un fichier binaire chacun, ouvert avec mmap) décrits par un
+# manifeste JSON. Quand des fichiers changent, seuls ces fichiers sont relus : leurs anciens documents sont
+# marqués supprimés et leurs nouveaux documents forment un nouveau segment. Au-delà de MAX_SEGMENTS,
+# tout est réindexé dans un seul segment. Au démarrage, rien n'est retokenisé : les segments sont mappés.
+
+VERSION_INDEX = 1
+MAX_SEGMENTS = 8  # Nombre de segments au-delà duquel l'index est reconstruit d'un bloc
+K1 = 1.5  # Saturation de la fréquence d'un mot (BM25)
+B = 0.75  # Poids de la normalisation par la longueur du document (BM25)
+PART_DF_COMPLEMENT = 0.05  # Mots présents dans plus de 5 % des documents : ne complètent que les candidats
+
+_MOTS = re.compile(r"\w+")
+_ACCENTS = re.compile(r"[\u0300-\u036f]")  # Diacritiques isolés par la décomposition NFKD
+MOTS_VIDES = frozenset("""
+    a ai as au aux avec c ce ces cet cette comment d dans de des du elle elles en es est et etre il ils
+    je l la le les leur lui m ma me mes moi mon n ne nous on ou par pas pour qu quand que quel quelle
+    quelles quels qui quoi s sa se ses si son sont sur t ta te tes toi ton tu un une vos votre vous y
+    pourquoi savoir veux voudrais peux peut explique dire donne
+""".split())
+
+_ENTETE = struct.Struct("<8sIIIQQ")  # Signature, version, nb de mots, nb de documents, nb de positions, somme des longueurs
+_SIGNATURE = b"BM25SEG\x00"
+
+
+def tokeniser(texte: str) -> list[str]:
+    # Mots normalisés : minuscules, sans accents, sans mots vides, pluriel simple (« moteurs » -> « moteur »)
+    texte = _ACCENTS.sub("", unicodedata.normalize("NFKD", texte.casefold()))
+    mots = []
+    for mot in _MOTS.findall(texte):
+        if mot in MOTS_VIDES or len(mot) < 2:
+            continue
+        if len(mot) > 3 and mot[-1] in "sx":
+            mot = mot[:-1]
+        mots.append(mot)
+    return mots
+
+
+@dataclass
+class Resultat:
+    titre: str
+    contenu: str
+    source: str  # Fichier d'origine, relatif au dossier de documents
+    score: float  # Score BM25
+    couverture: float  # Part (pondérée par l'IDF) des mots de la question présents dans le document
+
+
+def _aligner(sortie, position: int) -> int:
+    # Complète le fichier jusqu'à un multiple de 8 octets (les tableaux mappés restent alignés)
+    reste = (-position) % 8
+    sortie.write(b"\x00" * reste)
+    return position + reste
+
+
+def ecrire_segment(chemin: str, documents: list[dict]) -> None:
+    # Écrit un segment : mots triés, listes de documents par mot (avec fréquences), longueurs, documents
+    postings: dict[str, list[tuple[int, int]]] = {}
+    longueurs = array("I")
+    for numero, doc in enumerate(documents):
+        mots = tokeniser(" ".join([doc["titre"], *doc["questions"], doc["contenu"]]))
+        longueurs.append(len(mots))
+        for mot, frequence in Counter(mots).items():
+            postings.setdefault(mot, []).append((numero, frequence))
+
+    termes = sorted((mot.encode("utf-8"), mot) for mot in postings)  # Tri par octets : celui de la recherche
+    textes = bytearray()
+    debut_termes, debut_postings = array("I", [0]), array("I", [0])
+    docs, frequences = array("I"), array("I")
+    for encode, mot in termes:
+        textes += encode
+        debut_termes.append(len(textes))
+        for numero, frequence in postings[mot]:
+            docs.append(numero)
+            frequences.append(frequence)
+        debut_postings.append(len(docs))
+
+    blob = bytearray()
+    debut_docs = array("Q", [0])
+    for doc in documents:
+        blob += json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        debut_docs.append(len(blob))
+
+    temporaire = f"{chemin}.{os.getpid()}.tmp"
+    with open(temporaire, "wb") as sortie:
+        sortie.write(_ENTETE.pack(_SIGNATURE, VERSION_INDEX, len(termes), len(documents), len(docs), sum(longueurs)))
+        position = _aligner(sortie, _ENTETE.size)
+        for section in (debut_termes, debut_postings, docs, frequences, longueurs, debut_docs, textes, blob):
+            sortie.write(section)
+            position = _aligner(sortie, position + len(section) * getattr(section, "itemsize", 1))
+        sortie.flush()
+        os.fsync(sortie.fileno())
+    os.replace(temporaire, chemin)
+
+
+class Segment:
+    # Segment en lecture seule : tous les tableaux sont des vues sur le fichier mappé (zéro copie)
+
+    def __init__(self, chemin: str):
+        self.chemin = chemin
+        with open(chemin, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        signature, version, self.nb_termes, self.nb_docs, nb_positions, self.somme_longueurs = _ENTETE.unpack_from(self._mm)
+        if signature != _SIGNATURE or version != VERSION_INDEX:
+            raise ValueError(f"Segment d'index invalide : {chemin}")
+
+        vue = memoryview(self._mm)
+        position = _ENTETE.size + (-_ENTETE.size) % 8
+
+        def section(taille: int, format_: Optional[str]) -> memoryview:
+            nonlocal position
+            largeur = struct.calcsize(format_) if format_ else 1
+            morceau = vue[position:position + taille * largeur]
+            position += taille * largeur
+            position += (-position) % 8
+            return morceau.cast(format_) if format_ else morceau
+
+        self._debut_termes = section(self.nb_termes + 1, "I")
+        self._debut_postings = section(self.nb_termes + 1, "I")
+        self._docs = section(nb_positions, "I")
+        self._frequences = section(nb_positions, "I")
+        self.longueurs = section(self.nb_docs, "I")
+        self._debut_docs = section(self.nb_docs + 1, "Q")
+        self._base_textes = position
+        position += self._debut_termes[self.nb_termes]
+        position += (-position) % 8
+        self._base_docs = position
+
+    def _terme(self, rang: int) -> bytes:
+        base = self._base_textes
+        return self._mm[base + self._debut_termes[rang]:base + self._debut_termes[rang + 1]]
+
+    def postings(self, mot: bytes) -> tuple[memoryview, memoryview]:
+        # Documents contenant le mot (triés) et fréquences correspondantes ; vues vides si le mot est absent
+        bas, haut = 0, self.nb_termes
+        while bas < haut:  # Dichotomie directement dans le fichier mappé
+            milieu = (bas + haut) // 2
+            if self._terme(milieu) < mot:
+                bas = milieu + 1
+            else:
+                haut = milieu
+        if bas == self.nb_termes or self._terme(bas) != mot:
+            return self._docs[0:0], self._frequences[0:0]
+        debut, fin = self._debut_postings[bas], self._debut_postings[bas + 1]
+        return self._docs[debut:fin], self._frequences[debut:fin]
+
+    def document(self, numero: int) -> dict:
+        base = self._base_docs
+        return json.loads(self._mm[base + self._debut_docs[numero]:base + self._debut_docs[numero + 1]])
+
+
+@dataclass
+class _Etat:
+    # Vue cohérente de l'index à un instant donné (remplacée d'un bloc après une synchronisation)
+    generation: int
+    segments: list[tuple[Segment, frozenset]]  # (segment, numéros des documents supprimés)
+    nb_docs: int
+    longueur_moyenne: float
+
+
+_ETAT_VIDE = _Etat(generation=0, segments=[], nb_docs=0, longueur_moyenne=0.0)
+
+
+def _lire_documents(chemin: str) -> list[dict]:
+    # Documents d'un fichier JSON, normalisés en {"titre", "contenu", "questions"} ; [] si illisible
+    try:
+        with open(chemin, encoding="utf-8") as f:
+            donnees = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Base de connaissances : fichier ignoré {chemin} ({e})")
+        return []
+    if isinstance(donnees, dict):
+        donnees = donnees.get("documents", [donnees])
+    documents = []
+    for brut in donnees if isinstance(donnees, list) else []:
+        if not isinstance(brut, dict):
+            continue
+        contenu = brut.get("contenu") or brut.get("reponse") or brut.get("content") or ""
+        if not isinstance(contenu, str) or not contenu.strip():
+            continue
+        questions = brut.get("questions") or []
+        documents.append({
+            "titre": str(brut.get("titre") or brut.get("title") or ""),
+            "contenu": contenu.strip(),
+            "questions": [str(q) for q in questions] if isinstance(questions, list) else [str(questions)],
+        })
+    return documents
+
+
+class BaseConnaissances:
+    def __init__(self, dossier_documents: str, dossier_index: str, intervalle_scan: float = 30.0):
+        self.dossier_documents = dossier_documents
+        self.dossier_index = dossier_index
+        self.intervalle_scan = intervalle_scan  # Secondes entre deux vérifications du dossier de documents
+        self._etat = _ETAT_VIDE
+        self._manifeste = self._manifeste_vide()
+        self._ouverts: dict[str, Segment] = {}  # Nom -> segment déjà mappé
+        self._verrou = threading.Lock()
+        self._synchronisee = False  # Au moins une synchronisation tentée dans ce processus
+        self._surveillance_pid = None  # Processus où tourne la vérification périodique du dossier
+        self._arret = threading.Event()
+
+    # --- Manifeste et segments ---
+
+    @staticmethod
+    def _manifeste_vide() -> dict:
+        # fichiers : chemin relatif -> {"signature": [mtime_ns, taille], "segment": nom, "premier": n, "nombre": n}
+        return {"version": VERSION_INDEX, "generation": 0, "segments": [], "fichiers": {}, "supprimes": {}}
+
+    def _chemin_manifeste(self) -> str:
+        return os.path.join(self.dossier_index, "manifeste.json")
+
+    def _lire_manifeste(self) -> dict:
+        try:
+            with open(self._chemin_manifeste(), encoding="utf-8") as f:
+                manifeste = json.load(f)
+            if manifeste.get("version") == VERSION_INDEX:
+                return manifeste
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Base de connaissances : manifeste illisible, reconstruction ({e})")
+        return self._manifeste_vide()
+
+    def _ecrire_manifeste(self, manifeste: dict) -> None:
+        temporaire = f"{self._chemin_manifeste()}.{os.getpid()}.tmp"
+        with open(temporaire, "w", encoding="utf-8") as f:
+            json.dump(manifeste, f, ensure_ascii=False)
+        os.replace(temporaire, self._chemin_manifeste())  # Les autres workers voient l'ancien ou le nouveau, jamais un mélange
+
+    def _ouvrir(self, manifeste: dict) -> None:
+        # Mappe les segments du manifeste et calcule les statistiques globales (documents vivants seulement)
+        segments, nb_docs, somme = [], 0, 0
+        ouverts = {}
+        for nom in manifeste["segments"]:
+            segment = self._ouverts.get(nom) or Segment(os.path.join(self.dossier_index, nom))
+            ouverts[nom] = segment
+            supprimes = frozenset(manifeste["supprimes"].get(nom, ()))
+            segments.append((segment, supprimes))
+            nb_docs += segment.nb_docs - len(supprimes)
+            somme += segment.somme_longueurs - sum(segment.longueurs[n] for n in supprimes)
+        self._ouverts = ouverts  # Les segments abandonnés sont libérés quand plus aucune recherche ne les utilise
+        self._manifeste = manifeste
+        self._etat = _Etat(manifeste["generation"], segments, nb_docs, (somme / nb_docs if nb_docs else 0.0) or 1.0)
+
+    @contextmanager
+    def _verrou_processus(self) -> Iterator[None]:
+        # Un seul worker à la fois réindexe ; les autres relisent ensuite son manifeste
+        os.makedirs(self.dossier_index, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.dossier_index, "verrou"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _scanner(self) -> dict[str, list[int]]:
+        # Fichiers JSON du dossier (récursivement) : chemin relatif -> [mtime_ns, taille]
+        fichiers = {}
+        for racine, _, noms in os.walk(self.dossier_documents):
+            for nom in noms:
+                if nom.endswith(".json"):
+                    chemin = os.path.join(racine, nom)
+                    infos = os.stat(chemin)
+                    fichiers[os.path.relpath(chemin, self.dossier_documents)] = [infos.st_mtime_ns, infos.st_size]
+        return fichiers
+
+    def _nouveau_segment(self, manifeste: dict, chemins: list[str]) -> None:
+        # Indexe les fichiers donnés dans un nouveau segment et les enregistre dans le manifeste
+        documents = []
+        for relatif in chemins:
+            lus = _lire_documents(os.path.join(self.dossier_documents, relatif))
+            for doc in lus:
+                doc["source"] = relatif
+            manifeste["fichiers"][relatif]["premier"] = len(documents)
+            manifeste["fichiers"][relatif]["nombre"] = len(lus)
+            documents.extend(lus)
+        nom = f"segment-{manifeste['generation']:06d}.bin"
+        for relatif in chemins:
+            manifeste["fichiers"][relatif]["segment"] = nom if documents else None
+        if documents:
+            ecrire_segment(os.path.join(self.dossier_index, nom), documents)
+            manifeste["segments"].append(nom)
+
+    def synchroniser(self) -> bool:
+        # Réindexe les fichiers ajoutés, modifiés ou supprimés ; retourne True si l'index a changé
+        with self._verrou:
+            self._synchronisee = True
+            if not os.path.isdir(self.dossier_documents) and not self._manifeste["segments"]:
+                return False  # Pas de base de connaissances
+            with self._verrou_processus():
+                manifeste = self._lire_manifeste()
+                if manifeste["generation"] != self._etat.generation:
+                    self._ouvrir(manifeste)  # Un autre worker a déjà réindexé
+
+                actuels = self._scanner() if os.path.isdir(self.dossier_documents) else {}
+                connus = manifeste["fichiers"]
+                modifies = sorted(p for p, signature in actuels.items() if connus.get(p, {}).get("signature") != signature)
+                retires = [p for p in connus if p not in actuels]
+                if not modifies and not retires:
+                    return False
+
+                if len(manifeste["segments"]) >= MAX_SEGMENTS:
+                    self._reconstruire(actuels)
+                    return True
+
+                for relatif in modifies + retires:  # Les anciennes versions deviennent des documents supprimés
+                    ancien = connus.pop(relatif, None)
+                    if ancien and ancien.get("segment"):
+                        supprimes = manifeste["supprimes"].setdefault(ancien["segment"], [])
+                        supprimes.extend(range(ancien["premier"], ancien["premier"] + ancien["nombre"]))
+                manifeste["generation"] += 1
+                for relatif in modifies:
+                    connus[relatif] = {"signature": actuels[relatif]}
+                self._nouveau_segment(manifeste, modifies)
+                self._retirer_segments_vides(manifeste)
+                self._ecrire_manifeste(manifeste)
+                self._ouvrir(manifeste)
+                logger.info(f"Base de connaissances : {len(modifies)} fichier(s) réindexé(s), {len(retires)} retiré(s)")
+                return True
+
+    def reconstruire(self) -> None:
+        # Réindexe tout le dossier dans un seul segment (supprime les documents marqués et les vieux segments)
+        with self._verrou, self._verrou_processus():
+            self._reconstruire(self._scanner() if os.path.isdir(self.dossier_documents) else {})
+
+    def _reconstruire(self, actuels: dict[str, list[int]]) -> None:
+        anciens = self._lire_manifeste()["segments"]
+        manifeste = self._manifeste_vide()
+        manifeste["generation"] = max(self._manifeste["generation"], self._etat.generation) + 1
+        manifeste["fichiers"] = {relatif: {"signature": signature} for relatif, signature in actuels.items()}
+        self._nouveau_segment(manifeste, sorted(actuels))
+        self._ecrire_manifeste(manifeste)
+        self._ouvrir(manifeste)
+        for nom in anciens:
+            self._supprimer_fichier(nom)
+
+    def _retirer_segments_vides(self, manifeste: dict) -> None:
+        # Un segment dont tous les documents sont supprimés n'est plus référencé
+        for nom in list(manifeste["segments"]):
+            supprimes = manifeste["supprimes"].get(nom, ())
+            segment = self._ouverts.get(nom) or Segment(os.path.join(self.dossier_index, nom))
+            if len(set(supprimes)) >= segment.nb_docs:
+                manifeste["segments"].remove(nom)
+                manifeste["supprimes"].pop(nom, None)
+                self._supprimer_fichier(nom)
+
+    def _supprimer_fichier(self, nom: str) -> None:
+        try:
+            os.remove(os.path.join(self.dossier_index, nom))
+        except OSError:
+            pass  # Encore mappé ailleurs (Windows) : sera écrasé ou ignoré
+
+    # --- Vérification périodique du dossier ---
+
+    def demarrer_surveillance(self) -> None:
+        # Le dossier de documents est vérifié toutes les `intervalle_scan` secondes par un thread d'arrière-plan :
+        # les requêtes ne le parcourent jamais. Une fois par processus (un worker créé par fork n'a pas le thread)
+        if self._surveillance_pid == os.getpid():
+            return
+        with self._verrou:
+            if self.intervalle_scan <= 0 or self._surveillance_pid == os.getpid():
+                return
+            self._surveillance_pid = os.getpid()
+            arret = self._arret = threading.Event()
+        threading.Thread(target=self._surveiller, args=(arret,), name="connaissances", daemon=True).start()
+
+    def arreter_surveillance(self) -> None:
+        self._arret.set()
+        self._surveillance_pid = None
+
+    def _surveiller(self, arret: threading.Event) -> None:
+        while not arret.wait(self.intervalle_scan):
+            self._synchroniser_sans_erreur()
+
+    def _synchroniser_sans_erreur(self) -> None:
+        try:
+            self.synchroniser()
+        except Exception as e:  # Un index inutilisable ne doit pas casser la réponse
+            logger.error(f"Base de connaissances : synchronisation impossible ({e})", exc_info=True)
+
+    # --- Recherche ---
+
+    def _verifier_fraicheur(self) -> None:
+        # Sans préchauffage, la première recherche du processus ouvre (ou construit) l'index ; ensuite,
+        # seule la surveillance en arrière-plan relit le dossier
+        if not self._synchronisee:
+            self._synchroniser_sans_erreur()
+        self.demarrer_surveillance()
+
+    def __len__(self) -> int:
+        return self._etat.nb_docs
+
+    def chercher(self, question: str, n: int = 3) -> list[Resultat]:
+        # Les n documents les mieux classés (BM25) pour la question
+        self._verifier_fraicheur()
+        etat = self._etat  # Instantané : une synchronisation concurrente ne le modifie pas
+        mots = set(tokeniser(question))
+        if not mots or not etat.nb_docs:
+            return []
+
+        idf_absent = math.log(1 + (etat.nb_docs + 0.5) / 0.5)  # Mot inconnu : compte comme non couvert
+        listes = []
+        idf_total = 0.0
+        for mot in mots:
+            trouves = [segment.postings(mot.encode("utf-8")) for segment, _ in etat.segments]
+            df = sum(len(docs) for docs, _ in trouves)  # Inclut les documents supprimés (approximation usuelle)
+            idf = math.log(1 + (etat.nb_docs - df + 0.5) / (df + 0.5)) if df else idf_absent
+            idf_total += idf
+            if df:
+                listes.append((df, idf, trouves))
+        listes.sort(key=lambda liste: liste[0])  # Mots rares d'abord
+
+        scores: dict[tuple[int, int], float] = {}
+        couverts: dict[tuple[int, int], float] = {}
+        limite_complement = max(1000, PART_DF_COMPLEMENT * etat.nb_docs)
+        for rang_mot, (df, idf, trouves) in enumerate(listes):
+            complement = rang_mot > 0 and df > limite_complement and bool(scores)
+            for rang, ((segment, supprimes), (docs, frequences)) in enumerate(zip(etat.segments, trouves)):
+                if complement:
+                    # Mot très fréquent : seulement ajouté au score des documents déjà candidats
+                    positions = []
+                    for r, numero in scores:
+                        if r == rang:
+                            i = bisect.bisect_left(docs, numero)
+                            if i < len(docs) and docs[i] == numero:
+                                positions.append((numero, frequences[i]))
+                else:
+                    positions = zip(docs, frequences)
+                for numero, frequence in positions:
+                    if numero in supprimes:
+                        continue
+                    normalisation = K1 * (1 - B + B * segment.longueurs[numero] / etat.longueur_moyenne)
+                    cle = (rang, numero)
+                    scores[cle] = scores.get(cle, 0.0) + idf * frequence * (K1 + 1) / (frequence + normalisation)
+                    couverts[cle] = couverts.get(cle, 0.0) + idf
+
+        resultats = []
+        for cle in heapq.nlargest(n, scores, key=scores.__getitem__):
+            rang, numero = cle
+            doc = etat.segments[rang][0].document(numero)
+            resultats.append(Resultat(doc["titre"], doc["contenu"], doc["source"], scores[cle], couverts[cle] / idf_total))
+        return resultats
+
+    def meilleure_reponse(
+        self, question: str, score_min: float = KNOWLEDGE_SCORE_MIN, couverture_min: float = KNOWLEDGE_COUVERTURE_MIN
+    ) -> Optional[Resultat]:
+        # Meilleur document s'il est assez sûr pour répondre sans chercher ailleurs, sinon None
+        resultats = self.chercher(question, n=1)
+        if resultats and resultats[0].score >= score_min and resultats[0].couverture >= couverture_min:
+            return resultats[0]
+        return None
+
+
+# Base partagée par tout le processus ; l'index est ouvert (ou construit) au préchauffage ou à la première
+# recherche, puis le dossier de documents est vérifié en arrière-plan
+base_connaissances = BaseConnaissances(KNOWLEDGE_DIR, KNOWLEDGE_INDEX_DIR, intervalle_scan=KNOWLEDGE_SCAN_INTERVAL)
@@ -0,0 +1,204 @@
+import bisect  # Pour trouver l'intervalle d'un histogramme
+import contextvars  # Trace de la requête en cours, propre à chaque requête (et à chaque thread)
+import logging  # Journal des requêtes lentes
+import threading  # Les métriques sont mises à jour par plusieurs threads
+import time  # Mesure des durées
+from contextlib import contextmanager, nullcontext  # Pour les blocs chronométrés
+from dataclasses import dataclass, field  # Pour la trace d'une requête
+from typing import Callable, Iterator, Optional  # Pour typer les collecteurs et les générateurs
+
+from app.config import METRICS_ACTIF, METRICS_SLOW_MS  # Activation des mesures et seuil du journal des requêtes lentes
+
+logger = logging.getLogger(__name__)  # Logger du module
+
+# Métriques du chatbot au format texte de Prometheus (sans dépendance) :
+# - durée de chaque requête (par endpoint et route prise), de chaque étape (routage, Wikipédia, Google...)
+#   et de chaque appel à un service externe, sous forme d'histogrammes ;
+# - erreurs des services externes, et taux de succès des caches (lus au moment de l'export).
+# Les étapes d'une requête sont aussi notées dans sa trace, écrite dans le journal si elle est lente.
+
+DUREES = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # Secondes
+
+
+def _echapper(valeur) -> str:
+    return str(valeur).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquettes(noms: tuple, valeurs: tuple, extra: Optional[tuple] = None) -> str:
+    # {nom="valeur",...} ; extra : une paire (nom, valeur) supplémentaire (ex : ("le", 0.5))
+    paires = list(zip(noms, valeurs)) + ([extra] if extra else [])
+    return "{" + ",".join(f'{nom}="{_echapper(valeur)}"' for nom, valeur in paires) + "}" if paires else ""
+
+
+class Compteur:
+    def __init__(self, nom: str, aide: str, etiquettes: tuple = ()):
+        self.nom, self.aide, self.etiquettes = nom, aide, etiquettes
+        self._valeurs: dict[tuple, float] = {}
+        self._verrou = threading.Lock()
+
+    def inc(self, *valeurs, pas: float = 1.0) -> None:
+        with self._verrou:
+            self._valeurs[valeurs] = self._valeurs.get(valeurs, 0.0) + pas
+
+    def exposer(self) -> Iterator[str]:
+        yield f"# HELP {self.nom} {self.aide}"
+        yield f"# TYPE {self.nom} counter"
+        with self._verrou:
+            valeurs = sorted(self._valeurs.items())
+        for cle, valeur in valeurs:
+            yield f"{self.nom}{_etiquettes(self.etiquettes, cle)} {valeur:g}"
+
+
+class Histogramme:
+    def __init__(self, nom: str, aide: str, etiquettes: tuple = (), seuils: tuple = DUREES):
+        self.nom, self.aide, self.etiquettes, self.seuils = nom, aide, etiquettes, seuils
+        self._series: dict[tuple, list] = {}  # Étiquettes -> [comptes par intervalle, somme, nombre]
+        self._verrou = threading.Lock()
+
+    def observer(self, valeur: float, *valeurs) -> None:
+        rang = bisect.bisect_left(self.seuils, valeur)  # Intervalle « <= seuil » ; len(seuils) pour +Inf
+        with self._verrou:
+            serie = self._series.get(valeurs)
+            if serie is None:
+                serie = self._series[valeurs] = [[0] * (len(self.seuils) + 1), 0.0, 0]
+            serie[0][rang] += 1
+            serie[1] += valeur
+            serie[2] += 1
+
+    def exposer(self) -> Iterator[str]:
+        yield f"# HELP {self.nom} {self.aide}"
+        yield f"# TYPE {self.nom} histogram"
+        with self._verrou:
+            series = sorted((cle, (list(comptes), somme, nombre)) for cle, (comptes, somme, nombre) in self._series.items())
+        for cle, (comptes, somme, nombre) in series:
+            cumul = 0
+            for seuil, compte in zip((*self.seuils, "+Inf"), comptes):
+                cumul += compte
+                yield f"{self.nom}_bucket{_etiquettes(self.etiquettes, cle, ('le', seuil))} {cumul}"
+            yield f"{self.nom}_sum{_etiquettes(self.etiquettes, cle)} {somme:.6f}"
+            yield f"{self.nom}_count{_etiquettes(self.etiquettes, cle)} {nombre}"
+
+
+requetes_duree = Histogramme("chatbot_requete_duree_secondes", "Durée des requêtes HTTP", ("endpoint", "route"))
+etapes_duree = Histogramme("chatbot_etape_duree_secondes", "Durée des étapes du traitement d'un message", ("etape",))
+amont_duree = Histogramme("chatbot_amont_duree_secondes", "Durée des appels aux services externes", ("amont",))
+amont_erreurs = Compteur("chatbot_amont_erreurs_total", "Erreurs des services externes", ("amont", "type"))
+_METRIQUES = [requetes_duree, etapes_duree, amont_duree, amont_erreurs]
+
+# Fonctions appelées à chaque export : retournent des lignes déjà formatées (ex : statistiques des caches)
+_collecteurs: list[Callable[[], Iterator[str]]] = []
+
+
+def enregistrer_collecteur(collecteur: Callable[[], Iterator[str]]) -> None:
+    _collecteurs.append(collecteur)
+
+
+def exposer() -> str:
+    # Toutes les métriques au format texte de Prometheus
+    lignes = []
+    for metrique in _METRIQUES:
+        lignes.extend(metrique.exposer())
+    for collecteur in _collecteurs:
+        try:
+            lignes.extend(collecteur())
+        except Exception as e:  # Un collecteur en échec ne doit pas empêcher l'export des autres
+            logger.warning(f"Collecteur de métriques en échec : {e}")
+    return "\n".join(lignes) + "\n"
+
+
+def exposer_caches(nom: str, statistiques: Callable[[], dict]) -> Callable[[], Iterator[str]]:
+    # Collecteur pour un CacheSQLite : succès/échecs par espace et nombre d'entrées
+    def collecteur() -> Iterator[str]:
+        stats = statistiques()
+        yield f"# TYPE chatbot_cache_{nom}_requetes_total counter"
+        for espace, compteurs in sorted(stats["espaces"].items()):
+            for resultat in ("hits", "misses"):
+                yield f'chatbot_cache_{nom}_requetes_total{{espace="{espace}",resultat="{resultat}"}} {compteurs[resultat]}'
+        yield f"# TYPE chatbot_cache_{nom}_taux_hit gauge"
+        for espace, compteurs in sorted(stats["espaces"].items()):
+            yield f'chatbot_cache_{nom}_taux_hit{{espace="{espace}"}} {compteurs["taux_hit"]:g}'
+        if stats["entrees"] is not None:
+            yield f"# TYPE chatbot_cache_{nom}_entrees gauge"
+            yield f"chatbot_cache_{nom}_entrees {stats['entrees']}"
+    return collecteur
+
+
+# --- Trace d'une requête ---
+
+@dataclass
+class Trace:
+    endpoint: str
+    route: str = "inconnue"
+    etapes: list = field(default_factory=list)  # (nom, durée en s), dans l'ordre de fin
+    debut: float = field(default_factory=time.perf_counter)
+
+
+_trace = contextvars.ContextVar("chatbot_trace", default=None)
+
+
+def trace_courante() -> Optional[Trace]:
+    return _trace.get()
+
+
+def marquer_route(route: str) -> None:
+    # Route prise par la requête en cours (salutation, wikipedia, google, maths, defaut...)
+    if (trace := _trace.get()) is not None:
+        trace.route = route
+
+
+@contextmanager
+def tracer_requete(endpoint: str):
+    # Chronomètre une requête HTTP entière ; journalise le détail des étapes si elle dépasse METRICS_SLOW_MS
+    if not METRICS_ACTIF:
+        yield None
+        return
+    trace = Trace(endpoint)
+    jeton = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(jeton)
+        duree = time.perf_counter() - trace.debut
+        requetes_duree.observer(duree, endpoint, trace.route)
+        if METRICS_SLOW_MS and duree * 1000 >= METRICS_SLOW_MS:
+            detail = ", ".join(f"{nom}={d * 1000:.1f} ms" for nom, d in trace.etapes) or "aucune étape"
+            logger.warning(f"Requête lente {endpoint} ({duree * 1000:.0f} ms, route={trace.route}) : {detail}")
+
+
+class _Chronometre:
+    # Bloc chronométré : une classe plutôt qu'un @contextmanager, deux fois moins coûteux sur le chemin critique
+    __slots__ = ("histogramme", "nom", "libelle", "erreurs_attendues", "debut")
+
+    def __init__(self, histogramme: Histogramme, nom: str, libelle: str, erreurs_attendues: tuple = ()):
+        self.histogramme = histogramme
+        self.nom = nom
+        self.libelle = libelle  # Nom dans la trace de la requête
+        self.erreurs_attendues = erreurs_attendues
+
+    def __enter__(self):
+        self.debut = time.perf_counter()
+
+    def __exit__(self, type_exc, exc, tb):
+        duree = time.perf_counter() - self.debut
+        if self.histogramme is amont_duree and type_exc is not None and not issubclass(type_exc, self.erreurs_attendues):
+            amont_erreurs.inc(self.nom, type_exc.__name__)
+        self.histogramme.observer(duree, self.nom)
+        if (trace := _trace.get()) is not None:
+            trace.etapes.append((self.libelle, duree))
+        return False  # Les exceptions continuent leur chemin
+
+
+def etape(nom: str):
+    # Chronomètre une étape du traitement (histogramme + trace de la requête en cours)
+    return _Chronometre(etapes_duree, nom, nom) if METRICS_ACTIF else nullcontext()
+
+
+def appel_amont(amont: str, erreurs_attendues: tuple = ()):
+    # Chronomètre un appel à un service externe ; une exception (hors `erreurs_attendues`) compte comme erreur
+    return _Chronometre(amont_duree, amont, f"amont:{amont}", erreurs_attendues) if METRICS_ACTIF else nullcontext()
+
+
+def compter_erreur(amont: str, type_erreur: str) -> None:
+    # Erreur signalée sans exception (ex : réponse HTTP 429 ou 5xx)
+    if METRICS_ACTIF:
+        amont_erreurs.inc(amont, type_erreur)
@@ -1,10 +1,116 @@
+import logging
 import random
 import re
 from difflib import get_close_matches
+from typing import Iterator
 from utils.wikipedia_search import recherche_wikipedia
-from utils.google_search import recherche_google
-from utils.Calcul_Maths import resoudre_maths
-from app.config import WIKI_TRIGGER, GOOGLE_TRIGGER, MATH_TRIGGER
+from utils.google_search import recherche_google, preparer_recherche_google, lien_source
+from utils.Calcul_Maths import resoudre_maths, resoudre_maths_flux
+from utils.Mistral_API import client_mistral, historique_en_cours
+from utils.knowledge import base_connaissances
+from utils.course import Course
+from utils.metriques import etape, marquer_route
+from utils.routeur import (
+    RouteurIntentions, ROUTE_VIDE, ROUTE_INAPPROPRIE, ROUTE_SALUTATION,
+    ROUTE_WIKIPEDIA, ROUTE_GOOGLE, ROUTE_MATHS, ROUTE_DEFAUT,
+)
+from app.config import WIKI_TRIGGER, GOOGLE_TRIGGER, MATH_TRIGGER, LLM_CACHE_TTL_WEB, KNOWLEDGE_ACTIF
+from app.config import (
+    DEFAUT_RECHERCHE_ACTIVE, DEFAUT_RECHERCHE_DELAI, DEFAUT_RECHERCHE_PREFEREE, DEFAUT_RECHERCHE_GRACE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# ✅ Vocabulaire
+POLITESSES = [
+    "peux-tu", "peux tu", "pourrais-tu", "pourrais tu", "tu peux", "tu pourrais",
+    "tu-peux", "s'il te plaît", "stp", "svp", "sil te plait", "s il te plait",
+    "est ce que", "est-ce que", "tu-pourrais", "donne moi", "m'aider","me donner","avoir"
+]
+
+REPONSES_POLIES = [
+    "Bien sûr, je suis là pour ça !",
+    "Avec plaisir 😊",
+    "Oui bien sûr, je t’aide !",
+    "Pas de souci, je te réponds 👇",
+    "Aucun problème ! Voilà ce que j’ai trouvé :"
+]
+
+REACTIONS = [
+    "😊", "👍", "Ça me fait plaisir de t'aider !", "Super question !",
+    "Tu es brillant(e) !", "Hmm...", "Intéressant...", "Voyons voir...",
+    "C'est une bonne question.", "Je réfléchis...",
+    "Je ne suis pas une boule de cristal, mais je crois que c'est ça ! 😂",
+    "Si j'avais un euro à chaque fois qu'on me pose cette question... 💸",
+    "Je suis un bot, mais je commence à comprendre les humains ! 🤖",
+    "Je suis pas parfait, mais j'essaie ! 😅"
+]
+
+# Groupe -> (phrases reconnues, réponses possibles)
+SALUTATIONS = {
+    "bonjour": (
+        ["bonjour", "salut", "coucou", "hello", "hey", "bjr", "slut"],
+        [
+            "Bonjour ! Comment puis-je t'aider aujourd'hui ?",
+            "Salut ! Ravi de te voir.",
+            "Coucou ! Que puis-je faire pour toi ?"
+        ]
+    ),
+    "ca_va": (
+        [
+            "ça va", "comment ça va", "comment sa va", "comment tu vas",
+            "tu vas bien", "comment cava", "cv", "sava", "cava"
+        ],
+        [
+            "Ça va bien, merci ! Et toi ?",
+            "Je vais bien, merci ! Et toi, comment ça se passe ?",
+            "Tout roule de mon côté, et toi ?"
+        ]
+    ),
+    "au_revoir": (
+        ["au revoir", "bye", "à bientôt", "adieu", "aurevoir", "ciao","a plus"],
+        [
+            "Au revoir ! À la prochaine !",
+            "Bye ! Prends soin de toi.",
+            "À bientôt ! N'hésite pas à revenir."
+        ]
+    ),
+    "merci": (
+        ["merci", "merci beaucoup", "merci bien", "merki", "mercie","mrc"],
+        [
+            "Avec plaisir ! Si tu as d'autres questions, n'hésite pas.",
+            "De rien ! Je suis là pour ça.",
+            "Pas de souci, c'est toujours un plaisir de t'aider !"
+        ]
+    ),
+}
+
+BLACKLIST = [
+    "con", "connard", "pute", "salop", "enculé", "fdp", "ntm",
+    "nique", "merde", "ta gueule", "tg", "salope", "batard"
+]
+
+# Mots retirés autour du sujet d'une recherche Wikipédia/Google
+MOTS_VIDES = POLITESSES + [
+    "sur", "dans", "avec", "la", "le", "définition", "recherche", "rechercher", "cherche", "chercher",
+    "c'est quoi", "qu'est-ce que", "qu'est ce que", "de", "du", "des",
+    "je", "tu", "il", "nous", "vous", "ils", "elle", "elles", "pourrais"
+]
+
+# Construit une seule fois à l'import : toutes les expressions régulières sont précompilées
+routeur = RouteurIntentions(
+    liste_noire=BLACKLIST,
+    politesses=POLITESSES,
+    salutations={groupe: phrases for groupe, (phrases, _) in SALUTATIONS.items()},
+    declencheurs={WIKI_TRIGGER: ROUTE_WIKIPEDIA, GOOGLE_TRIGGER: ROUTE_GOOGLE, MATH_TRIGGER: ROUTE_MATHS},
+    mots_vides=MOTS_VIDES,
+)
+
+# Message sans mot-clé : Wikipédia et Google sont interrogés en même temps, la première réponse utile l'emporte
+course_defaut = Course(
+    "defaut", DEFAUT_RECHERCHE_DELAI, preferee=DEFAUT_RECHERCHE_PREFEREE, grace=DEFAUT_RECHERCHE_GRACE,
+)
 
 
 # ✅ Tolérance aux fautes
@@ -14,77 +120,22 @@ def texte_similaire(msg: str, expressions: list[str], seuil: float = 0.8) -> boo
 
 # ✅ Extrait la politesse + la question utile
 def extraire_politesse_et_question(msg: str) -> tuple[str | None, str]:
-    msg = msg.strip().lower()
-    politesses = [
-        "peux-tu", "peux tu", "pourrais-tu", "pourrais tu", "tu peux", "tu pourrais",
-        "tu-peux", "s'il te plaît", "stp", "svp", "sil te plait", "s il te plait",
-        "est ce que", "est-ce que", "tu-pourrais", "donne moi", "m'aider","me donner","avoir"
-    ]
-    polie_trouvée = []
-    for p in politesses:
-        if p in msg:
-            polie_trouvée.append(p)
-            msg = msg.replace(p, "")
-    propre = msg.strip()
-    reponse_polie = None
-    if polie_trouvée:
-        reponse_polie = random.choice([
-            "Bien sûr, je suis là pour ça !",
-            "Avec plaisir 😊",
-            "Oui bien sûr, je t’aide !",
-            "Pas de souci, je te réponds 👇",
-            "Aucun problème ! Voilà ce que j’ai trouvé :"
-        ])
-    return reponse_polie, propre
+    intention = routeur.analyser(msg)
+    reponse_polie = random.choice(REPONSES_POLIES) if intention.politesse else None
+    return reponse_polie, intention.question
 
 
 # ✅ Réponse humaine
 def chatbot_reponse(texte: str, math_mode: bool = False) -> str:
     if math_mode:
         return texte
-    réactions = [
-        "😊", "👍", "Ça me fait plaisir de t'aider !", "Super question !",
-        "Tu es brillant(e) !", "Hmm...", "Intéressant...", "Voyons voir...",
-        "C'est une bonne question.", "Je réfléchis...",
-        "Je ne suis pas une boule de cristal, mais je crois que c'est ça ! 😂",
-        "Si j'avais un euro à chaque fois qu'on me pose cette question... 💸",
-        "Je suis un bot, mais je commence à comprendre les humains ! 🤖",
-        "Je suis pas parfait, mais j'essaie ! 😅"
-    ]
-    return f"{random.choice(réactions)} {texte}"
+    return f"{random.choice(REACTIONS)} {texte}"
 
 
 # ✅ Salutations
 def detection_salutation(message: str) -> str | None:
-    msg = message.lower().strip()
-    if texte_similaire(msg, ["bonjour", "salut", "coucou", "hello", "hey", "bjr", "slut"]):
-        return random.choice([
-            "Bonjour ! Comment puis-je t'aider aujourd'hui ?",
-            "Salut ! Ravi de te voir.",
-            "Coucou ! Que puis-je faire pour toi ?"
-        ])
-    if texte_similaire(msg, [
-        "ça va", "comment ça va", "comment sa va", "comment tu vas",
-        "tu vas bien", "comment cava", "cv", "sava", "cava"
-    ]):
-        return random.choice([
-            "Ça va bien, merci ! Et toi ?",
-            "Je vais bien, merci ! Et toi, comment ça se passe ?",
-            "Tout roule de mon côté, et toi ?"
-        ])
-    if texte_similaire(msg, ["au revoir", "bye", "à bientôt", "adieu", "aurevoir", "ciao","a plus"]):
-        return random.choice([
-            "Au revoir ! À la prochaine !",
-            "Bye ! Prends soin de toi.",
-            "À bientôt ! N'hésite pas à revenir."
-        ])
-    if texte_similaire(msg, ["merci", "merci beaucoup", "merci bien", "merki", "mercie","mrc"]):
-        return random.choice([
-            "Avec plaisir ! Si tu as d'autres questions, n'hésite pas.",
-            "De rien ! Je suis là pour ça.",
-            "Pas de souci, c'est toujours un plaisir de t'aider !"
-        ])
-    return None
+    groupe = routeur.salutation(message.lower().strip())
+    return random.choice(SALUTATIONS[groupe][1]) if groupe else None
 
 
 # ✅ Détection maths
@@ -101,14 +152,21 @@ def Le_message_mathematique(msg: str) -> bool:
         return True
     return False
 
-# ✅ Contenu inapproprié
+# ✅ Question de suite (« et sa population ? ») : courte, elle renvoie à l'échange précédent
+_RELANCE = re.compile(
+    r"^(?:et|mais|alors|donc|pourquoi|comment ça|c'est-à-dire)\b"
+    r"|\b(?:sa|son|ses|leur|leurs|il|elle|ils|elles|ça|cela|lui|celui-ci|celle-ci)\b"
+)
+MOTS_RELANCE_MAX = 8  # Au-delà, la question se suffit à elle-même
+
+
+def est_relance(question: str) -> bool:
+    return len(question.split()) <= MOTS_RELANCE_MAX and bool(_RELANCE.search(question.strip()))
+
+
+# ✅ Contenu inapproprié (mots entiers : « contenu » ne contient pas « con »)
 def contient_contenu_inapproprié(msg: str) -> bool:
-    blacklist = [
-        "con", "connard", "pute", "salop", "enculé", "fdp", "ntm",
-        "nique", "merde", "ta gueule", "tg", "salope", "batard"
-    ]
-    msg = msg.lower()
-    return any(mot in msg for mot in blacklist)
+    return routeur.analyser(msg).route == ROUTE_INAPPROPRIE
 
 # def classement_IA(message :str) -> bool | None:
 #     messsage = message.lower().strip()
@@ -142,90 +200,167 @@ def contient_contenu_inapproprié(msg: str) -> bool:
 #         return tableau
 
 
+# ✅ Réponse à partir d'une page trouvée par Google (prompt préparé, résumé par Mistral)
+def reponse_google_flux(preparation: tuple[str, str, str, str | None], prefixe_poli: str, stream: bool) -> Iterator[str]:
+    prompt, url, titre, definition = preparation
+    if definition:
+        # Courte définition trouvée en tête de page : donnée telle quelle, sans appel à Mistral
+        yield prefixe_poli + chatbot_reponse(f"Voici ce que j'ai trouvé via Google :\n{definition}{lien_source(url, titre)}")
+        return
+    if not stream:
+        with etape("mistral"):
+            resume = client_mistral.chat(prompt, espace="web", ttl=LLM_CACHE_TTL_WEB, contexte=False)
+        yield prefixe_poli + chatbot_reponse(f"Voici ce que j'ai trouvé via Google :\n{resume}{lien_source(url, titre)}")
+        return
+    yield prefixe_poli + chatbot_reponse("Voici ce que j'ai trouvé via Google :\n")
+    with etape("mistral_flux"):
+        yield from client_mistral.stream(prompt, espace="web", ttl=LLM_CACHE_TTL_WEB, contexte=False)
+    yield lien_source(url, titre)
+
+
 # ✅ Fonction principale
 def obtenir_la_response(message: str) -> str:
-    msg = message.strip()
-    if not msg:
-        return "Je n'ai pas bien saisi ta question, pourrais-tu reformuler s’il te plaît ?"
+    return "".join(obtenir_la_response_flux(message, stream=False))
+
 
-    if contient_contenu_inapproprié(msg):
-        return "Je suis là pour t’aider, mais restons respectueux s’il te plaît 😊"
+# ✅ Même traitement, produit morceau par morceau (stream=True : les réponses de Mistral arrivent token par token)
+def obtenir_la_response_flux(message: str, stream: bool = True) -> Iterator[str]:
+    with etape("routage"):
+        intention = routeur.analyser(message)  # Une seule analyse du message, quelle que soit la route
+    marquer_route(intention.route)
+    reponse_polie = random.choice(REPONSES_POLIES) if intention.politesse else None
+    prefixe_poli = f"{reponse_polie} " if reponse_polie else ""
 
-    if (resp := detection_salutation(msg)):
-        return resp
+    if intention.route == ROUTE_VIDE:
+        yield "Je n'ai pas bien saisi ta question, pourrais-tu reformuler s’il te plaît ?"
+        return
 
-    reponse_polie, question = extraire_politesse_et_question(msg)
+    if intention.route == ROUTE_INAPPROPRIE:
+        yield "Je suis là pour t’aider, mais restons respectueux s’il te plaît 😊"
+        return
+
+    if intention.route == ROUTE_SALUTATION:
+        yield random.choice(SALUTATIONS[intention.groupe_salutation][1])
+        return
 
     # if (tableau := classement_IA(msg)):
     #     return tableau
 
-    reponse_polie, question = extraire_politesse_et_question(msg)
-
-        # 🌍 Wikipédia (le mot peut être avant ou après)
-    if WIKI_TRIGGER in question.lower():
-        cleaned_question = question.lower().replace(WIKI_TRIGGER, "")
-        query = re.sub(
-            r"\b(peux-tu|peux tu|pourrais-tu|pourrais tu|tu peux|tu pourrais|tu-peux|"
-            r"s'il te plaît|stp|svp|sil te plait|s il te plait|est ce que|est-ce que|"
-            r"tu-pourrais|donne moi|m'aider|me donner|avoir|sur|dans|avec|la|le|"
-            r"définition|recherche|rechercher|de|du|des|je|tu|il|nous|vous|ils|elle|elles|pourrais|le|la)\b",
-            "",
-            cleaned_question
-        )
-        query = query.strip(" :!?.,\"'")
+    # 💬 Question de suite dans une conversation : Mistral répond avec l'historique de la session
+    if intention.route == ROUTE_DEFAUT and historique_en_cours() and est_relance(intention.question):
+        marquer_route("relance")
+        try:
+            if stream:
+                with etape("mistral_flux"):
+                    yield from client_mistral.stream(intention.question)
+            else:
+                with etape("mistral"):
+                    yield client_mistral.chat(intention.question)
+        except Exception as e:
+            yield chatbot_reponse(f"Erreur Mistral : {e}")
+        return
+
+    # 📚 Base de connaissances locale : une réponse sûre évite le web et Mistral. Pas pour les calculs ni quand
+    # l'utilisateur a demandé lui-même une source (« wikipedia … », « google … ») : on interroge celle-ci
+    if KNOWLEDGE_ACTIF and intention.route == ROUTE_DEFAUT:
+        sujet = routeur.nettoyer_requete(intention.question)
+        with etape("connaissances"):
+            connu = base_connaissances.meilleure_reponse(sujet)
+        if connu:
+            marquer_route("connaissances")
+            yield prefixe_poli + chatbot_reponse(connu.contenu)
+            return
+
+    # 🌍 Wikipédia (le mot peut être avant ou après)
+    if intention.route == ROUTE_WIKIPEDIA:
+        query = intention.requete
         if not query:
-            return "Tu dois me dire ce que tu veux que je cherche sur Wikipédia."
+            yield "Tu dois me dire ce que tu veux que je cherche sur Wikipédia."
+            return
         try:
-            res = recherche_wikipedia(query)
+            with etape("wikipedia"):
+                res = recherche_wikipedia(query)
             if isinstance(res, list):
             # ← Cas d'ambiguïté : on propose des suggestions
-                return chatbot_reponse("Ta question est trop vague. Voici plusieurs sujets possibles :\n- " + "\n- ".join(res))
-            if res:
-                return f"{reponse_polie + ' ' if reponse_polie else ''}" + chatbot_reponse(f"Voici ce que j'ai trouvé sur Wikipédia :\n{res}")
-            return chatbot_reponse("Désolé, rien trouvé de pertinent sur Wikipédia.")
+                yield chatbot_reponse("Ta question est trop vague. Voici plusieurs sujets possibles :\n- " + "\n- ".join(res))
+            elif res:
+                yield prefixe_poli + chatbot_reponse(f"Voici ce que j'ai trouvé sur Wikipédia :\n{res}")
+            else:
+                yield chatbot_reponse("Désolé, rien trouvé de pertinent sur Wikipédia.")
         except Exception as e:
-            return chatbot_reponse(f"Erreur Wikipédia : {e}")
+            yield chatbot_reponse(f"Erreur Wikipédia : {e}")
+        return
 
     # 🌐 Google (le mot peut être avant ou après)
-    if GOOGLE_TRIGGER in question.lower():
-        cleaned_question = question.lower().replace(GOOGLE_TRIGGER, "")
-        query = re.sub(
-            r"\b(peux-tu|peux tu|pourrais-tu|pourrais tu|tu peux|tu pourrais|tu-peux|"
-            r"s'il te plaît|stp|svp|sil te plait|s il te plait|est ce que|est-ce que|"
-            r"tu-pourrais|donne moi|m'aider|me donner|avoir|sur|dans|avec|la|le|"
-            r"définition|recherche|rechercher|de|du|des|je|tu|il|nous|vous|ils|elle|elles|pourrais|le|la)\b",
-            "",
-            cleaned_question
-        )
-        query = query.strip(" :!?.,\"'")
+    if intention.route == ROUTE_GOOGLE:
+        query = intention.requete
         if not query:
-            return "Tu dois me dire ce que tu veux que je cherche sur Google."
+            yield "Tu dois me dire ce que tu veux que je cherche sur Google."
+            return
         try:
-            print(f"[DEBUG] Requête Google nettoyée : {query}")
-            res = recherche_google(query)
-            if res:
-                return f"{reponse_polie + ' ' if reponse_polie else ''}" + chatbot_reponse(f"Voici ce que j'ai trouvé via Google :\n{res}")
-            return chatbot_reponse("Désolé, rien trouvé de pertinent via Google.")
+            logger.debug(f"Requête Google nettoyée : {query}")
+            if not stream:
+                with etape("google"):
+                    res = recherche_google(query)
+                if res:
+                    yield prefixe_poli + chatbot_reponse(f"Voici ce que j'ai trouvé via Google :\n{res}")
+                else:
+                    yield chatbot_reponse("Désolé, rien trouvé de pertinent via Google.")
+                return
+            with etape("google"):
+                preparation = preparer_recherche_google(query)
+            if not preparation:
+                yield chatbot_reponse("Désolé, rien trouvé de pertinent via Google.")
+                return
+            yield from reponse_google_flux(preparation, prefixe_poli, stream=True)
         except Exception as e:
-            return chatbot_reponse(f"Erreur Google : {e}")
+            yield chatbot_reponse(f"Erreur Google : {e}")
+        return
 
     # ➕ Maths
-    if MATH_TRIGGER in question.lower():
-        expression = question.lower().split(MATH_TRIGGER, 1)[-1].strip()
+    if intention.route == ROUTE_MATHS:
+        expression = intention.requete
         if not expression:
-            return chatbot_reponse("Tu dois m’écrire une expression ou un problème mathématique à résoudre.")
+            yield chatbot_reponse("Tu dois m’écrire une expression ou un problème mathématique à résoudre.")
+            return
+        try:
+            if stream:
+                with etape("maths"):
+                    yield from resoudre_maths_flux(expression)
+            else:
+                with etape("maths"):
+                    solution = resoudre_maths(expression)
+                yield chatbot_reponse(solution, math_mode=True)
+        except Exception as e:
+            yield chatbot_reponse(f"Erreur mathématique : {e}")
+        return
+
+    # 🔁 Par défaut : recherche Wikipédia et Google en parallèle (sans attendre que l'utilisateur la demande)
+    sujet = routeur.nettoyer_requete(intention.question) if DEFAUT_RECHERCHE_ACTIVE else ""
+    if sujet:
         try:
-            solution = resoudre_maths(expression)
-            return chatbot_reponse(solution, math_mode=True)
+            with etape("recherche_parallele"):
+                source, res = course_defaut.lancer({
+                    "wikipedia": lambda: recherche_wikipedia(sujet, return_disambiguation=False),
+                    "google": lambda: preparer_recherche_google(sujet),
+                })
+            if source == "wikipedia":
+                marquer_route("defaut_wikipedia")
+                yield prefixe_poli + chatbot_reponse(f"Voici ce que j'ai trouvé sur Wikipédia :\n{res}")
+                return
+            if source == "google":
+                marquer_route("defaut_google")
+                yield from reponse_google_flux(res, prefixe_poli, stream)
+                return
         except Exception as e:
-            return chatbot_reponse(f"Erreur mathématique : {e}")
+            yield chatbot_reponse(f"Erreur de recherche : {e}")
+            return
 
-    # 🔁 Par défaut
+    # Rien trouvé (ou recherche désactivée) : on propose de reformuler
     suggestions = [
         "Je n’ai pas trouvé de réponse précise, veux-tu que je cherche sur Google ?",
         "Hmm, rien dans mes connaissances… veux-tu que j'essaie une recherche sur internet ?",
         "Je n'ai pas compris, tu peux reformuler ? Ou me dire si c’est une question Wikipédia, Google ou mathématique.",
         "Pas certain de la réponse 😕 Tu veux que j’explore un peu plus ?"
     ]
-    return chatbot_reponse(random.choice(suggestions))
-
+    yield chatbot_reponse(random.choice(suggestions))
@@ -0,0 +1,420 @@
+import ast  # Pour analyser les expressions arithmétiques sans jamais les exécuter avec eval()
+import math  # Fonctions mathématiques de base pour l'évaluateur arithmétique
+import operator  # Opérateurs autorisés dans l'évaluateur arithmétique
+import re  # Pour reconnaître les demandes (dérivée, intégrale, limite...) et normaliser l'écriture
+from functools import lru_cache  # Pour n'importer SymPy qu'une seule fois
+from typing import Optional  # Pour indiquer qu'une valeur peut être None
+
+from app.config import MATHS_ISOLATION, MATHS_DELAI, MATHS_PROCESSUS  # Calcul symbolique dans des processus à part
+from utils.isolement import ProcessusIsoles  # Délai strict : un calcul trop long est arrêté
+
+# Moteur de calcul local : répond sans appeler Mistral quand c'est possible.
+#   - arithmétique (12*7, 2^10, sqrt(2), sin(pi/2)...) : évaluateur sûr basé sur l'AST, sans dépendance ;
+#   - dérivées, intégrales, limites, équations, factorisation... : SymPy, s'il est installé, dans un processus
+#     à part arrêté après MATHS_DELAI secondes (résoudre x^100 + x + 1 = 0 ne se termine pas).
+# resoudre_localement() retourne None quand l'expression n'est pas comprise : l'appelant passe alors à Mistral.
+
+# ---------------------------------------------------------------------------
+# Normalisation de l'écriture
+# ---------------------------------------------------------------------------
+
+_REMPLACEMENTS = [
+    ("×", "*"), ("÷", "/"), ("−", "-"), ("·", "*"), ("²", "^2"), ("³", "^3"),
+    ("√", "sqrt"), ("π", "pi"), ("∞", "oo"), ("≤", "<="), ("≥", ">="),
+]
+
+_PREFIXES = re.compile(
+    r"^(?:moi\s+|combien\s+(?:fait|font|vaut|valent)\s+|que\s+vaut\s+|la\s+valeur\s+de\s+|le\s+résultat\s+de\s+)+"
+)
+
+_LIMITE_EXPOSANT = 10000  # Au-delà, 9^9^9 et consorts bloqueraient le worker
+_LIMITE_CHIFFRES = 1000  # Taille maximale d'un résultat entier
+_LIMITE_DEGRE = 100  # Degré maximal d'une expression symbolique : développer (x+1)^3000 prend des secondes
+_LIMITE_DEGRE_EQUATION = 6  # Au-delà, les racines n'ont en général pas d'expression lisible (et se font attendre)
+
+
+def normaliser_expression(expression: str) -> str:
+    # Met l'expression sous une forme commune : symboles unicode, virgule décimale, ponctuation finale
+    expr = expression.strip().lower()
+    for ancien, nouveau in _REMPLACEMENTS:
+        expr = expr.replace(ancien, nouveau)
+    expr = _PREFIXES.sub("", expr)
+    expr = re.sub(r"(?<!\d)[\s?!.]+$", "", expr)  # Ponctuation finale (mais pas la factorielle de « 5! »)
+    expr = re.sub(r"\s*=\s*\??$", "", expr)  # « 12*7 = ? »
+    if not re.search(r"\w\s*\([^)]*,", expr):
+        expr = re.sub(r"(\d),(\d)", r"\1.\2", expr)  # 3,5 -> 3.5 (sauf dans les appels de fonction à plusieurs arguments)
+    expr = re.sub(r"racines?\s+cubiques?\s+(?:de\s+)?(\S+)", r"cbrt(\1)", expr)
+    expr = re.sub(r"racine\s+(?:carrée\s+)?(?:de\s+)?(?!du\b|des\b)(\S+)", r"sqrt(\1)", expr)
+    return expr.strip()
+
+
+def formater_nombre(valeur) -> str:
+    # 84 -> "84", 2.0 -> "2", 3.5 -> "3,5", 0.1 + 0.2 -> "0,3"
+    if isinstance(valeur, bool):
+        raise ValueError("booléen")
+    if isinstance(valeur, int):
+        return str(valeur)
+    if isinstance(valeur, float):
+        if math.isnan(valeur) or math.isinf(valeur):
+            raise ValueError("résultat non fini")
+        if valeur.is_integer() and abs(valeur) < 1e15:
+            return str(int(valeur))
+        return f"{valeur:.10g}".replace(".", ",")
+    raise ValueError(f"type inattendu : {type(valeur)}")
+
+
+# ---------------------------------------------------------------------------
+# Évaluateur arithmétique sûr
+# ---------------------------------------------------------------------------
+
+def _puissance(a, b):
+    if abs(b) > _LIMITE_EXPOSANT or (isinstance(a, int) and isinstance(b, int) and b > 0
+                                     and abs(a) > 1 and b * math.log10(abs(a)) > _LIMITE_CHIFFRES):
+        raise ValueError("puissance trop grande")
+    return operator.pow(a, b)
+
+
+def _factorielle(n):
+    if not float(n).is_integer() or n < 0 or n > 500:
+        raise ValueError("factorielle hors limites")
+    return math.factorial(int(n))
+
+
+_OPERATEURS_BINAIRES = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: _puissance,
+}
+_OPERATEURS_UNAIRES = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+_FONCTIONS = {
+    "sqrt": math.sqrt, "cbrt": lambda x: math.copysign(abs(x) ** (1 / 3), x), "abs": abs,
+    "sin": math.sin, "cos": math.cos, "tan": math.tan, "asin": math.asin, "acos": math.acos, "atan": math.atan,
+    "exp": math.exp, "ln": math.log, "log": math.log10, "factorial": _factorielle,
+}
+_CONSTANTES = {"pi": math.pi, "e": math.e}
+
+
+def _evaluer_noeud(noeud):
+    if isinstance(noeud, ast.Expression):
+        return _evaluer_noeud(noeud.body)
+    if isinstance(noeud, ast.Constant) and isinstance(noeud.value, (int, float)) and not isinstance(noeud.value, bool):
+        return noeud.value
+    if isinstance(noeud, ast.BinOp) and type(noeud.op) in _OPERATEURS_BINAIRES:
+        resultat = _OPERATEURS_BINAIRES[type(noeud.op)](_evaluer_noeud(noeud.left), _evaluer_noeud(noeud.right))
+        if isinstance(resultat, int) and resultat.bit_length() > _LIMITE_CHIFFRES * 3.33:
+            raise ValueError("résultat trop grand")
+        return resultat
+    if isinstance(noeud, ast.UnaryOp) and type(noeud.op) in _OPERATEURS_UNAIRES:
+        return _OPERATEURS_UNAIRES[type(noeud.op)](_evaluer_noeud(noeud.operand))
+    if isinstance(noeud, ast.Name) and noeud.id in _CONSTANTES:
+        return _CONSTANTES[noeud.id]
+    if (isinstance(noeud, ast.Call) and isinstance(noeud.func, ast.Name) and noeud.func.id in _FONCTIONS
+            and len(noeud.args) == 1 and not noeud.keywords):
+        return _FONCTIONS[noeud.func.id](_evaluer_noeud(noeud.args[0]))
+    raise ValueError(f"élément non autorisé : {ast.dump(noeud)[:40]}")
+
+
+def evaluer_arithmetique(expression: str):
+    # Évalue une expression purement numérique ; lève ValueError/SyntaxError si elle sort du sous-ensemble autorisé
+    expr = expression.replace("^", "**")
+    expr = re.sub(r"(\d+(?:\.\d+)?)\s*!", r"factorial(\1)", expr)
+    expr = re.sub(r"(\d)\s*(\(|pi\b|sqrt|sin|cos|tan|ln|log|exp)", r"\1*\2", expr)  # 2pi, 3(4+1), 2sqrt(2)
+    if len(expr) > 500:
+        raise ValueError("expression trop longue")
+    return _evaluer_noeud(ast.parse(expr, mode="eval"))
+
+
+# ---------------------------------------------------------------------------
+# Calcul symbolique (SymPy, optionnel)
+# ---------------------------------------------------------------------------
+
+@lru_cache(maxsize=1)
+def _sympy():
+    # Import paresseux : SymPy est lourd à charger et reste facultatif
+    try:
+        import sympy
+        from sympy.parsing.sympy_parser import (
+            parse_expr, standard_transformations, implicit_multiplication_application, convert_xor,
+        )
+    except ImportError:
+        return None
+    transformations = standard_transformations + (implicit_multiplication_application, convert_xor)
+    return sympy, parse_expr, transformations
+
+
+# Identifiants acceptés dans une expression symbolique : tout le reste est refusé avant parse_expr
+# (qui s'appuie sur eval et ne doit jamais recevoir un texte arbitraire)
+_IDENTIFIANTS_SYMBOLIQUES = {
+    "x", "y", "z", "t", "n", "a", "b", "c", "k", "e", "pi", "oo", "sqrt", "cbrt", "abs", "exp", "ln", "log",
+    "sin", "cos", "tan", "asin", "acos", "atan", "sinh", "cosh", "tanh", "factorial", "D1", "D2",
+}
+_CARACTERES_SYMBOLIQUES = re.compile(r"^[\w\s+\-*/^().,=<>!']*$")
+
+
+def _degre(expr) -> int:
+    # Majorant du degré polynomial de l'expression (une fonction de x compte comme x)
+    if expr.is_Symbol:
+        return 1
+    if expr.is_Pow and expr.exp.is_Integer:
+        return _degre(expr.base) * abs(int(expr.exp))
+    if expr.is_Mul:
+        return sum(_degre(arg) for arg in expr.args)
+    return max((_degre(arg) for arg in expr.args), default=0)
+
+
+def _verifier_taille(expr) -> None:
+    # Mêmes limites que l'évaluateur arithmétique, sur l'expression non évaluée : SymPy calcule les puissances
+    # entières dès qu'il évalue (9^9^9 bloquerait le worker) ; les enfants sont vérifiés avant leur parent,
+    # leur valeur peut donc être calculée sans risque
+    for arg in expr.args:
+        _verifier_taille(arg)
+    if expr.is_Pow and expr.exp.is_number:
+        exposant = abs(expr.exp.evalf(15))
+        if not exposant.is_finite or exposant > _LIMITE_EXPOSANT:
+            raise ValueError("puissance trop grande")
+        base = abs(expr.base.evalf(15)) if expr.base.is_number else None
+        if base is not None and base.is_finite and base > 1 and exposant * math.log10(float(base)) > _LIMITE_CHIFFRES:
+            raise ValueError("puissance trop grande")
+    if _degre(expr) > _LIMITE_DEGRE:
+        raise ValueError("degré trop grand")
+
+
+def _analyser(texte: str, variables_fonction: bool = False):
+    # Convertit un texte en expression SymPy ; ValueError si le texte contient autre chose que des maths
+    # ou si son calcul serait trop long (voir _verifier_taille)
+    sympy, parse_expr, transformations = _sympy()
+    texte = texte.strip()
+    if not texte or len(texte) > 300 or "__" in texte or not _CARACTERES_SYMBOLIQUES.match(texte):
+        raise ValueError("expression refusée")
+    for identifiant in re.findall(r"[a-zA-Z_]\w*", texte):
+        if identifiant not in _IDENTIFIANTS_SYMBOLIQUES:
+            raise ValueError(f"identifiant inconnu : {identifiant}")
+    x = sympy.Symbol("x")
+    local = {"e": sympy.E, "pi": sympy.pi, "oo": sympy.oo, "ln": sympy.log, "cbrt": sympy.cbrt,
+             "log": lambda v: sympy.log(v, 10), "factorial": _factorielle_symbolique}
+    if variables_fonction:
+        y = sympy.Function("y")
+        local.update({"y": y(x), "D1": sympy.Derivative(y(x), x), "D2": sympy.Derivative(y(x), x, 2)})
+    _verifier_taille(parse_expr(texte, local_dict=local, transformations=transformations, evaluate=False))
+    return parse_expr(texte, local_dict=local, transformations=transformations, evaluate=True)
+
+
+def _factorielle_symbolique(n):
+    # factorial() est calculée dès l'analyse, même sans évaluation : mêmes bornes que _factorielle
+    sympy = _sympy()[0]
+    n = sympy.sympify(n, evaluate=False)
+    _verifier_taille(n)
+    if n.is_number and (not n.is_integer or n < 0 or n > 500):
+        raise ValueError("factorielle hors limites")
+    return sympy.factorial(n)
+
+
+def _tex(objet) -> str:
+    sympy = _sympy()[0]
+    return f"\\({sympy.latex(objet)}\\)"
+
+
+def _variable(expr, nom: Optional[str] = None):
+    # Variable d'étude : celle demandée, sinon x s'il apparaît, sinon l'unique symbole libre
+    sympy = _sympy()[0]
+    if nom:
+        return sympy.Symbol(nom)
+    symboles = sorted(expr.free_symbols, key=lambda s: s.name)
+    for symbole in symboles:
+        if symbole.name == "x":
+            return symbole
+    return symboles[0] if symboles else sympy.Symbol("x")
+
+
+def _point_limite(texte: str):
+    sympy = _sympy()[0]
+    texte = texte.strip().replace("l'infini", "oo").replace("infini", "oo").replace("inf", "oo")
+    texte = re.sub(r"^moins\s+", "-", re.sub(r"^plus\s+", "", texte))
+    return sympy.oo if texte in ("oo", "+oo") else _analyser(texte)
+
+
+def _derivee(m) -> str:
+    sympy = _sympy()[0]
+    expr = _analyser(m.group("expr"))
+    var = _variable(expr, m.group("var"))
+    ordre = 2 if m.group("seconde") else 1
+    resultat = sympy.simplify(sympy.diff(expr, var, ordre))
+    nom = "dérivée seconde" if ordre == 2 else "dérivée"
+    return f"La {nom} de {_tex(expr)} par rapport à {var} est {_tex(resultat)}."
+
+
+def _integrale(m) -> str:
+    sympy = _sympy()[0]
+    expr = _analyser(m.group("expr"))
+    var = _variable(expr, m.group("var"))
+    if m.group("a") is not None:
+        a, b = _point_limite(m.group("a")), _point_limite(m.group("b"))
+        resultat = sympy.integrate(expr, (var, a, b))
+        if resultat.has(sympy.Integral):
+            raise ValueError("intégrale non calculée")
+        valeur = f" ≈ {formater_nombre(float(resultat))}" if resultat.is_number and not resultat.is_Integer else ""
+        return f"L'intégrale de {_tex(expr)} entre {_tex(a)} et {_tex(b)} vaut {_tex(resultat)}{valeur}."
+    resultat = sympy.integrate(expr, var)
+    if resultat.has(sympy.Integral):
+        raise ValueError("primitive non calculée")
+    return f"Une primitive de {_tex(expr)} est {_tex(resultat)} (à une constante près)."
+
+
+def _limite(m) -> str:
+    sympy = _sympy()[0]
+    expr = _analyser(m.group("expr"))
+    var = _variable(expr, m.group("var"))
+    point = _point_limite(m.group("point"))
+    resultat = sympy.limit(expr, var, point)
+    return f"La limite de {_tex(expr)} quand {var} tend vers {_tex(point)} est {_tex(resultat)}."
+
+
+def _equation_differentielle(texte: str) -> str:
+    sympy = _sympy()[0]
+    texte = texte.replace("y''", "D2").replace("y'", "D1")
+    gauche, _, droite = texte.partition("=")
+    x = sympy.Symbol("x")
+    y = sympy.Function("y")
+    equation = sympy.Eq(_analyser(gauche, True), _analyser(droite or "0", True))
+    solution = sympy.dsolve(equation, y(x))
+    return f"La solution générale de {_tex(equation)} est {_tex(solution)}."
+
+
+def _verifier_degre_equation(relation, var) -> None:
+    sympy = _sympy()[0]
+    difference = relation.lhs - relation.rhs
+    if difference.is_polynomial(var) and sympy.degree(difference, var) > _LIMITE_DEGRE_EQUATION:
+        raise ValueError("équation de degré trop grand")
+
+
+def _lisible(solution):
+    # Racines sans expression par radicaux (CRootOf) : illisibles une fois en LaTeX, Mistral prend le relais
+    if solution.has(_sympy()[0].CRootOf):
+        raise ValueError("racines sans expression lisible")
+    return solution
+
+
+def _resoudre(texte: str) -> str:
+    sympy = _sympy()[0]
+    if "y'" in texte:
+        return _equation_differentielle(texte)
+    inegalite = re.search(r"<=|>=|<|>", texte)
+    if inegalite:
+        gauche, droite = texte[:inegalite.start()], texte[inegalite.end():]
+        relation = sympy.Rel(_analyser(gauche), _analyser(droite), inegalite.group())
+        if relation in (sympy.true, sympy.false):
+            raise ValueError("comparaison sans inconnue")  # « 10 < 5 » : Mistral répond mieux que « ∅ »
+        var = _variable(relation)
+        _verifier_degre_equation(relation, var)
+        solution = _lisible(sympy.solve_univariate_inequality(relation, var, relational=False))
+        return f"L'ensemble des solutions de {_tex(relation)} est {_tex(solution)}."
+    gauche, _, droite = texte.partition("=")
+    equation = sympy.Eq(_analyser(gauche), _analyser(droite or "0"))
+    if equation in (sympy.true, sympy.false):
+        raise ValueError("égalité sans inconnue")
+    var = _variable(equation)
+    _verifier_degre_equation(equation, var)
+    solutions = [_lisible(s) for s in sympy.solve(equation, var)]
+    if not solutions:
+        return f"L'équation {_tex(equation)} n'a pas de solution."
+    liste = ", ".join(f"{var} = {_tex(s)}" for s in solutions)
+    return f"Les solutions de {_tex(equation)} sont : {liste}." if len(solutions) > 1 else f"La solution de {_tex(equation)} est {liste}."
+
+
+def _factoriser(texte: str) -> str:
+    sympy = _sympy()[0]
+    expr = _analyser(texte)
+    return f"Forme factorisée : {_tex(expr)} = {_tex(sympy.factor(expr))}."
+
+
+def _developper(texte: str) -> str:
+    sympy = _sympy()[0]
+    expr = _analyser(texte)
+    return f"Forme développée : {_tex(expr)} = {_tex(sympy.expand(expr))}."
+
+
+def _simplifier(texte: str) -> str:
+    sympy = _sympy()[0]
+    expr = _analyser(texte)
+    return f"Forme simplifiée : {_tex(expr)} = {_tex(sympy.simplify(expr))}."
+
+
+_VAR = r"(?:\s*(?:par rapport à|en)\s+(?P<var>[a-z]))?"
+_DE = r"(?:\s+(?:de|du|d')\s*|\s+)"
+
+# (motif, traitement) : le premier motif qui reconnaît l'expression gagne
+_DEMANDES = [
+    (re.compile(r"^(?:la\s+)?(?:dérivée?s?|derivee?s?|dérive[rs]?|derive[rs]?)(?P<seconde>\s+seconde)?" + _DE
+                + r"(?P<expr>.+?)" + _VAR + r"$"), _derivee),
+    (re.compile(r"^(?:l'|une\s+|la\s+)?(?:intégrale|integrale|primitive|int|∫)" + _DE
+                + r"(?P<expr>.+?)(?:\s*,?\s*d(?P<var>[a-z]))?"
+                + r"(?:\s+(?:entre|de)\s+(?P<a>\S+)\s+(?:et|à|a)\s+(?P<b>\S+))?$"), _integrale),
+    (re.compile(r"^(?:la\s+)?(?:limite|lim)" + _DE + r"(?P<expr>.+?)\s*(?:quand|lorsque|pour|en)\s+(?P<var>[a-z])"
+                r"\s*(?:tend\s+vers|->|→)\s*(?P<point>.+)$"), _limite),
+    (re.compile(r"^(?:la\s+)?(?:limite|lim)\s*\(?\s*(?P<var>[a-z])\s*(?:->|→|tend\s+vers)\s*(?P<point>[^\s)]+)\s*\)?\s*"
+                r"(?:de\s+|d')?(?P<expr>.+)$"), _limite),
+]
+
+_VERBES = [
+    (re.compile(r"^(?:résous|resous|résoudre|resoudre|trouve|solution\s+de)\s+(?:l'|les\s+)?"
+                r"(?:équation|equation|inéquation|inequation)?\s*(?:différentielle\s+|differentielle\s+)?(?:suivante\s*:?\s*)?(?P<expr>.+)$"), _resoudre),
+    (re.compile(r"^(?:l'|une\s+)?(?:équation|equation|inéquation)\s*(?:différentielle\s+|differentielle\s+)?:?\s*(?P<expr>.+)$"), _resoudre),
+    (re.compile(r"^(?:les\s+)?racines\s+(?:du\s+polynôme|du\s+polynome|de)\s+(?P<expr>.+)$"), _resoudre),
+    (re.compile(r"^(?:factorise|factoriser|factorisation\s+de)\s+(?:l'expression\s+|le\s+polynôme\s+)?(?P<expr>.+)$"), _factoriser),
+    (re.compile(r"^(?:développe|developpe|développer|developper)\s+(?:l'expression\s+)?(?P<expr>.+)$"), _developper),
+    (re.compile(r"^(?:simplifie|simplifier)\s+(?:l'expression\s+)?(?P<expr>.+)$"), _simplifier),
+]
+
+
+# Demandes écrites comme un appel de fonction : int(x^2), dérivée(sin(x)), factorise(x^2-1)...
+_APPEL = re.compile(r"^(int|intégrale|integrale|primitive|dérivée|derivee|dérive|derive|lim|limite|factorise|"
+                    r"développe|developpe|simplifie|résous|resous)\s*\((?P<interieur>.*)\)$")
+
+
+def _parentheses_equilibrees(texte: str) -> bool:
+    profondeur = 0
+    for caractere in texte:
+        profondeur += {"(": 1, ")": -1}.get(caractere, 0)
+        if profondeur < 0:
+            return False
+    return profondeur == 0
+
+
+def _resoudre_symbolique(expr: str) -> Optional[str]:
+    if _sympy() is None:
+        return None  # SymPy absent : Mistral prendra le relais
+    if (m := _APPEL.match(expr)) and _parentheses_equilibrees(m.group("interieur")):
+        expr = f"{m.group(1)} {m.group('interieur')}"
+    for motif, traitement in _DEMANDES:
+        if (m := motif.match(expr)):
+            return traitement(m)
+    for motif, traitement in _VERBES:
+        if (m := motif.match(expr)):
+            return traitement(m.group("expr"))
+    if re.search(r"=|<|>", expr):
+        return _resoudre(expr)  # Une équation ou inéquation sans verbe
+    return None
+
+
+def resoudre_localement(expression: str) -> Optional[str]:
+    # Calcule l'expression sans appel réseau ; None si elle n'est pas comprise (l'appelant se tourne vers Mistral)
+    expr = normaliser_expression(expression)
+    if not expr:
+        return None
+
+    try:
+        return f"{expr} = {formater_nombre(evaluer_arithmetique(expr))}"
+    except ZeroDivisionError:
+        return "Division par zéro : cette expression n'a pas de valeur."
+    except (ValueError, SyntaxError, TypeError, OverflowError, ArithmeticError):
+        pass  # Pas de l'arithmétique pure : on tente le calcul symbolique
+
+    try:
+        if MATHS_ISOLATION:
+            return _calculs.executer(_resoudre_symbolique, expr)
+        return _resoudre_symbolique(expr)
+    except Exception:
+        return None  # Quelle que soit l'erreur de SymPy (ou un calcul arrêté), Mistral reste le filet de sécurité
+
+
+# Processus de calcul partagés par les threads du worker (SymPy importé une fois par processus)
+_calculs = ProcessusIsoles("maths", MATHS_PROCESSUS, MATHS_DELAI, modules=("sympy",))
@@ -0,0 +1,165 @@
+import math  # Pour le calcul de l'IDF sans NumPy
+import re  # Découpage en phrases et repérage des tournures de définition
+from collections import Counter  # Fréquence des mots de la requête dans chaque phrase
+from dataclasses import dataclass  # Pour le résultat du résumé
+from typing import Iterator, Optional  # Pour typer le collecteur et les valeurs pouvant valoir None
+
+try:
+    import numpy as np  # Calcul des scores en un bloc, utilisé s'il est installé
+except ImportError:
+    np = None
+
+from app.config import (  # Budget du résumé, seuil des quasi-doublons et définitions données telles quelles
+    RESUME_BUDGET_TOKENS,
+    RESUME_SEUIL_DOUBLON,
+    RESUME_DEFINITION_MAX,
+)
+from utils.tokens import estimer_tokens  # Même estimation des tokens que pour l'historique envoyé à Mistral
+from utils.knowledge import B, K1, tokeniser  # Mêmes mots normalisés et mêmes paramètres BM25 que la base locale
+from utils.metriques import Compteur, enregistrer_collecteur  # Tokens économisés et appels à Mistral évités, exposés sur /metrics
+
+# Résumé extractif local, avant l'envoi à Mistral : le texte des pages trouvées est découpé en phrases,
+# chaque phrase est notée par BM25 contre la requête (les phrases de la page servent de corpus), les
+# quasi-doublons sont retirés et les meilleures phrases sont gardées, dans l'ordre de la page, tant
+# qu'elles tiennent dans le budget de tokens. Si la page commence par une courte définition du sujet,
+# elle est donnée telle quelle et Mistral n'est pas appelé.
+
+_FIN_PHRASE = re.compile(r"(?<=[.!?…])[\"»”)]*\s+(?=[«\"“(]?[A-ZÀ-ÖØ-Þ0-9])")
+_ABREVIATIONS = re.compile(r"(?:\b(?:[A-Z]|av|apr|env|etc|cf|ex|M|Mme|Dr|St|p|vol|n°)\.)$")
+_DEFINITION = re.compile(
+    r"\b(?:(?:est|sont|était|étaient)\s+(?:un|une|le|la|l'|les|des|du)\b"
+    r"|désigne|désignent|signifie|signifient|se dit|correspond|correspondent)",
+    re.IGNORECASE,
+)
+LONGUEUR_MIN_PHRASE = 25  # Caractères : en dessous, menus, boutons, mentions (« Accepter », « Lire la suite »)
+PHRASES_DEFINITION = 2  # La définition est cherchée parmi les premières phrases qui nomment le sujet
+POIDS_CONTEXTE = 0.3  # Poids des mots de la meilleure phrase, pour départager les phrases sans mot de la requête
+
+tokens_prompt = Compteur("chatbot_resume_tokens_total", "Tokens estimés du texte des pages, avant et après le résumé", ("etape",))
+llm_evites = Compteur("chatbot_resume_llm_evites_total", "Appels à Mistral évités par une définition trouvée dans la page")
+
+
+@dataclass
+class Resume:
+    extrait: str  # Phrases gardées, dans l'ordre de la page
+    definition: Optional[str]  # Courte définition du sujet, utilisable sans Mistral, ou None
+    tokens_avant: int
+    tokens_apres: int
+
+
+def decouper_phrases(texte: str) -> list[str]:
+    # Phrases du texte : coupure à chaque paragraphe (ligne) et après . ! ? … suivis d'une majuscule,
+    # sauf après une abréviation (« env. 3 »)
+    phrases = []
+    for paragraphe in texte.splitlines():
+        morceau = ""
+        for partie in _FIN_PHRASE.split(" ".join(paragraphe.split())):
+            morceau = f"{morceau} {partie}" if morceau else partie
+            if not _ABREVIATIONS.search(morceau):
+                phrases.append(morceau)
+                morceau = ""
+        if morceau:
+            phrases.append(morceau)
+    return phrases
+
+
+def scores_bm25(phrases: list[list[str]], termes: list[str]) -> list[float]:
+    # Score BM25 de chaque phrase (liste de mots normalisés) pour les termes de la requête
+    if not phrases or not termes:
+        return [0.0] * len(phrases)
+    frequences = [Counter(mots) for mots in phrases]
+    if np is not None:
+        tf = np.array([[compte[t] for t in termes] for compte in frequences], dtype=float)  # Phrases x termes
+        longueurs = np.array([len(mots) for mots in phrases], dtype=float)
+        df = (tf > 0).sum(axis=0)
+        idf = np.log(1 + (len(phrases) - df + 0.5) / (df + 0.5))
+        norme = K1 * (1 - B + B * longueurs / max(longueurs.mean(), 1.0))
+        return ((tf * (K1 + 1) / (tf + norme[:, None])) @ idf).tolist()
+
+    longueur_moyenne = max(sum(len(mots) for mots in phrases) / len(phrases), 1.0)
+    idf = {}
+    for terme in set(termes):
+        df = sum(1 for compte in frequences if compte[terme])
+        idf[terme] = math.log(1 + (len(phrases) - df + 0.5) / (df + 0.5))
+    scores = []
+    for mots, compte in zip(phrases, frequences):
+        norme = K1 * (1 - B + B * len(mots) / longueur_moyenne)
+        scores.append(sum(idf[t] * compte[t] * (K1 + 1) / (compte[t] + norme) for t in termes if compte[t]))
+    return scores
+
+
+def _similaires(a: set, b: set, seuil: float) -> bool:
+    # Quasi-doublons : la plus courte des deux phrases a au moins `seuil` de ses mots dans l'autre
+    # (une reformulation plus courte d'une phrase déjà gardée n'apporte rien)
+    return bool(a and b) and len(a & b) / min(len(a), len(b)) >= seuil
+
+
+def _definition(phrases: list[str], mots: list[list[str]], termes: set, max_caracteres: int) -> Optional[str]:
+    # Parmi les premières phrases qui nomment tout le sujet (bandeaux et introductions sautés), la première
+    # qui le définit (« X est un... », « X désigne... », le sujet avant le verbe), si elle est courte
+    if not termes or not max_caracteres:
+        return None
+    candidates = [phrase for phrase, mots_phrase in zip(phrases, mots) if termes <= set(mots_phrase)]
+    for phrase in candidates[:PHRASES_DEFINITION]:
+        verbe = _DEFINITION.search(phrase)
+        if len(phrase) <= max_caracteres and verbe and termes & set(tokeniser(phrase[:verbe.start()])):
+            return phrase
+    return None
+
+
+def resumer(
+    texte: str,
+    requete: str,
+    budget_tokens: int = RESUME_BUDGET_TOKENS,
+    seuil_doublon: float = RESUME_SEUIL_DOUBLON,
+    definition_max: int = RESUME_DEFINITION_MAX,
+) -> Resume:
+    # Meilleures phrases du texte pour la requête, dans la limite de `budget_tokens`
+    tokens_avant = estimer_tokens(texte)
+    phrases = [p for p in decouper_phrases(texte) if len(p) >= LONGUEUR_MIN_PHRASE]
+    mots = [tokeniser(p) for p in phrases]
+    termes = list(dict.fromkeys(tokeniser(requete)))  # Sans doublon, dans l'ordre de la requête
+
+    # Meilleur score d'abord ; à score égal (ou nul), les phrases du début de la page. Les mots de la meilleure
+    # phrase comptent un peu : une phrase qui parle du même sujet passe avant un bandeau de cookies.
+    scores = scores_bm25(mots, termes)
+    if scores and max(scores) > 0:
+        meilleure = max(range(len(phrases)), key=scores.__getitem__)
+        contexte = scores_bm25(mots, [m for m in dict.fromkeys(mots[meilleure]) if m not in termes])
+        scores = [s + POIDS_CONTEXTE * c for s, c in zip(scores, contexte)]
+    pertinentes = any(s > 0 for s in scores)
+    gardees, ensembles, budget = [], [], budget_tokens
+    for rang in sorted(range(len(phrases)), key=lambda i: (-scores[i], i)):
+        if pertinentes and not scores[rang]:
+            break  # Plus aucun mot du sujet : bandeaux, encarts, appels à s'abonner
+        ensemble = set(mots[rang])
+        if any(_similaires(ensemble, autre, seuil_doublon) for autre in ensembles):
+            continue  # Même phrase répétée ailleurs dans la page (ou presque)
+        cout = estimer_tokens(phrases[rang])
+        if cout > budget:
+            continue  # Une phrase plus courte, moins bien notée, peut encore tenir
+        gardees.append(rang)
+        ensembles.append(ensemble)
+        budget -= cout
+
+    # Aucune phrase ne tient dans le budget : le début du texte, coupé pour y tenir lui aussi
+    extrait = " ".join(phrases[i] for i in sorted(gardees)) or texte[:max(budget_tokens - 1, 0) * 4]
+    resume = Resume(
+        extrait=extrait,
+        definition=_definition(phrases, mots, set(termes), definition_max),
+        tokens_avant=tokens_avant,
+        tokens_apres=estimer_tokens(extrait),
+    )
+    tokens_prompt.inc("avant", pas=resume.tokens_avant)
+    tokens_prompt.inc("apres", pas=resume.tokens_apres)
+    if resume.definition:
+        llm_evites.inc()
+    return resume
+
+
+def _metriques_resume() -> Iterator[str]:
+    yield from tokens_prompt.exposer()
+    yield from llm_evites.exposer()
+
+
+enregistrer_collecteur(_metriques_resume)
@@ -0,0 +1,141 @@
+import re  # Expressions régulières précompilées
+from dataclasses import dataclass  # Pour l'intention structurée retournée par le routeur
+from functools import lru_cache  # Mémorise la recherche approximative par mot
+from typing import Optional  # Pour indiquer qu'une valeur peut être None
+
+from utils.index_flou import IndexFlou  # Recherche approximative indexée (fautes de frappe)
+
+# Routeur d'intentions : construit une seule fois à l'import, il analyse un message en une passe
+# (liste noire, formules de politesse et mots déclencheurs dans une même expression régulière)
+# et retourne une Intention que obtenir_la_response n'a plus qu'à exécuter.
+# Les fautes de frappe (« bonjuor », « wikipdia », « gogle ») sont rattrapées par des index approximatifs.
+
+ROUTE_VIDE = "vide"
+ROUTE_INAPPROPRIE = "inapproprie"
+ROUTE_SALUTATION = "salutation"
+ROUTE_WIKIPEDIA = "wikipedia"
+ROUTE_GOOGLE = "google"
+ROUTE_MATHS = "maths"
+ROUTE_DEFAUT = "defaut"
+
+
+@dataclass
+class Intention:
+    route: str  # Une des constantes ROUTE_*
+    question: str = ""  # Message en minuscules, sans les formules de politesse
+    requete: str = ""  # Sujet à chercher (Wikipédia/Google) ou expression à calculer (maths)
+    politesse: bool = False  # Le message contenait une formule de politesse
+    groupe_salutation: Optional[str] = None  # Groupe reconnu quand route == ROUTE_SALUTATION
+
+
+def _alternative(termes) -> str:
+    # Alternative regex des termes échappés, les plus longs d'abord (« tu peux » avant « tu »)
+    return "|".join(re.escape(t) for t in sorted(set(termes), key=len, reverse=True))
+
+
+class RouteurIntentions:
+    def __init__(
+        self,
+        liste_noire: list[str],
+        politesses: list[str],
+        salutations: dict[str, list[str]],
+        declencheurs: dict[str, str],
+        mots_vides: list[str],
+        seuil_salutation: float = 0.8,
+    ):
+        # declencheurs : mot-clé -> route, par ordre de priorité (ex : {"wikipedia": ROUTE_WIKIPEDIA, ...})
+        self.priorites = {route: rang for rang, route in enumerate(declencheurs.values())}
+        self.declencheurs = dict(declencheurs)
+
+        # Une seule expression pour tout ce qui se repère dans le texte ; (?<!\w) / (?!\w) au lieu de \b
+        # car certains termes commencent ou finissent par une apostrophe ou un tiret.
+        # Les limites de mots évitent les faux positifs (« con » dans « contenu », « avoir » dans « savoir »).
+        self._motif = re.compile(
+            rf"(?<!\w)(?:(?P<noir>{_alternative(liste_noire)})"
+            rf"|(?P<poli>{_alternative(politesses)})"
+            rf"|(?P<declencheur>{_alternative(declencheurs)}))(?!\w)"
+        )
+        self._mots_vides = re.compile(rf"(?<!\w)(?:{_alternative(mots_vides)})(?!\w)")
+
+        # Salutations : le message entier est comparé aux phrases connues (phrase -> groupe)
+        self.index_salutations = IndexFlou(seuil=seuil_salutation)
+        for groupe, phrases in salutations.items():
+            self.index_salutations.ajouter_tout(phrases, groupe)
+
+        # Déclencheurs : chaque mot du message est comparé aux mots-clés (mot-clé -> route)
+        self.index_declencheurs = IndexFlou(seuil=seuil_salutation)
+        for mot, route in declencheurs.items():
+            self.index_declencheurs.ajouter(mot, route)
+        self._mots = re.compile(r"\w{4,}")  # Mots assez longs pour qu'une faute soit tolérée
+        # Le vocabulaire des messages se répète beaucoup : on garde le résultat des mots déjà vus
+        self._chercher_mot = lru_cache(maxsize=4096)(self.index_declencheurs.chercher)
+
+    def salutation(self, msg: str) -> Optional[str]:
+        # Groupe de salutation le plus proche du message entier (tolérant aux fautes), ou None
+        trouve = self.index_salutations.chercher(msg.rstrip(" !?.,"))  # « salut ! » -> « salut »
+        return trouve[1] if trouve else None
+
+    def declencheur_approche(self, msg: str) -> Optional[tuple[str, int, int]]:
+        # Mot-clé mal orthographié (« wikipdia », « gogle », « calcul ») : (route, début, fin) du plus prioritaire
+        meilleur = None
+        for m in self._mots.finditer(msg):
+            trouve = self._chercher_mot(m.group())
+            if trouve and (meilleur is None or self.priorites[trouve[1]] < self.priorites[meilleur[0]]):
+                meilleur = (trouve[1], m.start(), m.end())
+        return meilleur
+
+    def nettoyer_requete(self, texte: str) -> str:
+        # Retire les mots vides et la ponctuation autour du sujet recherché
+        texte = self._mots_vides.sub(" ", texte)
+        return " ".join(texte.split()).strip(" :!?.,\"'")
+
+    def analyser(self, message: str) -> Intention:
+        msg = message.strip().lower()
+        if not msg:
+            return Intention(ROUTE_VIDE)
+
+        politesses = []  # Intervalles (début, fin) à retirer du message
+        declencheur = None  # (route, début, fin) du déclencheur le plus prioritaire
+        for m in self._motif.finditer(msg):
+            genre = m.lastgroup
+            if genre == "noir":
+                return Intention(ROUTE_INAPPROPRIE, question=msg)
+            if genre == "poli":
+                politesses.append(m.span())
+            else:
+                route = self.declencheurs[m.group()]
+                if declencheur is None or self.priorites[route] < self.priorites[declencheur[0]]:
+                    declencheur = (route, m.start(), m.end())
+
+        if (groupe := self.salutation(msg)):
+            return Intention(ROUTE_SALUTATION, question=msg, groupe_salutation=groupe)
+
+        question = self._retirer(msg, politesses, 0, len(msg))
+        if declencheur is None:
+            declencheur = self.declencheur_approche(msg)
+        if declencheur is None:
+            return Intention(ROUTE_DEFAUT, question=question, politesse=bool(politesses))
+
+        route, debut, fin = declencheur
+        if route == ROUTE_MATHS:
+            # L'expression est tout ce qui suit le mot-clé
+            requete = self._retirer(msg, politesses, fin, len(msg))
+        else:
+            # Le sujet peut être avant ou après le mot-clé
+            requete = self.nettoyer_requete(
+                self._retirer(msg, politesses, 0, debut) + " " + self._retirer(msg, politesses, fin, len(msg))
+            )
+        return Intention(route, question=question, requete=requete, politesse=bool(politesses))
+
+    @staticmethod
+    def _retirer(msg: str, intervalles: list[tuple[int, int]], debut: int, fin: int) -> str:
+        # Texte de msg[debut:fin] privé des intervalles donnés (triés, sans chevauchement)
+        morceaux = []
+        position = debut
+        for a, b in intervalles:
+            if b <= position or a >= fin:
+                continue
+            morceaux.append(msg[position:max(a, position)])
+            position = min(b, fin)
+        morceaux.append(msg[position:fin])
+        return "".join(morceaux).strip()
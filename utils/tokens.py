@@ -0,0 +1,7 @@
+# Estimation du nombre de tokens d'un texte, partagée par la mémoire des conversations (historique envoyé
+# à Mistral) et le résumé extractif (budget des extraits de pages)
+
+
+def estimer_tokens(texte: str) -> int:
+    # Estimation sans tokenizer : ~4 caractères par token, arrondie au supérieur
+    return len(texte) // 4 + 1
@@ -1,22 +1,82 @@
 import logging  # Importe le module standard pour la journalisation (logging)
-from wikipedia import summary, set_lang, DisambiguationError, PageError  # Importe les fonctions et exceptions nécessaires du module wikipedia
-from functools import lru_cache  # Pour appliquer un cache mémoire à la fonction (mémoïsation)
+from html.parser import HTMLParser  # Pour lire les options d'une page d'homonymie
+from urllib.parse import unquote  # Pour reconnaître les liens internes (/wiki/...)
 from typing import Optional, Union, List  # Pour la gestion des types d'arguments et de retour
 
+import requests  # Appels directs à l'API MediaWiki
+from requests.adapters import HTTPAdapter  # Pool de connexions dimensionné pour les appels simultanés
+
+from app.config import WIKIPEDIA_API_URL, WIKIPEDIA_TIMEOUT, WIKIPEDIA_APERCUS_MAX  # API MediaWiki (réelle ou faux serveur)
+from app.config import CACHE_DB_PATH, WIKI_CACHE_TTL, WIKI_CACHE_TTL_NEGATIF, WIKI_CACHE_MAX_ENTREES  # Réglages du cache
+from app.config import WEB_MAX_CONCURRENCE  # Taille du pool de connexions (autant que d'appels web simultanés)
+from utils.cache_sqlite import CacheSQLite, cle_cache, normaliser_texte  # Cache disque partagé entre les workers
+from utils.coalescence import Coalesceur, DelaiCoalescenceDepasse  # Un seul appel pour les recherches identiques simultanées
+from utils.delais import EcheanceDepassee, ServiceSature, borner, limite_web  # Places « web » et échéance de la requête
+from utils.metriques import appel_amont, enregistrer_collecteur, exposer_caches  # Durées, erreurs et taux de succès
+
 logger = logging.getLogger(__name__)  # Crée un logger pour le module courant (utile pour les messages de debug/info/warning/error)
 
-# Définit la langue par défaut de Wikipédia (ici français)
-set_lang("fr")
+# Recherche Wikipédia par appels directs à l'API MediaWiki (connexions réutilisées d'un appel à l'autre) :
+# - une question = un seul appel (recherche + résumé + détection des homonymies, redirections suivies) ;
+# - une page d'homonymie = un appel pour ses options (action=parse), puis un seul appel groupé
+#   (prop=extracts, titles=A|B|...) pour un court aperçu de chacune ;
+# - un lot de questions (recherche_wikipedia_lot) = des appels groupés par titres, puis une recherche
+#   seulement pour les questions qui ne sont pas un titre de page.
+# Les résumés obtenus par titre exact (aperçus, lots) ont leurs propres clés de cache : la même question
+# posée à recherche_wikipedia passe par la recherche, dont le premier résultat peut être une autre page.
+
+EXTRAITS_PAR_APPEL = 20  # Nombre maximal de résumés d'introduction par appel accepté par l'API (exlimit)
+APERCU_MAX_CARACTERES = 160  # Longueur d'un aperçu affiché à côté d'une option d'homonymie
+ENTETES = {"User-Agent": "Project-IA-chatbot/1.0 (requests)"}  # Wikimédia demande un User-Agent identifiable
+
+_session_wikipedia = requests.Session()  # Connexions réutilisées d'un appel à l'autre
+_session_wikipedia.mount("http://", HTTPAdapter(pool_maxsize=WEB_MAX_CONCURRENCE))
+_session_wikipedia.mount("https://", HTTPAdapter(pool_maxsize=WEB_MAX_CONCURRENCE))
+
+# Cache partagé par tous les workers et conservé au redémarrage (remplace l'ancien lru_cache propre à chaque processus).
+# Les réponses négatives (page introuvable, résumé vide) sont aussi mémorisées, avec une durée de vie plus courte.
+cache_wikipedia = CacheSQLite(CACHE_DB_PATH, "wikipedia", max_entrees=WIKI_CACHE_MAX_ENTREES, ttl_defaut=WIKI_CACHE_TTL)
+enregistrer_collecteur(exposer_caches("wikipedia", cache_wikipedia.statistiques))
+coalescence_wikipedia = Coalesceur("wikipedia")
+
+
+def statistiques_cache_wikipedia() -> dict:
+    # Hits/misses de ce processus et nombre d'entrées en cache
+    return cache_wikipedia.statistiques()
+
+
+def url_api(lang: str) -> str:
+    return WIKIPEDIA_API_URL.format(lang=lang.lower())
+
+
+def ouvrir_connexions(lang: str = "fr") -> None:
+    # Établit à l'avance la connexion à l'API MediaWiki (préchauffage)
+    _session_wikipedia.head(url_api(lang), headers=ENTETES, timeout=WIKIPEDIA_TIMEOUT).close()
+
+
+def fermer_connexions() -> None:
+    _session_wikipedia.close()
+
+
+def _cle(query: str, lang: str, sentences: int, redirect: bool, auto_suggest: bool = True) -> str:
+    # La clé ne dépend que de ce qui change le résultat (pas du logger)
+    return cle_cache(normaliser_texte(query), lang, sentences, redirect, auto_suggest)
+
+
+def _cle_titre(titre: str, lang: str, sentences: int, redirect: bool) -> str:
+    # Résumé d'une page lue par son titre exact (sans recherche) : jamais confondu avec le résultat d'une recherche
+    return cle_cache("titre", normaliser_texte(titre), lang, sentences, redirect)
+
 
-@lru_cache(maxsize=128)  # Décorateur qui active le cache pour cette fonction (évite les appels redondants avec les mêmes paramètres)
 def recherche_wikipedia(
     query: str,  # La requête à rechercher sur Wikipédia (obligatoire)
     lang: str = "fr",  # Langue de la recherche (par défaut français)
     sentences: int = 2,  # Nombre de phrases à extraire dans le résumé (par défaut 2)
-    auto_suggest: bool = False,  # Permet à Wikipédia de corriger automatiquement les fautes ou approximations
+    auto_suggest: bool = True,  # Sans résultat, relance la recherche avec la correction proposée par Wikipédia
     redirect: bool = True,  # Suivre automatiquement les redirections de pages
     return_disambiguation: bool = True,  # Si la requête est ambiguë, retourne la liste des options au lieu de None
-    logger: Optional[logging.Logger] = None  # Logger optionnel pour personnaliser la journalisation
+    logger: Optional[logging.Logger] = None,  # Logger optionnel pour personnaliser la journalisation
+    apercus: bool = True,  # Options d'une homonymie accompagnées d'un court aperçu (« Titre : aperçu »)
 ) -> Optional[Union[str, List[str]]]:  # La fonction retourne soit un résumé (str), soit une liste (désambiguïsation), soit None
 
     # Utilise un logger passé en paramètre ou crée un logger par défaut
@@ -29,37 +89,249 @@ def recherche_wikipedia(
         logger.warning("Requête Wikipédia vide.")  # Warn si la requête est vide
         return None  # On ne continue pas
 
-    try:
-        # Change la langue Wikipédia active pour la requête
-        set_lang(lang)
+    cle = _cle(query, lang, sentences, redirect, auto_suggest)
+    entree = cache_wikipedia.lire(cle, espace="wikipedia")
+    if entree is None:
+        # Même recherche déjà en cours (sujet à la mode) : on attend son résultat au lieu d'interroger Wikipédia
+        try:
+            entree = coalescence_wikipedia.executer(
+                cle,
+                lambda: _interroger_et_memoriser(cle, query, lang, sentences, redirect, auto_suggest, logger),
+                relire=lambda: cache_wikipedia.lire(cle, espace="wikipedia"),
+            )
+        except DelaiCoalescenceDepasse as e:
+            logger.warning(f"Wikipedia: {e}")
+            return None
+        if entree is None:
+            return None  # Erreur inattendue (réseau...) : rien n'est mis en cache
 
-        # Récupère un résumé selon la requête et paramètres
-        #texte = summary(query, sentences=sentences, auto_suggest=auto_suggest, redirect=redirect)
-        texte = summary(query, sentences=sentences, auto_suggest=True, redirect=redirect)
+    return _resultat(entree, return_disambiguation, apercus)
 
-        # Si résumé non vide, on retourne le texte nettoyé
-        if texte:
-            return texte.strip()
+
+def recherche_wikipedia_lot(
+    queries: List[str], lang: str = "fr", sentences: int = 2, redirect: bool = True, apercus: bool = True
+) -> dict[str, Optional[Union[str, List[str]]]]:
+    # Plusieurs questions d'un coup : requête -> résultat. Une requête qui est exactement un titre de page
+    # reçoit le résumé de cette page ; les autres passent par recherche_wikipedia
+    precharger_wikipedia(queries, lang=lang, sentences=sentences, redirect=redirect)
+    resultats = {}
+    for query in dict.fromkeys(q.strip() for q in queries):
+        if not query:
+            continue
+        entree = cache_wikipedia.lire(_cle_titre(query, lang, sentences, redirect), espace="wikipedia")
+        if entree is not None:
+            resultats[query] = entree["texte"]
         else:
-            # Si résumé vide, on log un warning et retourne None
-            logger.warning(f"Wikipedia: Résumé vide pour '{query}'.")
-            return None
+            resultats[query] = recherche_wikipedia(query, lang=lang, sentences=sentences, redirect=redirect, apercus=apercus)
+    return resultats
 
-    # Gestion spécifique des erreurs liées à Wikipédia :
 
-    # Si la page est ambiguë (plusieurs résultats possibles)
-    except DisambiguationError as e:
-        logger.warning(f"Wikipedia: Désambiguïsation pour '{query}', options : {e.options}")
-        if return_disambiguation:
-            # Si demandé, retourne la liste des options disponibles
-            return e.options
-        else:
-            # Sinon on retourne None
+def precharger_wikipedia(queries: List[str], lang: str = "fr", sentences: int = 2, redirect: bool = True) -> int:
+    # Met en cache (clés « titre »), par appels groupés, le résumé des requêtes qui sont exactement un titre de page ;
+    # les autres (recherche nécessaire, homonymie) restent pour recherche_wikipedia. Retourne le nombre de requêtes résolues.
+    manquantes = {}  # Requête -> clé de cache
+    for query in dict.fromkeys(q.strip() for q in queries):
+        cle = _cle_titre(query, lang, sentences, redirect)
+        if query and cache_wikipedia.lire(cle, espace="wikipedia") is None:
+            manquantes[query] = cle
+    resolues = 0
+    requetes = list(manquantes)
+    for debut in range(0, len(requetes), EXTRAITS_PAR_APPEL):
+        groupe = requetes[debut:debut + EXTRAITS_PAR_APPEL]
+        try:
+            pages = _pages_par_titre(groupe, lang, sentences, redirect)
+        except (ServiceSature, EcheanceDepassee, requests.exceptions.RequestException, ValueError) as e:
+            logger.warning(f"Wikipedia: préchargement de {len(groupe)} requêtes abandonné ({e})")
+            break
+        for query, page in pages.items():
+            if page is not None and not _est_homonymie(page) and (entree := _entree_resume(page)):
+                cache_wikipedia.ecrire(manquantes[query], entree, ttl=WIKI_CACHE_TTL, espace="wikipedia")
+                resolues += 1
+    return resolues
+
+
+def _resultat(entree: dict, return_disambiguation: bool, apercus: bool) -> Optional[Union[str, List[str]]]:
+    if entree["type"] == "resume":
+        return entree["texte"]
+    if entree["type"] == "options":
+        # Si demandé, retourne la liste des options disponibles, sinon None
+        if not return_disambiguation:
             return None
+        textes = entree.get("apercus", {}) if apercus else {}
+        return [f"{option} : {_apercu(textes[option])}" if textes.get(option) else option for option in entree["options"]]
+    return None  # Résultat négatif (éventuellement lu depuis le cache)
+
+
+def _apercu(texte: str) -> str:
+    # Première phrase du résumé, raccourcie si besoin
+    phrase = texte.split(". ")[0].rstrip(".") + "."
+    return phrase if len(phrase) <= APERCU_MAX_CARACTERES else phrase[:APERCU_MAX_CARACTERES - 1].rstrip() + "…"
+
+
+def _interroger_et_memoriser(
+    cle: str, query: str, lang: str, sentences: int, redirect: bool, auto_suggest: bool, logger: logging.Logger
+) -> Optional[dict]:
+    # Interroge Wikipédia et met le résultat en cache avant de le partager (les autres workers le relisent)
+    entree = _interroger_wikipedia(query, lang, sentences, redirect, auto_suggest, logger)
+    if entree is not None:
+        ttl = WIKI_CACHE_TTL_NEGATIF if entree["type"] == "absent" else WIKI_CACHE_TTL
+        cache_wikipedia.ecrire(cle, entree, ttl=ttl, espace="wikipedia")
+    return entree
+
+
+def _api(lang: str, **params) -> dict:
+    # Un appel à l'API MediaWiki (action=query, sauf autre action demandée), dans une place « web » et dans le temps restant à la requête
+    params = {"action": "query", "format": "json", **{cle: valeur for cle, valeur in params.items() if valeur is not None}}
+    with limite_web.place(), appel_amont("wikipedia"):
+        response = _session_wikipedia.get(url_api(lang), params=params, headers=ENTETES, timeout=borner(WIKIPEDIA_TIMEOUT))
+        response.raise_for_status()
+        donnees = response.json()
+    if "error" in donnees:
+        raise requests.exceptions.HTTPError(f"API MediaWiki : {donnees['error'].get('info', donnees['error'])}")
+    return donnees
+
+
+def _params_resume(sentences: int, redirect: bool) -> dict:
+    # Résumé en texte brut de l'introduction, et marque des pages d'homonymie
+    return {
+        "prop": "extracts|pageprops",
+        "ppprop": "disambiguation",
+        "exintro": 1,
+        "explaintext": 1,
+        "exsentences": sentences,
+        "exlimit": EXTRAITS_PAR_APPEL,
+        "redirects": 1 if redirect else None,
+    }
+
+
+def _est_homonymie(page: dict) -> bool:
+    return "disambiguation" in page.get("pageprops", {})
+
+
+def _entree_resume(page: dict) -> Optional[dict]:
+    texte = (page.get("extract") or "").strip()
+    return {"type": "resume", "texte": texte} if texte else None
+
+
+def _pages_par_titre(titres: List[str], lang: str, sentences: int, redirect: bool) -> dict[str, Optional[dict]]:
+    # Un seul appel pour (au plus EXTRAITS_PAR_APPEL) titres : titre demandé -> page (après normalisation
+    # de la casse et redirection), ou None si la page n'existe pas
+    requete = _api(lang, titles="|".join(titres), **_params_resume(sentences, redirect)).get("query", {})
+    cibles = {titre: titre for titre in titres}
+    for etape in ("normalized", "redirects"):
+        renvois = {r["from"]: r["to"] for r in requete.get(etape, [])}
+        cibles = {titre: renvois.get(cible, cible) for titre, cible in cibles.items()}
+    pages = {page["title"]: page for page in requete.get("pages", {}).values() if "missing" not in page}
+    return {titre: pages.get(cible) for titre, cible in cibles.items()}
+
+
+class _LecteurOptions(HTMLParser):
+    # Premier lien interne de chaque élément de liste d'une page d'homonymie : son titre (attribut title, sinon
+    # son texte). Le sommaire, les pages inexistantes (liens rouges) et les éléments sans lien sont ignorés.
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.options: List[str] = []
+        self._elements: list[dict] = []  # <li> ouverts (listes imbriquées) : {"sommaire", "lien" (None, ou [titre, texte])}
+        self._lien: Optional[list] = None  # [titre, texte] du lien retenu en cours de lecture
+
+    def handle_starttag(self, balise, attributs):
+        attributs = dict(attributs)
+        if balise == "li":
+            classes = (attributs.get("class") or "").split()
+            parent_sommaire = bool(self._elements) and self._elements[-1]["sommaire"]
+            self._elements.append({"sommaire": parent_sommaire or any(c.startswith("toc") for c in classes), "lien": None})
+        elif balise == "a" and self._elements and self._elements[-1]["lien"] is None and not self._elements[-1]["sommaire"]:
+            cible = unquote(attributs.get("href") or "")
+            if cible.startswith("/wiki/") and "new" not in (attributs.get("class") or "").split():
+                self._lien = self._elements[-1]["lien"] = [attributs.get("title") or "", ""]
+
+    def handle_data(self, texte):
+        if self._lien is not None:
+            self._lien[1] += texte
+
+    def handle_endtag(self, balise):
+        if balise == "a":
+            self._lien = None
+        elif balise == "li" and self._elements:
+            self._lien = None  # Lien jamais fermé : il s'arrête avec son élément
+            lien = self._elements.pop()["lien"]
+            option = lien and (lien[0] or lien[1]).strip()
+            if option and option not in self.options:
+                self.options.append(option)
+
+
+def _options_homonymie(titre: str, lang: str) -> List[str]:
+    # Titres proposés par une page d'homonymie (premier lien de chaque élément de liste, sommaire exclu)
+    contenu = _api(lang, action="parse", page=titre, prop="text", formatversion=2).get("parse", {}).get("text", "")
+    lecteur = _LecteurOptions()
+    lecteur.feed(contenu)
+    lecteur.close()
+    return lecteur.options
+
+
+def _apercus_options(options: List[str], lang: str, sentences: int, redirect: bool, logger: logging.Logger) -> dict[str, str]:
+    # Résumés des options en un appel groupé ; chacun est aussi mis en cache comme résumé de sa page (clé « titre »)
+    apercus = {}
+    try:
+        for debut in range(0, min(len(options), WIKIPEDIA_APERCUS_MAX), EXTRAITS_PAR_APPEL):
+            groupe = options[debut:min(debut + EXTRAITS_PAR_APPEL, WIKIPEDIA_APERCUS_MAX)]
+            for option, page in _pages_par_titre(groupe, lang, sentences, redirect).items():
+                if page is not None and not _est_homonymie(page) and (entree := _entree_resume(page)):
+                    apercus[option] = entree["texte"]
+                    cache_wikipedia.ecrire(_cle_titre(option, lang, sentences, redirect), entree, ttl=WIKI_CACHE_TTL, espace="wikipedia")
+    except (ServiceSature, EcheanceDepassee, requests.exceptions.RequestException, ValueError) as e:
+        logger.warning(f"Wikipedia: aperçus des options indisponibles ({e})")  # Les options restent utilisables
+    return apercus
+
+
+def _suggestion(query: str, lang: str) -> Optional[str]:
+    # Correction proposée par la recherche de Wikipédia (« Essayez avec cette orthographe »), s'il y en a une
+    infos = _api(lang, list="search", srsearch=query, srinfo="suggestion", srprop="", srlimit=1).get("query", {}).get("searchinfo", {})
+    suggestion = (infos.get("suggestion") or "").strip()
+    return suggestion if suggestion and normaliser_texte(suggestion) != normaliser_texte(query) else None
+
+
+def _interroger_wikipedia(
+    query: str, lang: str, sentences: int, redirect: bool, auto_suggest: bool, logger: logging.Logger
+) -> Optional[dict]:
+    # Interroge Wikipédia et retourne une entrée de cache : {"type": "resume" | "options" | "absent", ...},
+    # ou None si l'erreur est inattendue (et ne doit pas être mémorisée)
+
+    try:
+        # Meilleur résultat de la recherche (corrige fautes et approximations), son résumé et sa nature, en un appel
+        requete = _api(lang, generator="search", gsrsearch=query, gsrlimit=1, **_params_resume(sentences, redirect)).get("query", {})
+        page = next(iter(requete.get("pages", {}).values()), None)
+
+        # Aucun résultat (faute de frappe...) : nouvelle recherche avec la correction proposée par Wikipédia
+        if page is None and auto_suggest and (suggestion := _suggestion(query, lang)):
+            logger.info(f"Wikipedia: '{query}' corrigée en '{suggestion}'")
+            requete = _api(lang, generator="search", gsrsearch=suggestion, gsrlimit=1, **_params_resume(sentences, redirect)).get("query", {})
+            page = next(iter(requete.get("pages", {}).values()), None)
+
+        # Si la page n'existe pas (aucun résultat, page introuvable)
+        if page is None or "missing" in page:
+            logger.warning(f"Wikipedia: Page introuvable pour '{query}'.")
+            return {"type": "absent"}
+
+        # Si la page est ambiguë (plusieurs résultats possibles) : ses options, avec un aperçu de chacune
+        if _est_homonymie(page):
+            options = _options_homonymie(page["title"], lang)
+            logger.warning(f"Wikipedia: Désambiguïsation pour '{query}', options : {options}")
+            if not options:
+                return {"type": "absent"}
+            return {"type": "options", "options": options, "apercus": _apercus_options(options, lang, sentences, redirect, logger)}
+
+        # Si résumé non vide, on retourne le texte nettoyé
+        entree = _entree_resume(page)
+        if entree:
+            return entree
+        # Si résumé vide, on log un warning
+        logger.warning(f"Wikipedia: Résumé vide pour '{query}'.")
+        return {"type": "absent"}
 
-    # Si la page n'existe pas (page introuvable)
-    except PageError:
-        logger.warning(f"Wikipedia: Page introuvable pour '{query}'.")
+    # Trop d'appels web en cours ou plus de temps pour cette requête : rien n'est mis en cache
+    except (ServiceSature, EcheanceDepassee) as e:
+        logger.warning(f"Wikipedia: '{query}' abandonnée ({e})")
         return None
 
     # Gestion d'autres erreurs inattendues
@@ -0,0 +1,5 @@
+# Point d'entrée WSGI de production : gunicorn -c gunicorn.conf.py wsgi:app
+# (app.run() dans app/app.py reste le serveur de développement)
+from app.app import app
+
+application = app  # Nom attendu par défaut par certains serveurs WSGI (uWSGI, mod_wsgi)